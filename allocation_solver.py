@@ -0,0 +1,178 @@
+"""最优分配求解：在90%使用上限内求本轮总收益最大的资源分配
+
+经典三行业模型（economies/classic.json，系数可以改）的收益结构：
+- 资金划分固定时，收益对劳动力、土地都是线性的，所以劳动力整体投给一个行业，
+  土地只有农业真正用到，其余生产行业各留一个最小单位满足“任何投入为0则无产出”；
+- 资金在农业上是线性的，在工业/科技之间有交叉项（科技资金放大工业产出），
+  固定农业资金后收益沿工业/科技划分方向是开口向下的二次函数，顶点即最优；
+  而它对农业资金是凸的，因此农业资金只需取两个端点。
+枚举“哪些行业生产 × 劳动力投给谁 × 农业资金端点”即可得到全局最优，几十次求值，毫秒级。
+
+其他经济模型没有这样的结构可用，改为贪心 + 局部搜索：每个行业先放最小单位，
+资源分批投给边际收益最高的行业，再反复尝试把一份资源从一个行业挪到另一个行业，
+步长逐次减半。所有候选一次矩阵求值，行业多时也只需几十毫秒，但不保证全局最优。
+"""
+from itertools import combinations
+
+import numpy as np
+
+from game_engine import (SECTORS, RESOURCES, DEFAULTS, DEFAULT_ECONOMY, compute_results, check_usage,
+                         floor_cents)
+
+EPS = 0.01  # 最小分配单位，对应输入框的两位小数
+GREEDY_STEPS = 50  # 贪心阶段每种资源分成的份数
+
+
+def _empty_allocation():
+    return {sector: {res: 0.0 for res in RESOURCES} for sector in SECTORS}
+
+
+def _income(allocations, efficiency, params):
+    return sum(compute_results(allocations, efficiency, params).values())
+
+
+def _with_capital(base, ka, ki, kt):
+    alloc = {sector: dict(base[sector]) for sector in SECTORS}
+    alloc['农业']['capital'] = floor_cents(ka)
+    alloc['工业']['capital'] = floor_cents(ki)
+    alloc['科技']['capital'] = floor_cents(kt)
+    return alloc
+
+
+def _candidates(limits, efficiency, params, producing, labor_sector):
+    n = len(producing)
+    if any(limits[res] < EPS * n for res in RESOURCES):
+        return
+
+    # 劳动力、土地：生产行业各留最小单位，其余全部投给收益最高的去处
+    base = _empty_allocation()
+    for sector in producing:
+        base[sector]['labor'] = EPS
+        base[sector]['land'] = EPS
+    base[labor_sector]['labor'] = floor_cents(limits['labor'] - EPS * (n - 1))
+    if '农业' in producing:
+        base['农业']['land'] = floor_cents(limits['land'] - EPS * (n - 1))
+
+    # 资金：科技资金即使科技不生产也能放大工业，故科技始终可分配
+    lo = {sector: EPS if sector in producing else 0.0 for sector in SECTORS}
+    total = limits['capital']
+    if '农业' in producing:
+        ka_options = {lo['农业'], total - lo['工业'] - lo['科技']}
+    else:
+        ka_options = {0.0}
+
+    for ka in ka_options:
+        rest = total - ka
+        if '工业' in producing:
+            ki_lo, ki_hi = lo['工业'], rest - lo['科技']
+        else:
+            ki_lo = ki_hi = 0.0
+
+        def f(ki):
+            return _income(_with_capital(base, ka, ki, rest - ki), efficiency, params)
+
+        kis = {ki_lo, ki_hi}
+        if ki_hi - ki_lo > 2 * EPS:
+            # 三点拟合二次函数，取顶点
+            mid = (ki_lo + ki_hi) / 2
+            f_lo, f_mid, f_hi = f(ki_lo), f(mid), f(ki_hi)
+            curvature = f_lo - 2 * f_mid + f_hi
+            if curvature < 0:
+                h = (ki_hi - ki_lo) / 2
+                vertex = mid + h * (f_lo - f_hi) / (2 * curvature)
+                kis.add(min(max(vertex, ki_lo), ki_hi))
+        for ki in kis:
+            yield _with_capital(base, ka, ki, rest - ki)
+
+
+def _search(limits, efficiency, params):
+    """任意经济模型：贪心分配后做成对挪动的局部搜索，返回 (行业, 资源) 数组"""
+    economy = params.economy
+    production = params.production
+    n_s, n_r = len(economy.sectors), len(economy.resources)
+    limit = np.array([limits[r] for r in economy.resources])
+    eff = np.array([efficiency[s] for s in economy.sectors])
+    floor = np.where(production.required, EPS, 0.0)
+
+    def income(candidates):
+        return production.outputs(candidates, eff).sum(axis=-1)
+
+    # 资源不够每个行业都放最小单位时，只考虑单个行业生产
+    if np.all(floor.sum(axis=0) <= limit):
+        groups = [np.arange(n_s)]
+    else:
+        groups = [np.array([i]) for i in range(n_s) if np.all(floor[i] <= limit)]
+    best, best_income = np.zeros((n_s, n_r)), 0.0
+    for active in groups:
+        a = np.zeros((n_s, n_r))
+        a[active] = floor[active]
+        spare = limit - a.sum(axis=0)
+        # 贪心：每份资源投给边际收益最高的行业
+        for _ in range(GREEDY_STEPS):
+            for r in range(n_r):
+                candidates = np.repeat(a[None], len(active), axis=0)
+                candidates[np.arange(len(active)), active, r] += spare[r] / GREEDY_STEPS
+                a = candidates[np.argmax(income(candidates))]
+
+        # 局部搜索：把一份资源 r 从行业 i 挪到行业 j，找不到改进就把份额减半
+        current = income(a)
+        src, dst = (g.ravel() for g in np.meshgrid(active, active, indexing='ij'))
+        moves = np.arange(len(src))
+        fraction = 1 / GREEDY_STEPS
+        while len(active) > 1 and np.any(spare * fraction >= EPS):
+            improved = False
+            for r in range(n_r):
+                size = spare[r] * fraction
+                if size < EPS:
+                    continue
+                candidates = np.repeat(a[None], len(src), axis=0)
+                candidates[moves, src, r] -= size
+                candidates[moves, dst, r] += size
+                gains = income(candidates)
+                gains[(a[src, r] - size < floor[src, r]) | (src == dst)] = -np.inf
+                k = np.argmax(gains)
+                if gains[k] > current + 1e-9:
+                    a, current, improved = candidates[k], gains[k], True
+            if not improved:
+                fraction /= 2
+        if current > best_income:
+            best, best_income = a, current
+    return best
+
+
+def _fit(resources, allocations, params):
+    """浮点累加可能略超上限（如 0.05 + 0.01 > 0.06），逐次削减最大一项；原地修改并返回"""
+    economy = params.economy
+    cap = params.usage_cap
+    while check_usage(resources, allocations, params):
+        for res in economy.resources:
+            total = sum(allocations[sector][res] for sector in economy.sectors)
+            if total > resources[res] * cap:
+                sector = max(economy.sectors, key=lambda s: allocations[s][res])
+                allocations[sector][res] = round(allocations[sector][res] - EPS, 2)
+    return allocations
+
+
+def solve_allocation(resources, efficiency, cap=None, params=DEFAULTS):
+    """返回 (allocations, 预计总收益)；资源不足以让任何行业生产时返回全0分配"""
+    if cap is None:
+        cap = params.usage_cap
+    economy = params.economy
+    limits = {res: floor_cents(resources[res] * cap) for res in economy.resources}
+    capped = params if cap == params.usage_cap else params.replace(usage_cap=cap)
+    if economy.structure() == DEFAULT_ECONOMY.structure():
+        best, best_income = _empty_allocation(), 0.0
+        for n in range(1, len(SECTORS) + 1):
+            for producing in combinations(SECTORS, n):
+                for labor_sector in producing:
+                    for alloc in _candidates(limits, efficiency, params, producing, labor_sector):
+                        # 先削到合法再比较，否则削减后可能不如别的候选
+                        alloc = _fit(resources, alloc, capped)
+                        income = _income(alloc, efficiency, params)
+                        if income > best_income:
+                            best, best_income = alloc, income
+    else:
+        values = np.floor(_search(limits, efficiency, params) * 100 + 1e-6) / 100
+        best = _fit(resources, economy.from_array(values), capped)
+        best_income = _income(best, efficiency, params)
+    return best, best_income
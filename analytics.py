@@ -0,0 +1,381 @@
+"""整局数据的流式导出与滚动统计
+
+从种子和操作日志逐轮重放（与 replay.replay 相同），每结算一轮产出一行，
+一边走一边增量更新滚动统计，直接写到 CSV、JSON Lines 或 Parquet，
+不把整局或整批的行攒成列表，内存占用与轮数、局数无关。
+
+每行的列（行业、资源随经济模型变化）：
+    session, round, bought_<资源>, alloc_<行业>_<资源>, result_<行业>, efficiency_<行业>,
+    total_income, capital, price_<资源>, capital_cap_hit, event_kind, event_message
+滚动统计：
+    income_share_<行业>      到本轮为止各行业产出占总收益的比例
+    avg_efficiency_<行业>    到本轮为止的平均效率
+    price_volatility_<资源>  最近 window 轮价格对数变动的标准差
+    cap_hits                 到本轮为止资金触到上限（被截断）的次数
+price_ 和 capital 为本轮结算、随机事件和市场价格变动之后的值，即下一轮开始时的价格和资金。
+
+输入可以是操作日志（replay.ActionLog 格式）、.ecsave 存档或一个目录（批量处理其中所有的这两种文件）。
+没有操作记录的存档（版本 1）无法重放，直接读存档里的历史段和事件段：采购、资金、价格和
+资金截断这几列为空，event_kind 为事件标签；事件记在结算后的下一轮，归到上一轮的行，
+同一轮有几条时用换行连接。
+
+用法: python analytics.py 输入... -o 输出.csv|.jsonl|.parquet [--window 5] [--summary 汇总.csv]
+Parquet 需要安装 pyarrow。
+"""
+import argparse
+import csv
+import json
+import math
+import os
+from collections import deque
+
+from game_engine import GameState
+from replay import ActionLog, BUY, apply_action
+from savegame import SaveFile
+
+ACTION_LOG_SUFFIXES = ('.jsonl', '.log')
+SAVE_SUFFIX = '.ecsave'
+
+
+def columns(economy):
+    """[(列名, 类型)]，类型为 'str'、'int'、'float' 或 'bool'"""
+    cols = [('session', 'str'), ('round', 'int')]
+    cols += [(f'bought_{r}', 'float') for r in economy.tradable]
+    cols += [(f'alloc_{s}_{r}', 'float') for s in economy.sectors for r in economy.resources]
+    cols += [(f'result_{s}', 'float') for s in economy.sectors]
+    cols += [(f'efficiency_{s}', 'float') for s in economy.sectors]
+    cols += [('total_income', 'float'), ('capital', 'float')]
+    cols += [(f'price_{r}', 'float') for r in economy.tradable]
+    cols += [('capital_cap_hit', 'bool'), ('event_kind', 'str'), ('event_message', 'str')]
+    cols += [(f'income_share_{s}', 'float') for s in economy.sectors]
+    cols += [(f'avg_efficiency_{s}', 'float') for s in economy.sectors]
+    cols += [(f'price_volatility_{r}', 'float') for r in economy.tradable]
+    cols += [('cap_hits', 'int')]
+    return cols
+
+
+def summary_columns(economy):
+    """每局汇总一行的列，与 RollingStats.summary 对应"""
+    cols = [('session', 'str'), ('rounds', 'int'), ('total_income', 'float'), ('cap_hits', 'int')]
+    cols += [(f'income_share_{s}', 'float') for s in economy.sectors]
+    cols += [(f'avg_efficiency_{s}', 'float') for s in economy.sectors]
+    return cols
+
+
+def record_row(record, economy, session):
+    """一轮历史记录（game_engine.produce 的格式）转成一行的前几列"""
+    row = {'session': session, 'round': record['round']}
+    for s in economy.sectors:
+        for r in economy.resources:
+            row[f'alloc_{s}_{r}'] = record['allocations'][s][r]
+    for s in economy.sectors:
+        row[f'result_{s}'] = record['results'][s]
+    for s in economy.sectors:
+        row[f'efficiency_{s}'] = record['efficiency'][s]
+    row['total_income'] = record['total_income']
+    return row
+
+
+def session_rounds(log, session=''):
+    """按轮重放一局，逐轮产出一行（不含滚动统计列）；log 为 replay.ActionLog"""
+    state = GameState(seed=log.seed, params=log.params)
+    economy = state.economy
+    bought = dict.fromkeys(economy.tradable, 0.0)
+    for kind, values in log.actions:
+        record, event = apply_action(state, kind, values)
+        if kind == BUY:
+            # 采购计入下一次生产的那一行
+            for res, amount in zip(economy.tradable, values):
+                bought[res] += amount
+            continue
+
+        row = record_row(record, economy, session)
+        for res in economy.tradable:
+            row[f'bought_{res}'] = bought[res]
+            bought[res] = 0.0
+        row['capital'] = state.resources['capital']
+        for res in economy.tradable:
+            row[f'price_{res}'] = state.prices[res]
+        # 生产收益和资金类事件都可能被截断到上限
+        row['capital_cap_hit'] = (record['capital_overflow'] > 0
+                                  or bool(event and event.get('capital_overflow', 0) > 0))
+        row['event_kind'] = event['kind'] if event else None
+        row['event_message'] = event['message'] if event else None
+        yield row
+
+
+def saved_rounds(save, session=''):
+    """没有操作记录的存档：逐行读历史段（内存映射，按需分页），并上事件段里的记录"""
+    meta = save.header['history']
+    economy = save.params().economy
+    if meta['sectors'] != economy.sectors or meta['resources'] != economy.resources:
+        raise ValueError("存档的历史列布局与经济模型不一致")
+    fields = {name: slice(*span) for name, span in meta['fields'].items()}
+    missing = {'round', 'allocations', 'results', 'efficiency', 'total_income'} - set(fields)
+    if missing:
+        raise ValueError(f"存档历史缺少列: {', '.join(sorted(missing))}")
+    return _saved_rows(save, economy, fields, session)
+
+
+def _saved_rows(save, economy, fields, session):
+    n_s, n_r = len(economy.sectors), len(economy.resources)
+    events = save.events()
+    pending = next(events, None)
+    for line in save.history_rows():
+        alloc = line[fields['allocations']].reshape(n_s, n_r)
+        record = {
+            'round': int(line[fields['round']][0]),
+            'allocations': {s: {r: float(alloc[i, j]) for j, r in enumerate(economy.resources)}
+                            for i, s in enumerate(economy.sectors)},
+            'results': dict(zip(economy.sectors, line[fields['results']].tolist())),
+            'efficiency': dict(zip(economy.sectors, line[fields['efficiency']].tolist())),
+            'total_income': float(line[fields['total_income']][0]),
+        }
+        row = record_row(record, economy, session)
+        for res in economy.tradable:
+            row[f'bought_{res}'] = None
+            row[f'price_{res}'] = None
+        row['capital'] = row['capital_cap_hit'] = None
+        # 事件记在结算后的下一轮
+        tags, messages = [], []
+        while pending is not None and pending[0] <= record['round'] + 1:
+            if pending[0] == record['round'] + 1:
+                tags.append(pending[1])
+                messages.append(pending[2])
+            pending = next(events, None)
+        row['event_kind'] = ','.join(tags) or None
+        row['event_message'] = '\n'.join(messages) or None
+        yield row
+
+
+class RollingStats:
+    """一局内的滚动统计，每轮 O(行业数 + 资源数 × window)"""
+
+    def __init__(self, params, window=5):
+        economy = params.economy
+        self.sectors = list(economy.sectors)
+        self.tradable = list(economy.tradable)
+        self.window = window
+        self.rounds = 0
+        self.income = 0.0
+        self.result_sum = dict.fromkeys(self.sectors, 0.0)
+        self.efficiency_sum = dict.fromkeys(self.sectors, 0.0)
+        self.cap_hits = 0
+        self.cap_known = False  # 从存档历史读出的行不知道资金是否被截断
+        self.last_price = dict(economy.initial_prices)  # 开局价格
+        # 每种资源最近 window 个对数变动
+        self.returns = {r: deque(maxlen=window) for r in self.tradable}
+
+    def update(self, row):
+        """把本轮并入统计，并把统计列写进 row"""
+        self.rounds += 1
+        self.income += row['total_income']
+        if row['capital_cap_hit'] is not None:
+            self.cap_known = True
+            self.cap_hits += row['capital_cap_hit']
+        for s in self.sectors:
+            self.result_sum[s] += row[f'result_{s}']
+            self.efficiency_sum[s] += row[f'efficiency_{s}']
+            row[f'income_share_{s}'] = self.result_sum[s] / self.income if self.income > 0 else 0.0
+            row[f'avg_efficiency_{s}'] = self.efficiency_sum[s] / self.rounds
+        for r in self.tradable:
+            price = row[f'price_{r}']
+            if price is None:
+                row[f'price_volatility_{r}'] = None
+                continue
+            last = self.last_price.get(r)
+            self.last_price[r] = price
+            if last:
+                self.returns[r].append(math.log(price / last))
+            row[f'price_volatility_{r}'] = self.volatility(r)
+        row['cap_hits'] = self.cap_hits if self.cap_known else None
+        return row
+
+    def volatility(self, res):
+        """窗口只有几轮，直接对窗口求样本标准差，比维护和与平方和更稳定"""
+        returns = self.returns[res]
+        n = len(returns)
+        if n < 2:
+            return 0.0
+        mean = sum(returns) / n
+        return math.sqrt(sum((x - mean) ** 2 for x in returns) / (n - 1))
+
+    def summary(self, session):
+        """整局汇总一行"""
+        row = {'session': session, 'rounds': self.rounds, 'total_income': self.income,
+               'cap_hits': self.cap_hits if self.cap_known else None}
+        for s in self.sectors:
+            row[f'income_share_{s}'] = self.result_sum[s] / self.income if self.income > 0 else 0.0
+            row[f'avg_efficiency_{s}'] = self.efficiency_sum[s] / self.rounds if self.rounds else 0.0
+        return row
+
+
+def open_session(path, session=''):
+    """打开一局，返回 (GameParams, 逐轮行的生成器)；有操作记录的重放，没有的读存档历史"""
+    try:
+        if path.endswith(SAVE_SUFFIX):
+            save = SaveFile(path)
+            log = save.action_log()
+            if log is None:
+                return save.params(), saved_rounds(save, session)
+        else:
+            log = ActionLog.load(path)
+    except (KeyError, TypeError, json.JSONDecodeError):
+        # 目录里混进了不是操作日志的 .jsonl（比如上一次的导出结果）
+        raise ValueError("不是操作日志或存档")
+    return log.params, session_rounds(log, session)
+
+
+def session_files(inputs):
+    """展开输入：目录里的存档和操作日志按文件名排序"""
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(ACTION_LOG_SUFFIXES + (SAVE_SUFFIX,)):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def stream(params, rows, window=5, stats=None):
+    """给 session_rounds / saved_rounds 的行加上滚动统计；stats 可传入 RollingStats 以便之后取汇总"""
+    if stats is None:
+        stats = RollingStats(params, window)
+    for row in rows:
+        yield stats.update(row)
+
+
+# ---- 输出 ----
+class CsvSink:
+    def __init__(self, path, cols):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, [name for name, _ in cols])
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path, cols):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """每攒够 batch 行写一个行组"""
+
+    def __init__(self, path, cols, batch=8192):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("导出 Parquet 需要安装 pyarrow")
+        types = {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_()}
+        self.pa = pa
+        self.schema = pa.schema([(name, types[kind]) for name, kind in cols])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch = batch
+        self.buffer = {name: [] for name, _ in cols}
+        self.pending = 0
+
+    def write(self, row):
+        for name, values in self.buffer.items():
+            values.append(row[name])
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(self.pa.table(self.buffer, schema=self.schema))
+            for values in self.buffer.values():
+                values.clear()
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+SINKS = {'csv': CsvSink, 'jsonl': JsonlSink, 'parquet': ParquetSink}
+
+
+def sink_class(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in SINKS:
+        raise ValueError(f"不支持的导出格式: {fmt}（可用 {', '.join(SINKS)}）")
+    return SINKS[fmt]
+
+
+def export(inputs, out, fmt=None, window=5, summary=None, on_skip=None):
+    """把若干局逐行写到 out；所有局须使用同一经济模型，读不了或模型不同的局跳过。
+    返回 (局数, 行数)"""
+    sink_type = sink_class(out, fmt)
+    sink = summary_sink = economy = None
+    sessions = rows = 0
+    try:
+        for path in session_files(inputs):
+            if os.path.abspath(path) in (os.path.abspath(out), summary and os.path.abspath(summary)):
+                continue
+            session = os.path.basename(path)
+            try:
+                params, session_rows = open_session(path, session)
+                if economy is not None and params.economy.structure() != economy:
+                    raise ValueError("经济模型与第一局不同")
+            except (OSError, ValueError) as e:
+                if on_skip:
+                    on_skip(path, e)
+                continue
+            if economy is None:
+                # 输出文件的列由第一局的经济模型决定
+                economy = params.economy.structure()
+                sink = sink_type(out, columns(params.economy))
+                if summary:
+                    summary_sink = CsvSink(summary, summary_columns(params.economy))
+            stats = RollingStats(params, window)
+            try:
+                for row in stream(params, session_rows, window, stats):
+                    sink.write(row)
+                    rows += 1
+            except ValueError as e:
+                # 日志与规则对不上（被改动过或来自别的版本）：已写出的轮保留，这一局不计入汇总
+                if on_skip:
+                    on_skip(path, e)
+                continue
+            if summary_sink:
+                summary_sink.write(stats.summary(session))
+            sessions += 1
+    finally:
+        for s in (sink, summary_sink):
+            if s is not None:
+                s.close()
+    return sessions, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐轮导出对局数据和滚动统计")
+    parser.add_argument('inputs', nargs='+', help="操作日志、存档或包含它们的目录")
+    parser.add_argument('-o', '--out', required=True, help="输出文件（.csv / .jsonl / .parquet）")
+    parser.add_argument('--format', choices=list(SINKS), help="输出格式，默认按扩展名")
+    parser.add_argument('--window', type=int, default=5, help="价格波动率的滚动窗口（轮）")
+    parser.add_argument('--summary', help="另写一份每局一行的汇总 CSV")
+    args = parser.parse_args()
+    try:
+        sessions, rows = export(args.inputs, args.out, args.format, args.window, args.summary,
+                                on_skip=lambda path, e: print(f"跳过 {path}: {e}"))
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"已导出 {sessions} 局，{rows} 行")
+
+
+if __name__ == '__main__':
+    main()
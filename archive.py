@@ -0,0 +1,322 @@
+"""对局归档与排行榜（SQLite）
+
+每局结束（关闭窗口）或被放弃（读入别的存档）时，把整局写进本地 SQLite 数据库：
+    games          每局一行：玩家、种子、经济模型、状态、轮数、最终资金、总收益
+    rounds         每轮一行：总收益、当轮产出最高的行业及其占比
+    round_sectors  每轮每个行业一行：分配（JSON，按资源名）、产出、效率
+    events         “重要事件”面板的记录
+一局的所有行在一个事务里用 executemany 批量写入，import 多个存档时也合并成少量事务。
+索引覆盖三类常用查询，几十万局时仍是毫秒级：
+    排行榜        games(final_capital)，按经济模型看时用 games(economy, final_capital)
+    玩家趋势      games(player, ended, final_capital)
+    行业主导的轮  rounds(top_sector, top_share)
+
+用法:
+    python archive.py leaderboard [--economy 名称] [--top 20]
+    python archive.py trend 玩家
+    python archive.py dominant 科技 [--min-share 0.5] [--top 20]
+    python archive.py import 存档.ecsave ... [--player 名称]
+数据库默认在用户目录下，可用 --db 或环境变量 ECONGAME_ARCHIVE 指定。
+"""
+import argparse
+import getpass
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+ARCHIVE_PATH = os.environ.get('ECONGAME_ARCHIVE') or \
+    os.path.join(os.path.expanduser('~'), '生产要素管理游戏.archive.sqlite')
+SCHEMA_VERSION = 1
+INSERT_BLOCK = 4096  # 写库时每次读入的轮数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    seed INTEGER,
+    economy TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL,
+    ended REAL NOT NULL,
+    rounds INTEGER NOT NULL,
+    final_capital REAL NOT NULL,
+    total_income REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    total_income REAL NOT NULL,
+    top_sector TEXT,
+    top_share REAL,
+    PRIMARY KEY (game_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS round_sectors (
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    sector TEXT NOT NULL,
+    allocations TEXT NOT NULL,
+    result REAL NOT NULL,
+    efficiency REAL NOT NULL,
+    PRIMARY KEY (game_id, round, sector)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    game_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_capital ON games (final_capital DESC);
+CREATE INDEX IF NOT EXISTS games_leaderboard ON games (economy, final_capital DESC);
+CREATE INDEX IF NOT EXISTS games_player ON games (player, ended, final_capital);
+CREATE INDEX IF NOT EXISTS rounds_top ON rounds (top_sector, top_share DESC);
+"""
+
+
+def default_player():
+    return os.environ.get('ECONGAME_PLAYER') or getpass.getuser()
+
+
+def game_entry(state, chunks, fields, sectors, resources, events, status, player=None,
+               started=None, ended=None):
+    """把一局整理成待写入的字典；chunks 为按顺序拼成整局的若干 HistoryStore 列布局数组
+    （可以是 memmap），这里不复制，写库时在写盘线程上逐块读取，之后不能再改动这些数组"""
+    return {
+        'player': player or default_player(),
+        'seed': state.seed,
+        'economy': state.economy.name,
+        'status': status,
+        'started': started,
+        'ended': time.time() if ended is None else ended,
+        'final_capital': float(state.resources['capital']),
+        'sectors': list(sectors),
+        'resources': list(resources),
+        'fields': {name: (f.start, f.stop) if isinstance(f, slice) else tuple(f)
+                   for name, f in fields.items()},
+        'chunks': list(chunks),
+        'events': [tuple(event) for event in events],
+    }
+
+
+def history_entry(state, history, events, status, player=None, started=None):
+    """界面用：从 HistoryStore（需启用 spill）取整局。只取 spill 文件和存档映射的视图，
+    界面线程上不复制；调用之后这个 HistoryStore 不能再撤销或追加（归档的都是已结束或被放弃的局）"""
+    return game_entry(state, history.row_chunks(), history.fields, history.sectors, history.resources, events,
+                      status, player, started)
+
+
+class GameArchive:
+    """sqlite3 连接只能在创建它的线程里使用。
+    数据库出错（文件损坏、被锁住等）时抛出 OSError，调用方不必认识 sqlite3 的异常"""
+
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = path
+        self.db = None
+        try:
+            self.db = sqlite3.connect(path)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            version = self.db.execute('PRAGMA user_version').fetchone()[0]
+            if version <= SCHEMA_VERSION:
+                with self.db:
+                    self.db.executescript(SCHEMA)
+                    self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        except sqlite3.Error as e:
+            self.close()
+            raise OSError(f"无法打开对局归档: {e}") from e
+        if version > SCHEMA_VERSION:
+            self.close()
+            raise ValueError(f"归档数据库版本过新（{version}），请升级游戏")
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _query(self, sql, params=()):
+        try:
+            return self.db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise OSError(f"读取对局归档失败: {e}") from e
+
+    def add_games(self, entries):
+        """在一个事务里写入若干局，返回各局的 id；没有任何一轮的局不写"""
+        ids = []
+        try:
+            with self.db:
+                for entry in entries:
+                    if any(len(chunk) for chunk in entry['chunks']):
+                        ids.append(self._insert(entry))
+        except sqlite3.Error as e:
+            raise OSError(f"写入对局归档失败: {e}") from e
+        return ids
+
+    def add_game(self, entry):
+        ids = self.add_games([entry])
+        return ids[0] if ids else None
+
+    def _insert(self, entry):
+        f = {name: slice(*span) for name, span in entry['fields'].items()}
+        chunks = entry['chunks']
+        n_rounds = sum(len(chunk) for chunk in chunks)
+        total_income = sum(float(chunk[:, f['total_income']].sum()) for chunk in chunks)
+        cursor = self.db.execute(
+            'INSERT INTO games (player, seed, economy, status, started, ended, rounds, final_capital,'
+            ' total_income) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (entry['player'], entry['seed'], entry['economy'], entry['status'], entry['started'],
+             entry['ended'], n_rounds, entry['final_capital'], total_income))
+        game_id = cursor.lastrowid
+        # 按块读入，整局再长也只有一块在内存里
+        for chunk in chunks:
+            for start in range(0, len(chunk), INSERT_BLOCK):
+                rows = np.asarray(chunk[start:start + INSERT_BLOCK], dtype=np.float64)
+                self._insert_rounds(game_id, rows, f, entry['sectors'], entry['resources'])
+        self.db.executemany(
+            'INSERT INTO events VALUES (?, ?, ?, ?, ?)',
+            [(game_id, seq, event_round, tag, message)
+             for seq, (event_round, tag, message) in enumerate(entry['events'])])
+        return game_id
+
+    def _insert_rounds(self, game_id, rows, f, sectors, resources):
+        round_no = rows[:, f['round']][:, 0].astype(np.int64).tolist()
+        alloc = rows[:, f['allocations']].reshape(len(rows), len(sectors), len(resources)).tolist()
+        results = rows[:, f['results']]
+        efficiency = rows[:, f['efficiency']].tolist()
+        income = rows[:, f['total_income']][:, 0].tolist()
+
+        # 当轮产出最高的行业（与 HistoryStore.dominant_counts 的口径相同），以及它占当轮总产出的比例
+        top = results.argmax(axis=1)
+        best = results.max(axis=1)
+        total = results.sum(axis=1)
+        share = np.divide(best, total, out=np.zeros_like(best), where=total > 0).tolist()
+        has_top = (best > 0).tolist()
+
+        self.db.executemany(
+            'INSERT INTO rounds VALUES (?, ?, ?, ?, ?)',
+            [(game_id, round_no[n], income[n], sectors[top[n]] if has_top[n] else None,
+              share[n] if has_top[n] else None) for n in range(len(rows))])
+        result_list = results.tolist()
+        self.db.executemany(
+            'INSERT INTO round_sectors VALUES (?, ?, ?, ?, ?, ?)',
+            [(game_id, round_no[n], sector, json.dumps(dict(zip(resources, alloc[n][i]))),
+              result_list[n][i], efficiency[n][i])
+             for n in range(len(rows)) for i, sector in enumerate(sectors)])
+
+    # ---- 查询 ----
+    def leaderboard(self, economy=None, top=20):
+        """最终资金最高的 top 局：[(id, 玩家, 最终资金, 轮数, 结束时间)]"""
+        if economy is None:
+            return self._query(
+                'SELECT id, player, final_capital, rounds, ended FROM games'
+                ' ORDER BY final_capital DESC LIMIT ?', (top,))
+        return self._query(
+            'SELECT id, player, final_capital, rounds, ended FROM games WHERE economy = ?'
+            ' ORDER BY final_capital DESC LIMIT ?', (economy, top))
+
+    def player_trend(self, player, limit=None):
+        """某玩家按结束时间排列的 [(结束时间, 最终资金)]；给 limit 时只取最近 limit 局"""
+        if limit is None:
+            return self._query('SELECT ended, final_capital FROM games WHERE player = ?'
+                               ' ORDER BY ended', (player,))
+        rows = self._query('SELECT ended, final_capital FROM games WHERE player = ?'
+                           ' ORDER BY ended DESC LIMIT ?', (player, limit))
+        return rows[::-1]
+
+    def dominated_rounds(self, sector, min_share=0.0, top=20):
+        """该行业产出最高的轮，按占比从高到低：[(id, 轮次, 占比)]"""
+        return self._query(
+            'SELECT game_id, round, top_share FROM rounds WHERE top_sector = ? AND top_share >= ?'
+            ' ORDER BY top_share DESC LIMIT ?', (sector, min_share, top))
+
+    def dominated_count(self, sector, min_share=0.0):
+        return self._query('SELECT count(*) FROM rounds WHERE top_sector = ? AND top_share >= ?',
+                           (sector, min_share))[0][0]
+
+    def game_rounds(self, game_id):
+        """一局逐轮的 {轮次: {行业: (分配, 产出, 效率)}}"""
+        rounds = {}
+        for round_no, sector, alloc, result, eff in self._query(
+                'SELECT round, sector, allocations, result, efficiency FROM round_sectors'
+                ' WHERE game_id = ? ORDER BY round', (game_id,)):
+            rounds.setdefault(round_no, {})[sector] = (json.loads(alloc), result, eff)
+        return rounds
+
+
+def save_entry(path, player=None):
+    """把 .ecsave 存档整理成一局（状态记为 finished）"""
+    from savegame import SaveFile
+    save = SaveFile(path)
+    meta = save.header['history']
+    return game_entry(save.state(), [save.history_rows()], meta['fields'], meta['sectors'],
+                      meta['resources'], save.events(), 'finished', player,
+                      ended=os.path.getmtime(path))
+
+
+def append_game(entry, path=ARCHIVE_PATH):
+    """打开归档写入一局再关闭（在写盘线程上调用）"""
+    with GameArchive(path) as archive:
+        archive.add_game(entry)
+
+
+def _time(ended):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ended))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对局归档查询与导入")
+    parser.add_argument('--db', default=ARCHIVE_PATH, help="归档数据库路径")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('leaderboard', help="最终资金排行榜")
+    p.add_argument('--economy', help="只看该经济模型（名称）")
+    p.add_argument('--top', type=int, default=20)
+    p = sub.add_parser('trend', help="某玩家各局的最终资金")
+    p.add_argument('player')
+    p.add_argument('--last', type=int, help="只看最近几局")
+    p = sub.add_parser('dominant', help="某行业产出最高的轮")
+    p.add_argument('sector')
+    p.add_argument('--min-share', type=float, default=0.0, help="至少占当轮总产出的比例")
+    p.add_argument('--top', type=int, default=20)
+    p = sub.add_parser('import', help="把存档文件写入归档")
+    p.add_argument('saves', nargs='+')
+    p.add_argument('--player', help="玩家名，默认当前用户")
+    p.add_argument('--batch', type=int, default=100, help="每个事务写入的局数")
+    args = parser.parse_args()
+
+    with GameArchive(args.db) as archive:
+        if args.command == 'leaderboard':
+            for rank, (game_id, player, capital, rounds, ended) in enumerate(
+                    archive.leaderboard(args.economy, args.top), 1):
+                print(f"{rank:>3}  ¥{capital:>12.2f}  {rounds:>5} 轮  {_time(ended)}  #{game_id}  {player}")
+        elif args.command == 'trend':
+            for ended, capital in archive.player_trend(args.player, args.last):
+                print(f"{_time(ended)}  ¥{capital:.2f}")
+        elif args.command == 'dominant':
+            print(f"{args.sector}主导的轮数: {archive.dominated_count(args.sector, args.min_share)}")
+            for game_id, round_no, share in archive.dominated_rounds(args.sector, args.min_share, args.top):
+                print(f"#{game_id} 第 {round_no} 轮  占 {share:.1%}")
+        else:
+            batch, count = [], 0
+            for path in args.saves + [None]:
+                if path is not None:
+                    try:
+                        batch.append(save_entry(path, args.player))
+                    except (OSError, ValueError) as e:
+                        print(f"跳过 {path}: {e}")
+                if batch and (path is None or len(batch) >= args.batch):
+                    count += len(archive.add_games(batch))
+                    batch = []
+            print(f"已导入 {count} 局")
+
+
+if __name__ == '__main__':
+    main()
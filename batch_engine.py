@@ -0,0 +1,99 @@
+"""向量化批量模拟：一次 NumPy 运算推进成千上万局互相独立的游戏
+
+规则与 game_engine 完全一致，只是把状态存成数组（S 个行业、R 种资源、T 种可购买资源，
+列顺序同经济模型里的 sectors / resources / tradable）：
+    resources  (n, R)
+    prices     (n, T)
+    efficiency (n, S)
+    regime     (n,)    市场波动状态（见 market.py），True 为动荡期
+    allocations(n, S, R) 或可广播的 (S, R)，[行业, 资源]
+"""
+import numpy as np
+
+from game_engine import DEFAULTS
+
+
+def batch_outputs(allocations, efficiency, params=DEFAULTS):
+    """allocations (..., S, R)，efficiency (..., S) -> 各行业产出 (..., S)"""
+    return params.production.outputs(allocations, efficiency)
+
+
+class BatchEngine:
+    def __init__(self, n_games, seed=None, params=DEFAULTS):
+        economy = params.economy
+        self.n = n_games
+        self.params = params
+        self.economy = economy
+        self.shape = (n_games, len(economy.sectors), len(economy.resources))
+        self.capital = economy.resources.index('capital')
+        self.tradable = np.array([economy.resources.index(r) for r in economy.tradable], dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self.resources = np.tile([economy.initial_resources[r] for r in economy.resources], (n_games, 1))
+        self.prices = np.tile([economy.initial_prices[r] for r in economy.tradable], (n_games, 1))
+        self.efficiency = np.ones((n_games, len(economy.sectors)))
+        self.round = np.ones(n_games, dtype=np.int64)
+        self.price_floors = np.array([params.price_floors[r] for r in economy.tradable])
+        self.events = params.events
+        self.market = params.market
+        self.regime = np.zeros(n_games, dtype=bool)
+
+    @classmethod
+    def from_state(cls, state, n_games, seed=None):
+        """以一局 GameState 为起点复制出 n_games 局"""
+        engine = cls(n_games, seed, state.params)
+        economy = state.economy
+        engine.resources[:] = [state.resources[r] for r in economy.resources]
+        engine.prices[:] = [state.prices[r] for r in economy.tradable]
+        engine.efficiency[:] = [state.efficiency[s] for s in economy.sectors]
+        engine.round[:] = state.round
+        engine.regime[:] = bool(state.regime)
+        return engine
+
+    def valid_mask(self, allocations):
+        """各局分配是否满足90%上限"""
+        a = np.broadcast_to(allocations, self.shape)
+        return np.all(a.sum(axis=1) <= self.resources * self.params.usage_cap, axis=1) & np.all(a >= 0, axis=(1, 2))
+
+    def produce(self, allocations):
+        """结算一轮生产。超额分配的局不推进（对应界面中的报错），返回 (产出, 合法掩码)"""
+        a = np.broadcast_to(np.asarray(allocations, dtype=np.float64), self.shape)
+        ok = self.valid_mask(a)
+        results = batch_outputs(a, self.efficiency, self.params)
+        results[~ok] = 0.0
+
+        # 只有有产出的行业才消耗资源
+        consumed = np.einsum('ns,nsr->nr', (results > 0).astype(np.float64), a)
+        self.resources -= consumed
+        capital = self.capital
+        self.resources[:, capital] += results.sum(axis=1)
+        np.minimum(self.resources[:, capital], self.params.capital_cap, out=self.resources[:, capital])
+        self.round += ok
+        return results, ok
+
+    def roll_events(self, mask=None):
+        """向量化抽取随机事件，返回 (事件序号, 各事件的抽样)；序号含义见 self.events.names"""
+        return self.events.roll_batch(self.n, self.rng, mask)
+
+    def apply_events(self, kind, draws):
+        self.events.apply_batch(self, kind, draws)
+
+    def step_market(self, mask=None):
+        self.market.step_batch(self, mask)
+
+    def step(self, allocations):
+        """生产 + 随机事件 + 市场价格变动，一次推进所有局；返回 (产出, 合法掩码, 事件序号)"""
+        results, ok = self.produce(allocations)
+        events = self.roll_events(ok)
+        self.apply_events(*events)
+        self.step_market(ok)
+        return results, ok, events[0]
+
+    def buy(self, purchased):
+        """purchased (n, T) 或 (T,)，资金不足的局不成交，返回成交掩码"""
+        q = np.broadcast_to(np.asarray(purchased, dtype=np.float64), (self.n, len(self.tradable)))
+        cost = self.market.quote_batch(self.prices, q)
+        ok = np.all(q >= 0, axis=1) & (cost <= self.resources[:, self.capital])
+        idx = np.nonzero(ok)[0]
+        self.resources[np.ix_(idx, self.tradable)] += q[idx]
+        self.resources[idx, self.capital] -= cost[idx]
+        return ok
@@ -0,0 +1,174 @@
+"""经济模型：行业、资源和生产函数从 JSON 数据文件读取
+
+每个行业的产出为
+    (Σ 权重[资源] × 本行业投入[资源])
+    × (基数 + Σ 加成系数 × 某行业某资源的投入)
+    × 各放大倍数之积 × 效率
+必需资源（默认全部资源）中任何一项投入为0时产出为0。
+系数可以直接写数字，也可以写 params 里的参数名；参数可被 GameParams 覆盖，
+也可以用 sweep.py 扫描。求值是 行业×资源 的矩阵运算，行业再多也没有逐个分支。
+
+文件格式见 economies/classic.json。资源 id 'capital' 是资金，必须存在；
+写了 price 的资源可以在市场上购买，floor 为其价格下限。
+"""
+import json
+import os
+
+import numpy as np
+
+ECONOMY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'economies')
+CLASSIC_PATH = os.path.join(ECONOMY_DIR, 'classic.json')
+
+# 没有指定颜色的行业依次取用
+PALETTE = ['#C8E6C9', '#BBDEFB', '#E1BEE7', '#FFE0B2', '#B2EBF2', '#F8BBD0', '#DCEDC8',
+           '#D1C4E9', '#FFF9C4', '#CFD8DC', '#FFCCBC', '#B3E5FC']
+
+
+class Economy:
+    def __init__(self, spec):
+        """spec 为数据文件解析出的字典；格式有误时抛出 ValueError"""
+        self.spec = spec
+        try:
+            self.name = spec.get('name', '')
+            self.resources = [res['id'] for res in spec['resources']]
+            self.sectors = [sector['name'] for sector in spec['sectors']]
+            self.params = {name: float(value) for name, value in spec.get('params', {}).items()}
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"经济模型格式错误: {e}")
+        if not self.sectors:
+            raise ValueError("经济模型至少需要一个行业")
+        if 'capital' not in self.resources:
+            raise ValueError("经济模型缺少资金（capital）")
+        for names, what in [(self.resources, '资源'), (self.sectors, '行业')]:
+            if len(set(names)) != len(names):
+                raise ValueError(f"{what}名称重复")
+
+        by_id = {res['id']: res for res in spec['resources']}
+        self.tradable = [r for r in self.resources if 'price' in by_id[r]]
+        if 'capital' in self.tradable:
+            raise ValueError("资金不能在市场上购买")
+        self.resource_names = {r: by_id[r].get('name', r) for r in self.resources}
+        self.resource_icons = {r: by_id[r].get('icon', '•') for r in self.resources}
+        self.initial_resources = {r: float(by_id[r].get('initial', 0.0)) for r in self.resources}
+        self.initial_prices = {r: float(by_id[r]['price']) for r in self.tradable}
+        self.floors = {r: by_id[r].get('floor', 0.0) for r in self.tradable}
+        self.colors = {sector['name']: sector.get('color', PALETTE[i % len(PALETTE)])
+                       for i, sector in enumerate(spec['sectors'])}
+
+        for sector in spec['sectors']:
+            for res in list(sector.get('weights', {})) + sector.get('requires', []):
+                self._check_resource(res)
+            for boost in sector.get('boosts', []):
+                if boost.get('sector') not in self.sectors:
+                    raise ValueError(f"{sector['name']}的加成引用了未知行业: {boost.get('sector')}")
+                self._check_resource(boost.get('resource'))
+                self._check_value(boost.get('coef'))
+            for value in list(sector.get('weights', {}).values()) + sector.get('scale', []) \
+                    + [sector.get('base', 1.0)]:
+                self._check_value(value)
+        for value in self.floors.values():
+            self._check_value(value)
+
+    def _check_resource(self, res):
+        if res not in self.resources:
+            raise ValueError(f"未知资源: {res}")
+
+    def _check_value(self, value):
+        if isinstance(value, str):
+            if value not in self.params:
+                raise ValueError(f"未定义的参数: {value}")
+        elif not isinstance(value, (int, float)):
+            raise ValueError(f"系数应为数字或参数名: {value!r}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __eq__(self, other):
+        return isinstance(other, Economy) and self.spec == other.spec
+
+    def __hash__(self):
+        return hash((tuple(self.sectors), tuple(self.resources)))
+
+    def to_dict(self):
+        return self.spec
+
+    def structure(self):
+        """只看生产函数的形状（哪些投入、哪些加成），不看系数大小"""
+        return tuple((s['name'], tuple(sorted(s.get('weights', {}))),
+                      tuple((b['sector'], b['resource']) for b in s.get('boosts', [])),
+                      tuple(s.get('requires', self.resources)))
+                     for s in self.spec['sectors'])
+
+    def price_floors(self, params):
+        return {r: _value(v, params) for r, v in self.floors.items()}
+
+    def production(self, params):
+        return Production(self, params)
+
+    def to_array(self, allocations):
+        """{行业: {资源: 数量}} -> (行业, 资源) 数组"""
+        return np.array([[allocations[s][r] for r in self.resources] for s in self.sectors],
+                        dtype=np.float64)
+
+    def from_array(self, values):
+        return {s: {r: float(values[i, j]) for j, r in enumerate(self.resources)}
+                for i, s in enumerate(self.sectors)}
+
+
+def _value(value, params):
+    return getattr(params, value) if isinstance(value, str) else float(value)
+
+
+class Production:
+    """按一组参数展开成矩阵的生产函数"""
+
+    def __init__(self, economy, params):
+        n_s, n_r = len(economy.sectors), len(economy.resources)
+        specs = economy.spec['sectors']
+        self.weights = np.zeros((n_s, n_r))
+        self.base = np.ones(n_s)
+        self.required = np.zeros((n_s, n_r), dtype=bool)
+        n_scale = max(len(s.get('scale', [])) for s in specs) or 1
+        self.scale = np.ones((n_s, n_scale))
+        boosts = []
+        for i, s in enumerate(specs):
+            for res, value in s.get('weights', {}).items():
+                self.weights[i, economy.resources.index(res)] = _value(value, params)
+            self.base[i] = _value(s.get('base', 1.0), params)
+            for res in s.get('requires', economy.resources):
+                self.required[i, economy.resources.index(res)] = True
+            for k, value in enumerate(s.get('scale', [])):
+                self.scale[i, k] = _value(value, params)
+            for b in s.get('boosts', []):
+                source = economy.sectors.index(b['sector']) * n_r + economy.resources.index(b['resource'])
+                boosts.append((i, source, _value(b['coef'], params)))
+
+        # 加成按层存放，每层里目标行业不重复，一层一次向量化累加
+        self.boost_layers = []
+        while boosts:
+            layer, rest, seen = [], [], set()
+            for boost in boosts:
+                (rest if boost[0] in seen else layer).append(boost)
+                seen.add(boost[0])
+            targets, sources, coefs = zip(*layer)
+            self.boost_layers.append((np.array(targets), np.array(sources), np.array(coefs)))
+            boosts = rest
+
+    def outputs(self, allocations, efficiency):
+        """allocations (..., 行业, 资源)，efficiency (..., 行业) -> 各行业产出 (..., 行业)"""
+        a = np.asarray(allocations, dtype=np.float64)
+        eff = np.asarray(efficiency, dtype=np.float64)
+        linear = (a * self.weights).sum(axis=-1)
+        multiplier = np.empty_like(linear)
+        multiplier[...] = self.base
+        flat = a.reshape(a.shape[:-2] + (-1,))
+        for targets, sources, coefs in self.boost_layers:
+            multiplier[..., targets] += flat[..., sources] * coefs
+        out = linear * multiplier
+        for k in range(self.scale.shape[1]):
+            out = out * self.scale[:, k]
+        out = out * eff
+        # 如果任何必需资源分配为0，则该行业产出为0
+        return np.where(np.any((a == 0) & self.required, axis=-1), 0.0, out)
@@ -0,0 +1,119 @@
+"""“重要事件”面板的事件日志
+
+- 所有事件以 (轮次, 标签, 文本) 记录在内存里，并按标签建立下标索引，
+  筛选和搜索都在这里完成，不去扫描 Tk 的文本缓冲区；
+- 文本控件只保留最近 max_lines 行，更早的只留在记录中；
+- 同一轮内的多次写入先攒起来，空闲时一次性插入。
+"""
+import tkinter as tk
+
+TAG_NAMES = {'price': '价格', 'tech': '技术', 'bonus': '补贴/采购', 'disaster': '灾害', 'finance': '金融'}
+
+
+class EventLog:
+    def __init__(self, text_widget, max_lines=200):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self.records = []  # (round, tag, message)
+        self.by_tag = {}  # tag -> records 下标列表
+        self.pending = []
+        self.flush_scheduled = False
+        self.filter_tag = None
+        self.filter_keyword = ''
+        self.line_count = 0
+
+    def log(self, round_no, message, tag):
+        index = len(self.records)
+        self.records.append((round_no, tag, message))
+        self.by_tag.setdefault(tag, []).append(index)
+        if self.matches(index):
+            self.pending.append(index)
+            if not self.flush_scheduled:
+                self.flush_scheduled = True
+                self.text.after_idle(self.flush)
+
+    def load(self, records):
+        """读档后整体替换记录并按当前筛选条件重新显示"""
+        self.records = [tuple(record) for record in records]
+        self.by_tag = {}
+        for index, (round_no, tag, message) in enumerate(self.records):
+            self.by_tag.setdefault(tag, []).append(index)
+        self.set_filter(self.filter_tag, self.filter_keyword)
+
+    def truncate(self, n):
+        """撤销用：只保留前 n 条记录；文本控件里只删掉末尾对应的几行"""
+        removed = [i for i in range(n, len(self.records)) if self.matches(i)]
+        unflushed = sum(1 for i in self.pending if i >= n)
+        self.pending = [i for i in self.pending if i < n]
+        # 换成新列表：后台存档的快照还引用着旧列表
+        self.records = self.records[:n]
+        for indices in self.by_tag.values():
+            while indices and indices[-1] >= n:
+                indices.pop()
+
+        shown = len(removed) - unflushed
+        if not shown:
+            return
+        if self.line_count >= self.max_lines:
+            # 删掉后上面会空出来，需要补回更早的记录，直接按筛选条件重新填充
+            self.set_filter(self.filter_tag, self.filter_keyword)
+            return
+        self.text.config(state="normal")
+        self.text.delete(f'end-{shown + 1}l', 'end-1c')
+        self.text.config(state="disabled")
+        self.line_count -= shown
+
+    def extend(self, records):
+        """重做时接回撤销掉的记录"""
+        for round_no, tag, message in records:
+            self.log(round_no, message, tag)
+
+    def matches(self, index):
+        round_no, tag, message = self.records[index]
+        if self.filter_tag and tag != self.filter_tag:
+            return False
+        return not self.filter_keyword or self.filter_keyword in message
+
+    def format(self, index):
+        round_no, tag, message = self.records[index]
+        return f"第{round_no}轮：{message}\n"
+
+    def flush(self):
+        """把攒下的事件一次性写入文本控件，并裁掉超出的旧行"""
+        self.flush_scheduled = False
+        if not self.pending:
+            return
+        pending = self.pending[-self.max_lines:]
+        self.pending = []
+
+        args = []
+        for index in pending:
+            args += [self.format(index), self.records[index][1]]
+        self.text.config(state="normal")
+        self.text.insert(tk.END, *args)
+        self.line_count += len(pending)
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self.line_count = self.max_lines
+        self.text.see(tk.END)
+        self.text.config(state="disabled")
+
+    def search(self, keyword='', tag=None):
+        """返回匹配的记录 (轮次, 标签, 文本)，按时间顺序"""
+        indices = self.by_tag.get(tag, []) if tag else range(len(self.records))
+        return [self.records[i] for i in indices if keyword in self.records[i][2]]
+
+    def set_filter(self, tag=None, keyword=''):
+        """按标签/关键字重新填充文本控件（只取最近 max_lines 条匹配）"""
+        self.filter_tag = tag or None
+        self.filter_keyword = keyword
+        indices = self.by_tag.get(tag, []) if tag else range(len(self.records))
+        shown = [i for i in indices if self.matches(i)][-self.max_lines:]
+
+        self.text.config(state="normal")
+        self.text.delete('1.0', tk.END)
+        self.line_count = 0
+        self.text.config(state="disabled")
+        self.pending = shown
+        self.flush()
@@ -0,0 +1,193 @@
+"""随机事件登记表
+
+每种事件是一条声明（EventType），轮次结算只查表，不认识具体事件：
+    name     事件名，即事件字典的 'kind'
+    prob     每轮触发概率
+    target   'resource'（随机一种可购买资源）、'sector'（随机一个行业）或 None（全部行业）
+    draw     幅度：(最小, 最大) 为均匀分布，单个值为固定幅度
+    effect   'price'      价格 ×(1 + 幅度)，不低于价格下限
+             'efficiency' 效率 ×幅度
+             'capital'    资金 ×(1 + 幅度)，不超过资金上限
+    tag      “重要事件”面板的标签
+    message  文字模板，可用 {name}（资源或行业名）、{sign}、{pct}（变动百分比）、{value}（新值）
+概率和幅度可以写数字，也可以写 GameParams 的参数名。
+
+每轮按登记顺序逐个判定，在命中的事件里等概率选一个。按某组参数展开的
+EventTable 只构建一次；概率为0的事件不进表，也不消耗随机数，所以新增默认
+关闭的事件不会改变已有种子的对局。新事件用 register() 在导入时登记。
+"""
+import numpy as np
+
+EFFECTS = ('price', 'efficiency', 'capital')
+TARGETS = ('resource', 'sector', None)
+
+
+class EventType:
+    def __init__(self, name, prob, effect, draw, tag, message, target=None):
+        if effect not in EFFECTS:
+            raise ValueError(f"未知的事件效果: {effect}")
+        if target not in TARGETS:
+            raise ValueError(f"未知的事件对象: {target}")
+        if effect == 'price' and target != 'resource':
+            raise ValueError("价格事件的对象必须是资源")
+        if effect == 'efficiency' and target == 'resource':
+            raise ValueError("效率事件的对象必须是行业")
+        self.name = name
+        self.prob = prob
+        self.effect = effect
+        self.draw = draw
+        self.tag = tag
+        self.message = message
+        self.target = target
+
+    def apply(self, state, event):
+        if self.effect == 'price':
+            state.prices[event['resource']] = round(event['value'], 2)
+        elif self.effect == 'capital':
+            state.resources['capital'] = round(event['value'], 2)
+        elif self.target == 'sector':
+            sector = event['sector']
+            state.efficiency[sector] = round(state.efficiency[sector] * event['value'], 2)
+        else:
+            for sector in state.economy.sectors:
+                state.efficiency[sector] = round(state.efficiency[sector] * event['value'], 2)
+
+
+EVENT_TYPES = {}
+
+
+def register(event_type):
+    if event_type.name in EVENT_TYPES:
+        raise ValueError(f"事件重名: {event_type.name}")
+    EVENT_TYPES[event_type.name] = event_type
+    return event_type
+
+
+register(EventType('price', 'price_event_prob', 'price', ('price_change_min', 'price_change_max'),
+                   'price', "⚠ 市场价格波动！{name}价格{sign}{pct:.2f}% → ¥{value:.2f}", target='resource'))
+register(EventType('tech', 'tech_event_prob', 'efficiency', ('tech_modifier_min', 'tech_modifier_max'),
+                   'tech', "⚡ 技术变革！{name}效率{sign}{pct:.2f}%", target='sector'))
+register(EventType('bonus', 'subsidy_prob', 'efficiency', 'subsidy_modifier',
+                   'bonus', "🎉 政府补贴！全产业+{pct:.0f}%产量"))
+# 以下默认关闭（概率为0），打开方法见 game_engine.DEFAULT_PARAMS
+register(EventType('disaster', 'disaster_prob', 'efficiency', ('disaster_modifier_min', 'disaster_modifier_max'),
+                   'disaster', "🌪 自然灾害！{name}效率{sign}{pct:.2f}%", target='sector'))
+register(EventType('interest', 'interest_prob', 'capital', ('interest_rate_min', 'interest_rate_max'),
+                   'finance', "🏦 利率变动！资金{sign}{pct:.2f}% → ¥{value:.2f}"))
+
+
+def _value(value, params):
+    return getattr(params, value) if isinstance(value, str) else float(value)
+
+
+class _Entry:
+    """按参数展开后的一条事件"""
+    __slots__ = ('type', 'prob', 'targets', 'low', 'high', 'ranged')
+
+    def __init__(self, event_type, params):
+        economy = params.economy
+        self.type = event_type
+        self.prob = _value(event_type.prob, params)
+        self.targets = {'resource': tuple(economy.tradable), 'sector': tuple(economy.sectors),
+                        None: ()}[event_type.target]
+        self.ranged = isinstance(event_type.draw, (tuple, list))
+        if self.ranged:
+            self.low, self.high = (_value(v, params) for v in event_type.draw)
+        else:
+            self.low = self.high = _value(event_type.draw, params)
+
+
+class EventTable:
+    """一组参数下的事件抽样表"""
+
+    def __init__(self, params):
+        self.params = params
+        self.floors = params.price_floors
+        self.capital_cap = params.capital_cap
+        self.entries = [entry for entry in (_Entry(t, params) for t in EVENT_TYPES.values())
+                        if entry.prob > 0 and (entry.targets or entry.type.target is None)]
+        self.names = [entry.type.name for entry in self.entries]
+        # 逐轮抽取用的扁平表，热路径里只做元组解包
+        self.table = tuple((e.prob, e.targets, e.ranged, e.low, e.high, e.type) for e in self.entries)
+
+    def roll(self, state, rng):
+        """抽取本轮事件，返回事件字典或 None（只消耗随机数，不修改状态）"""
+        hits = []
+        random = rng.random
+        for prob, targets, ranged, low, high, event_type in self.table:
+            if random() < prob:
+                target = rng.choice(targets) if targets else None
+                x = rng.uniform(low, high) if ranged else low
+                hits.append((event_type, target, x))
+        if not hits:
+            return None
+        return self.event(state, *rng.choice(hits))
+
+    def event(self, state, event_type, target, x):
+        """由抽到的对象和幅度生成事件字典，文字在这里才格式化"""
+        economy = state.economy
+        event = {'kind': event_type.name, 'tag': event_type.tag}
+        name = ''
+        if event_type.effect == 'price':
+            value = max(self.floors[target], state.prices[target] * (1 + x))
+            pct = x * 100
+        elif event_type.effect == 'capital':
+            raw = state.resources['capital'] * (1 + x)
+            value = min(self.capital_cap, raw)
+            event['capital_overflow'] = max(0.0, raw - self.capital_cap)  # 被上限截掉的部分
+            pct = x * 100
+        else:
+            value = x
+            pct = (x - 1) * 100
+        if event_type.target == 'resource':
+            event['resource'] = target
+            name = economy.resource_names[target]
+        elif event_type.target == 'sector':
+            event['sector'] = name = target
+        event['value'] = value
+        event['message'] = event_type.message.format(name=name, sign='+' if pct > 0 else '',
+                                                     pct=pct, value=value)
+        return event
+
+    def roll_batch(self, n, rng, mask=None):
+        """n 局同时抽取：每种事件独立判定，再在命中的事件中等概率选一个。
+        返回 (kind, draws)：kind 为命中事件在 entries 里的序号 + 1（0 为无事件），
+        draws[k] 为第 k 种事件的 (对象下标, 幅度) 数组"""
+        hits = np.empty((n, len(self.entries)), dtype=bool)
+        for k, entry in enumerate(self.entries):
+            hits[:, k] = rng.random(n) < entry.prob
+        if mask is not None:
+            hits &= mask[:, None]
+        count = hits.sum(axis=1)
+        pick = (rng.random(n) * count).astype(np.int64)
+        # 第 pick 个命中的事件：累计命中数首次超过 pick 的位置
+        chosen = np.argmax(np.cumsum(hits, axis=1) > pick[:, None], axis=1) + 1
+        kind = np.where(count > 0, chosen, 0)
+
+        draws = []
+        for entry in self.entries:
+            target = rng.integers(len(entry.targets), size=n) if entry.targets else None
+            x = rng.uniform(entry.low, entry.high, size=n) if entry.ranged else entry.low
+            draws.append((target, x))
+        return kind, draws
+
+    def apply_batch(self, engine, kind, draws):
+        for k, (entry, (target, x)) in enumerate(zip(self.entries, draws), 1):
+            idx = np.nonzero(kind == k)[0]
+            if not len(idx):
+                continue
+            x = x[idx] if np.ndim(x) else x
+            effect = entry.type.effect
+            if effect == 'price':
+                r = target[idx]
+                new_price = np.maximum(engine.price_floors[r], engine.prices[idx, r] * (1 + x))
+                engine.prices[idx, r] = np.round(new_price, 2)
+            elif effect == 'capital':
+                c = engine.capital
+                value = np.minimum(self.capital_cap, engine.resources[idx, c] * (1 + x))
+                engine.resources[idx, c] = np.round(value, 2)
+            elif entry.type.target == 'sector':
+                s = target[idx]
+                engine.efficiency[idx, s] = np.round(engine.efficiency[idx, s] * x, 2)
+            else:
+                engine.efficiency[idx] = np.round(engine.efficiency[idx] * np.reshape(x, (-1, 1)), 2)
@@ -0,0 +1,134 @@
+"""蒙特卡洛资金预测
+
+假设玩家之后每轮都沿用当前输入的分配（资源不够时等比例缩小到90%上限），
+用 BatchEngine 一次推进几千条路径，抽样方式与 generate_random_event 相同，
+得到未来若干轮资金的 10/50/90 分位数。
+
+price_paths 用同一个引擎只推进价格（价格事件 + 市场模型，见 market.py），一次生成几千条价格情景；
+price_scenarios 按价格、波动状态和参数缓存，同一局同一轮的多次询问（策略、界面）只算一次。
+
+Forecaster 在单个后台线程里计算，按游戏状态缓存结果；界面线程只提交请求、
+轮询结果，从不等待。
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batch_engine import BatchEngine
+
+PERCENTILES = (10, 50, 90)
+SCENARIO_CACHE_SIZE = 64
+
+_scenarios = OrderedDict()
+
+
+def capital_paths(state, allocations, rounds=5, paths=4000, seed=0):
+    """返回 (paths, rounds + 1) 的资金轨迹，第0列为当前资金"""
+    engine = BatchEngine.from_state(state, paths, seed)
+    alloc = state.economy.to_array(allocations)
+    used = alloc.sum(axis=0)
+
+    capital = np.empty((paths, rounds + 1))
+    capital[:, 0] = engine.resources[:, engine.capital]
+    for k in range(1, rounds + 1):
+        # 留一点余量，避免缩放后浮点误差超出上限
+        limit = engine.resources * state.params.usage_cap * (1 - 1e-9)
+        scale = np.minimum(1.0, limit / np.maximum(used, 1e-12))
+        engine.step(alloc[None, :, :] * scale[:, None, :])
+        capital[:, k] = engine.resources[:, engine.capital]
+    return capital
+
+
+def forecast_bands(state, allocations, rounds=5, paths=4000, seed=0):
+    """返回 (rounds + 1, 3) 数组，每行依次为 10/50/90 分位数"""
+    capital = capital_paths(state, allocations, rounds, paths, seed)
+    return np.percentile(capital, PERCENTILES, axis=0).T
+
+
+def price_paths(state, rounds=10, paths=4000, seed=0):
+    """返回 (paths, rounds + 1, T) 的价格轨迹，第0步为当前价格，列顺序同 economy.tradable"""
+    engine = BatchEngine.from_state(state, paths, seed)
+    prices = np.empty((paths, rounds + 1, len(engine.economy.tradable)))
+    prices[:, 0] = engine.prices
+    for k in range(1, rounds + 1):
+        # 不生产，事件和价格照常推进；非价格事件改的效率和资金这里用不到
+        engine.apply_events(*engine.roll_events())
+        engine.step_market()
+        prices[:, k] = engine.prices
+    return prices
+
+
+def price_scenarios(state, rounds=10, paths=2000):
+    """带缓存的 price_paths；返回的数组是共享的，不要原地修改"""
+    economy = state.economy
+    key = (economy, tuple(state.prices[r] for r in economy.tradable), state.regime,
+           tuple(state.params.to_dict().values()), rounds, paths)
+    if key in _scenarios:
+        _scenarios.move_to_end(key)
+        return _scenarios[key]
+    prices = price_paths(state, rounds, paths)
+    prices.flags.writeable = False
+    _scenarios[key] = prices
+    if len(_scenarios) > SCENARIO_CACHE_SIZE:
+        _scenarios.popitem(last=False)
+    return prices
+
+
+class Forecaster:
+    def __init__(self, rounds=5, paths=4000, cache_size=64):
+        self.rounds = rounds
+        self.paths = paths
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='forecast')
+
+    def key(self, state, allocations):
+        economy = state.economy
+        return (state.regime, tuple(state.resources[r] for r in economy.resources),
+                tuple(state.prices[r] for r in economy.tradable),
+                tuple(state.efficiency[s] for s in economy.sectors),
+                tuple(allocations[s][r] for s in economy.sectors for r in economy.resources),
+                tuple(state.params.to_dict().values()))
+
+    def request(self, state, allocations):
+        """返回 (key, 结果或 None)；未命中缓存时提交后台计算，之后用 poll(key) 取结果"""
+        key = self.key(state, allocations)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return key, self.cache[key]
+        if key not in self.pending:
+            # 复制一份，后台线程不碰界面持有的状态
+            snapshot = state.copy()
+            alloc = {s: dict(allocations[s]) for s in state.economy.sectors}
+            self.pending[key] = self.executor.submit(forecast_bands, snapshot, alloc,
+                                                     self.rounds, self.paths)
+        return key, None
+
+    def poll(self, key):
+        """结果就绪时返回并放入缓存，否则返回 None"""
+        if key in self.cache:
+            return self.cache[key]
+        future = self.pending.get(key)
+        if future is None or not future.done():
+            return None
+        del self.pending[key]
+        bands = future.result()
+        self.cache[key] = bands
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return bands
+
+    def discard_stale(self, keep_key):
+        """取消还没开始的旧请求，只保留当前这一个；已算完的收进缓存"""
+        for key in list(self.pending):
+            if key == keep_key:
+                continue
+            if self.pending[key].cancel():
+                del self.pending[key]
+            elif self.pending[key].done():
+                self.poll(key)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
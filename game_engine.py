@@ -0,0 +1,270 @@
+"""生产要素管理游戏的规则引擎（不依赖 Tk）
+
+界面层 EnhancedEconomicGame 只负责读写控件，生产公式、资源消耗、
+市场采购、价格变动和随机事件都集中在这里，方便脱离窗口做模拟和分析。
+行业、资源和生产函数由经济模型（economy.Economy）给出，默认为 economies/classic.json。
+"""
+import json
+import math
+import random
+
+from economy import Economy, CLASSIC_PATH
+from events import EVENT_TYPES, EventTable
+from market import Market
+
+DEFAULT_ECONOMY = Economy.load(CLASSIC_PATH)
+
+SECTORS = DEFAULT_ECONOMY.sectors
+RESOURCES = DEFAULT_ECONOMY.resources
+TRADABLE = DEFAULT_ECONOMY.tradable  # 可在市场购买的资源
+RESOURCE_NAMES = DEFAULT_ECONOMY.resource_names
+
+USAGE_CAP = 0.9  # 每轮最多使用90%资源
+CAPITAL_CAP = 5000.00  # 资金上限
+SUBSIDY_MODIFIER = 1.15  # 政府补贴：全产业+15%
+
+INITIAL_RESOURCES = DEFAULT_ECONOMY.initial_resources
+INITIAL_PRICES = DEFAULT_ECONOMY.initial_prices
+
+# 与经济模型无关的平衡参数：事件概率与幅度、各种上限；
+# 生产系数和价格下限由经济模型文件的 params 定义
+DEFAULT_PARAMS = {
+    # 随机事件
+    'price_event_prob': 0.6, 'price_change_min': -0.25, 'price_change_max': 0.35,
+    'tech_event_prob': 0.4, 'tech_modifier_min': 0.85, 'tech_modifier_max': 1.25,
+    'subsidy_prob': 0.25, 'subsidy_modifier': SUBSIDY_MODIFIER,
+    # 默认关闭的事件（见 events.py），概率大于0才会抽取
+    'disaster_prob': 0.0, 'disaster_modifier_min': 0.6, 'disaster_modifier_max': 0.9,
+    'interest_prob': 0.0, 'interest_rate_min': -0.05, 'interest_rate_max': 0.08,
+    # 市场价格模型（见 market.py），默认关闭
+    'market_reversion': 0.0, 'market_volatility': 0.0, 'market_regime_prob': 0.0,
+    'market_turbulence': 3.0, 'market_impact': 0.0,
+    # 上限
+    'usage_cap': USAGE_CAP, 'capital_cap': CAPITAL_CAP,
+}
+
+
+class GameParams:
+    """一组平衡参数，属于某个经济模型；未指定的取 DEFAULT_PARAMS 和经济模型 params 里的默认值"""
+
+    def __init__(self, economy=None, **overrides):
+        self.economy = economy or DEFAULT_ECONOMY
+        defaults = self.defaults()
+        clash = set(self.economy.params) & (set(DEFAULT_PARAMS) | set(dir(GameParams)) | {'economy'})
+        if clash:
+            raise ValueError(f"经济模型参数与内置名称重名: {', '.join(sorted(clash))}")
+        unknown = set(overrides) - set(defaults)
+        if unknown:
+            raise ValueError(f"未知参数: {', '.join(sorted(unknown))}")
+        for name, default in defaults.items():
+            setattr(self, name, float(overrides.get(name, default)))
+        self._production = None
+        self._events = None
+        self._market = None
+
+    def defaults(self):
+        return dict(DEFAULT_PARAMS, **self.economy.params)
+
+    @property
+    def price_floors(self):
+        return self.economy.price_floors(self)
+
+    @property
+    def production(self):
+        """展开成矩阵的生产函数，第一次用到时构建"""
+        if self._production is None:
+            self._production = self.economy.production(self)
+        return self._production
+
+    @property
+    def events(self):
+        """随机事件抽样表，第一次用到时构建"""
+        if self._events is None:
+            self._events = EventTable(self)
+        return self._events
+
+    @property
+    def market(self):
+        """市场价格模型，第一次用到时构建"""
+        if self._market is None:
+            self._market = Market(self)
+        return self._market
+
+    @classmethod
+    def load(cls, path, economy=None):
+        """从 JSON 文件读取，文件里只需写要改的参数"""
+        with open(path, encoding='utf-8') as f:
+            return cls(economy, **json.load(f))
+
+    def replace(self, **changes):
+        return GameParams(self.economy, **dict(self.to_dict(), **changes))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.defaults()}
+
+    def changed(self):
+        """与默认值不同的参数"""
+        defaults = self.defaults()
+        return {name: value for name, value in self.to_dict().items() if value != defaults[name]}
+
+
+DEFAULTS = GameParams()
+PRICE_FLOORS = DEFAULTS.price_floors  # 价格下限
+
+
+class GameState:
+    """一局游戏的全部可变状态；随机事件使用本局自己的随机数流，给定种子即可复现"""
+
+    def __init__(self, resources=None, prices=None, efficiency=None, round=1, seed=None, params=None,
+                 regime=0):
+        self.params = params or DEFAULTS
+        economy = self.params.economy
+        self.resources = dict(resources or economy.initial_resources)
+        self.prices = dict(prices or economy.initial_prices)
+        self.efficiency = dict(efficiency or {sector: 1.0 for sector in economy.sectors})
+        self.round = round
+        self.regime = regime  # 市场波动状态，见 market.py
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+
+    @property
+    def economy(self):
+        return self.params.economy
+
+    def copy(self):
+        state = GameState(self.resources, self.prices, self.efficiency, self.round, self.seed,
+                          self.params, self.regime)
+        state.rng.setstate(self.rng.getstate())
+        return state
+
+
+def usage_limits(resources, params=DEFAULTS):
+    return {res: resources[res] * params.usage_cap for res in params.economy.resources}
+
+
+def floor_cents(x):
+    """向下取到分（输入框的两位小数）；+1e-6 防止 0.3 这样的数因浮点误差被取成 0.29"""
+    return math.floor(x * 100 + 1e-6) / 100
+
+
+def total_usage(allocations):
+    total_used = {}
+    for sector in allocations:
+        for res, value in allocations[sector].items():
+            total_used[res] = total_used.get(res, 0.0) + value
+    return total_used
+
+
+def check_usage(resources, allocations, params=DEFAULTS):
+    """返回超额使用的错误信息列表，为空表示分配合法"""
+    total_used = total_usage(allocations)
+    error_msgs = []
+    for res in total_used:
+        max_use = resources[res] * params.usage_cap
+        if total_used[res] > max_use:
+            error_msgs.append(f"⚠️ {res}超额使用！({total_used[res]:.2f} > {max_use:.2f})")
+    return error_msgs
+
+
+def compute_results(allocations, efficiency, params=DEFAULTS):
+    """各行业产出；公式见 economy 模块，按 行业×资源 矩阵一次求值"""
+    economy = params.economy
+    out = params.production.outputs(economy.to_array(allocations),
+                                    [efficiency[s] for s in economy.sectors])
+    return dict(zip(economy.sectors, out.tolist()))
+
+
+def produce(state, allocations):
+    """结算一轮生产，返回写入历史的记录；分配超额时抛出 ValueError"""
+    error_msgs = check_usage(state.resources, allocations, state.params)
+    if error_msgs:
+        raise ValueError("\n".join(error_msgs))
+
+    results = compute_results(allocations, state.efficiency, state.params)
+
+    # 更新资源 - 只消耗实际使用的资源，没有产出的行业不消耗
+    for sector in state.economy.sectors:
+        if results[sector] > 0:
+            for res in allocations[sector]:
+                state.resources[res] -= allocations[sector][res]
+
+    total_income = sum(results.values())
+    state.resources['capital'] += total_income
+
+    record = {
+        'round': state.round,
+        'allocations': allocations,
+        'results': results,
+        'efficiency': state.efficiency.copy(),
+        'total_income': total_income
+    }
+
+    state.round += 1
+    # 资金上限限制，截掉的部分记在 capital_overflow
+    capital = state.resources['capital']
+    record['capital_overflow'] = max(0.0, capital - state.params.capital_cap)
+    state.resources['capital'] = min(capital, state.params.capital_cap)
+    return record
+
+
+def parse_allocations(allocations, economy=DEFAULT_ECONOMY):
+    """外部传入的分配（服务器请求、自定义策略）转成完整的浮点字典，不合法时抛出 ValueError"""
+    try:
+        parsed = {s: {r: float(allocations[s][r]) for r in economy.resources} for s in economy.sectors}
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("请输入有效的数字！")
+    values = [value for alloc in parsed.values() for value in alloc.values()]
+    if not all(math.isfinite(value) for value in values):
+        raise ValueError("请输入有效的数字！")
+    if any(value < 0 for value in values):
+        raise ValueError("不能输入负数")
+    return parsed
+
+
+def parse_purchase(purchased, economy=DEFAULT_ECONOMY):
+    """外部传入的采购转成 {可购买资源: 数量}，缺省为0；含不可购买的资源时抛出 ValueError"""
+    try:
+        unknown = set(purchased) - set(economy.tradable)
+        parsed = {res: float(purchased.get(res, 0)) for res in economy.tradable}
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("请输入有效的非负数！")
+    if unknown:
+        raise ValueError("只能购买市场上出售的资源")
+    if not all(math.isfinite(amount) for amount in parsed.values()):
+        raise ValueError("请输入有效的非负数！")
+    return parsed
+
+
+def purchase_cost(prices, purchased, params=DEFAULTS):
+    """采购报价，由市场模型给出（默认按固定单价）；有负数时抛出 ValueError"""
+    return params.market.quote(prices, purchased)
+
+
+def apply_purchase(state, purchased, total_cost):
+    for res, amount in purchased.items():
+        state.resources[res] += amount
+    state.resources['capital'] -= total_cost
+
+
+def roll_event(state, rng=None):
+    """抽取本轮事件，返回事件描述字典或 None（只消耗随机数，不修改状态）；事件种类见 events.py"""
+    return state.params.events.roll(state, rng or state.rng)
+
+
+def apply_event(state, event):
+    EVENT_TYPES[event['kind']].apply(state, event)
+
+
+def step_market(state, rng=None):
+    """随机事件之后由市场模型推动价格（默认参数下什么也不做）"""
+    state.params.market.step(state, rng or state.rng)
+
+
+def play_round(state, allocations, rng=None):
+    """生产 + 随机事件 + 市场价格变动，返回 (历史记录, 事件或None)"""
+    record = produce(state, allocations)
+    event = roll_event(state, rng)
+    if event:
+        apply_event(state, event)
+    step_market(state, rng)
+    return record, event
@@ -0,0 +1,226 @@
+"""多人对局服务器：一个进程里用 asyncio 托管成千上万个无界面的游戏会话
+
+规则全部来自 game_engine（与窗口版的 start_production / buy_resources /
+generate_random_event 相同），每个会话只保存一个 GameState。
+
+协议：TCP 或 Unix 套接字上的 JSON Lines，一行一个请求、一行一个响应，
+同一连接上可以连续发送多个请求（按顺序应答）。请求里的 id 原样带回。
+    {"op": "new", "seed": 可选整数}                   -> {"session": ..., "state": ...}
+    {"op": "state", "session": ...}                   -> {"state": ...}
+    {"op": "produce", "session": ..., "allocations": ...}
+        allocations 为 {行业: {资源: 数量}}，或按 行业×资源 顺序的扁平列表
+                                                      -> {"results", "total_income", "event", "state"}
+    {"op": "buy", "session": ..., "purchased": {资源: 数量} 或按可购买资源顺序的列表}
+                                                      -> {"cost", "state"}
+    {"op": "close", "session": ...}                   -> {}
+    {"op": "economy"}                                 -> 行业、资源、可购买资源列表
+成功的响应带 "ok": true；规则不允许的操作返回 "ok": false 和 "error"（文字同窗口版的提示）。
+长时间没有请求的会话会被回收。单行请求最长 LINE_LIMIT 字节，超过时返回 "ok": false 并断开连接。
+
+用法: python game_server.py [--host 127.0.0.1] [--port 8765 | --unix 路径] [--economy 文件]
+启动后打印一行 "LISTENING 地址 端口"，--port 0 时由系统分配端口。
+"""
+import argparse
+import asyncio
+import json
+import secrets
+import time
+
+from economy import Economy
+from game_engine import (GameState, GameParams, play_round, purchase_cost, apply_purchase,
+                         parse_allocations, parse_purchase)
+from replay import unpack_allocations
+
+IDLE_TIMEOUT = 30 * 60  # 秒
+LINE_LIMIT = 1024 * 1024  # 单行请求的最大字节数（asyncio 默认只有 64 KB）
+MAX_SESSIONS = 100000
+
+
+class Session:
+    __slots__ = ('state', 'last_seen')
+
+    def __init__(self, state):
+        self.state = state
+        self.last_seen = time.monotonic()
+
+
+def state_view(state):
+    return {'round': state.round, 'resources': state.resources, 'prices': state.prices,
+            'efficiency': state.efficiency}
+
+
+class GameServer:
+    def __init__(self, params=None, idle_timeout=IDLE_TIMEOUT, max_sessions=MAX_SESSIONS):
+        self.params = params or GameParams()
+        self.economy = self.params.economy
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.handlers = {
+            'new': self.op_new,
+            'state': self.op_state,
+            'produce': self.op_produce,
+            'buy': self.op_buy,
+            'close': self.op_close,
+            'economy': self.op_economy,
+        }
+
+    def handle(self, request):
+        """处理一个请求字典，返回响应字典；不抛异常"""
+        response = {'id': request.get('id')} if 'id' in request else {}
+        op = request.get('op')
+        handler = self.handlers.get(op) if isinstance(op, str) else None
+        try:
+            if handler is None:
+                raise ValueError(f"未知操作: {op!r}")
+            response.update(handler(request))
+            response['ok'] = True
+        except ValueError as e:
+            response.update(ok=False, error=str(e))
+        except (TypeError, KeyError):
+            # 字段类型不对（如 seed 传了列表），不让异常断开连接
+            response.update(ok=False, error="请求格式错误")
+        return response
+
+    def session(self, request):
+        key = request.get('session')
+        session = self.sessions.get(key) if isinstance(key, str) else None
+        if session is None:
+            raise ValueError("会话不存在或已过期")
+        session.last_seen = time.monotonic()
+        return session
+
+    def op_new(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError("会话数已达上限")
+        seed = request.get('seed')
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+            raise ValueError("seed 必须是整数")
+        state = GameState(seed=seed, params=self.params)
+        key = secrets.token_hex(8)
+        self.sessions[key] = Session(state)
+        return {'session': key, 'seed': state.seed, 'state': state_view(state)}
+
+    def op_state(self, request):
+        return {'state': state_view(self.session(request).state)}
+
+    def op_produce(self, request):
+        state = self.session(request).state
+        allocations = request.get('allocations')
+        if isinstance(allocations, list):
+            if len(allocations) != len(self.economy.sectors) * len(self.economy.resources):
+                raise ValueError("分配数量与行业×资源数不符")
+            allocations = unpack_allocations(allocations, self.economy)
+        record, event = play_round(state, parse_allocations(allocations, self.economy))
+        return {
+            'results': record['results'],
+            'total_income': record['total_income'],
+            'event': {'kind': event['kind'], 'message': event['message']} if event else None,
+            'state': state_view(state),
+        }
+
+    def op_buy(self, request):
+        state = self.session(request).state
+        purchased = request.get('purchased')
+        if isinstance(purchased, list):
+            purchased = dict(zip(self.economy.tradable, purchased))
+        purchased = parse_purchase(purchased, self.economy)
+        total_cost = purchase_cost(state.prices, purchased, state.params)
+        if total_cost > state.resources['capital']:
+            raise ValueError("资金不足！")
+        apply_purchase(state, purchased, total_cost)
+        return {'cost': total_cost, 'state': state_view(state)}
+
+    def op_close(self, request):
+        self.session(request)
+        del self.sessions[request['session']]
+        return {}
+
+    def op_economy(self, request):
+        return {'name': self.economy.name, 'sectors': self.economy.sectors,
+                'resources': self.economy.resources, 'tradable': self.economy.tradable,
+                'usage_cap': self.params.usage_cap}
+
+    def reap(self):
+        """回收超时的会话，返回回收数量"""
+        deadline = time.monotonic() - self.idle_timeout
+        stale = [key for key, session in self.sessions.items() if session.last_seen < deadline]
+        for key in stale:
+            del self.sessions[key]
+        return len(stale)
+
+    async def reaper(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            self.reap()
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 一行超过 LINE_LIMIT：后面的数据已无法按行对齐，回一条错误后断开
+                    writer.write(json.dumps({'ok': False, 'error': "请求过长"},
+                                            ensure_ascii=False).encode('utf-8') + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    response = {'ok': False, 'error': "请求不是 JSON 对象"}
+                else:
+                    response = self.handle(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                # 缓冲区积压时才等待，连续请求不必每条都让出
+                if writer.transport.get_write_buffer_size() > 64 * 1024:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, unix=None):
+        if unix:
+            server = await asyncio.start_unix_server(self.serve_client, unix, limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.serve_client, host, port, limit=LINE_LIMIT)
+        self.reaper_task = asyncio.create_task(self.reaper())
+        return server
+
+
+async def serve(args):
+    economy = Economy.load(args.economy) if args.economy else None
+    params = GameParams.load(args.params, economy) if args.params else GameParams(economy)
+    server = GameServer(params, idle_timeout=args.idle_timeout)
+    listener = await server.start(args.host, args.port, args.unix)
+    if args.unix:
+        print(f"LISTENING unix {args.unix}", flush=True)
+    else:
+        host, port = listener.sockets[0].getsockname()[:2]
+        print(f"LISTENING {host} {port}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多人对局服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="改为监听 Unix 套接字")
+    parser.add_argument('--economy', help="经济模型 JSON 文件")
+    parser.add_argument('--params', help="平衡参数 JSON 文件")
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT, help="会话闲置多少秒后回收")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
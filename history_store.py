@@ -0,0 +1,269 @@
+"""按列存储的历史记录
+
+每轮一行 float64，列布局由行业数 S、资源数 R 决定（轮次、S×R 个分配、S 个产出、S 个效率、总收益）：
+- 最近 window 轮放在环形缓冲区里，图表和五轮总结直接取，O(1)；
+- 全局汇总（各行业总产出、平均效率、主导行业次数等）随追加增量维护；
+- 可选把完整记录写到内存映射文件（spill），长局也不占用常驻内存；
+- 读档时可以把存档里的历史段直接映射为只读的 base，按需分页读入，
+  再由后台线程 absorb_base() 拷进自己的 spill 文件。
+"""
+import tempfile
+
+import numpy as np
+
+from game_engine import SECTORS, RESOURCES
+
+
+class HistoryStore:
+    def __init__(self, window=5, spill=None, capacity=1024, sectors=SECTORS, resources=RESOURCES):
+        """spill: None 不保留完整记录；True 使用临时文件；字符串为文件路径"""
+        self.sectors = list(sectors)
+        self.resources = list(resources)
+        n_s, n_r = len(self.sectors), len(self.resources)
+        self.fields = {}
+        col = 0
+        for name, width in [('round', 1), ('allocations', n_s * n_r), ('results', n_s),
+                            ('efficiency', n_s), ('total_income', 1)]:
+            self.fields[name] = slice(col, col + width)
+            col += width
+        self.n_cols = col
+
+        self.window = window
+        self._ring = np.zeros((window, self.n_cols))
+        self._count = 0
+
+        # 增量汇总
+        self._result_sum = np.zeros(n_s)
+        self._efficiency_sum = np.zeros(n_s)
+        self._dominant = np.zeros(n_s, dtype=np.int64)
+        self._income_sum = 0.0
+        self._best_round = None
+        self._best_income = -np.inf
+
+        self._file = None
+        self._full = None
+        self._base = None  # 读档得到的只读历史，下标与完整记录一致
+        self._base_n = 0
+        self._truncated = []  # 每次截断后保留的轮数，按先后顺序
+        if spill:
+            self._file = tempfile.TemporaryFile() if spill is True else open(spill, 'w+b')
+            self._capacity = capacity
+            self._map_file()
+
+    def _map_file(self):
+        # 由 memmap 自己写尾字节扩展文件；Windows 下已映射的文件不能 truncate
+        self._full = np.memmap(self._file, dtype=np.float64, mode='r+',
+                               shape=(self._capacity, self.n_cols))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def spilled(self):
+        return self._full is not None
+
+    def to_row(self, record):
+        row = np.empty(self.n_cols)
+        row[self.fields['round']] = record['round']
+        row[self.fields['allocations']] = [record['allocations'][s][r]
+                                           for s in self.sectors for r in self.resources]
+        row[self.fields['results']] = [record['results'][s] for s in self.sectors]
+        row[self.fields['efficiency']] = [record['efficiency'][s] for s in self.sectors]
+        row[self.fields['total_income']] = record['total_income']
+        return row
+
+    def to_record(self, row):
+        """还原成 game_engine.produce 返回的字典格式"""
+        alloc = row[self.fields['allocations']].reshape(len(self.sectors), len(self.resources))
+        return {
+            'round': int(row[self.fields['round']][0]),
+            'allocations': {s: {r: float(alloc[i, j]) for j, r in enumerate(self.resources)}
+                            for i, s in enumerate(self.sectors)},
+            'results': dict(zip(self.sectors, row[self.fields['results']].tolist())),
+            'efficiency': dict(zip(self.sectors, row[self.fields['efficiency']].tolist())),
+            'total_income': float(row[self.fields['total_income']][0])
+        }
+
+    def append(self, record):
+        row = self.to_row(record)
+        self._ring[self._count % self.window] = row
+
+        if self._full is not None:
+            if self._count >= self._capacity:
+                self._full.flush()
+                self._capacity *= 2
+                self._map_file()
+            self._full[self._count] = row
+
+        results = row[self.fields['results']]
+        self._result_sum += results
+        self._efficiency_sum += row[self.fields['efficiency']]
+        if results.max() > 0:
+            self._dominant[results.argmax()] += 1
+        income = float(row[self.fields['total_income']][0])
+        self._income_sum += income
+        if income > self._best_income:
+            self._best_income, self._best_round = income, record['round']
+        self._count += 1
+
+    # ---- 最近几轮 ----
+    def _recent_rows(self, n):
+        n = min(n or self.window, self.window, self._count)
+        order = [(self._count - n + k) % self.window for k in range(n)]
+        return self._ring[order]
+
+    def recent_column(self, field, n=None):
+        """最近 n 轮某一字段，按轮次从旧到新；round/total_income 为一维"""
+        data = self._recent_rows(n)[:, self.fields[field]]
+        if field == 'allocations':
+            return data.reshape(-1, len(self.sectors), len(self.resources))
+        if data.shape[1] == 1:
+            return data[:, 0]
+        return data
+
+    def recent(self, n=None):
+        return [self.to_record(row) for row in self._recent_rows(n)]
+
+    # ---- 完整记录 ----
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        return self.to_record(self._row(index))
+
+    def _row(self, index):
+        if self._count - index <= self.window:
+            return self._ring[index % self.window]
+        base = self._base
+        if base is not None and index < self._base_n:
+            return base[index]
+        if self._full is None:
+            raise IndexError("该轮已超出最近记录窗口且未启用完整记录")
+        return self._full[index]
+
+    def truncate(self, n, aggregates):
+        """撤销用：只保留前 n 轮，汇总值恢复为当时保存的 aggregates()"""
+        if not 0 <= n <= self._count:
+            raise IndexError("history index out of range")
+        if self._full is None and n < self._count - self.window:
+            raise ValueError("未启用完整记录，不能撤销到最近记录窗口之前")
+        # 先按旧的轮数读出新窗口里的行；每个槽位要么原样保留，要么从完整记录读入
+        for index in range(max(0, n - self.window), n):
+            self._ring[index % self.window] = self._row(index)
+        if self._base is not None and n < self._base_n:
+            self._base = self._base[:n]
+            self._base_n = n
+        if n < self._count:
+            self._truncated.append(n)
+        self._count = n
+        self.restore_aggregates(aggregates)
+
+    def column(self, field):
+        """完整记录中某一字段的只读视图（需启用 spill）"""
+        if self._full is None:
+            raise ValueError("未启用完整记录")
+        base = self._base
+        if base is not None:
+            data = np.concatenate([base[:, self.fields[field]],
+                                   self._full[self._base_n:self._count, self.fields[field]]])
+        else:
+            data = self._full[:self._count, self.fields[field]]
+        if field == 'allocations':
+            return data.reshape(-1, len(self.sectors), len(self.resources))
+        if data.shape[1] == 1:
+            return data[:, 0]
+        return data
+
+    def row_chunks(self):
+        """按顺序返回构成完整记录的数组块（存档用，不复制）。
+        撤销后再追加会原地覆盖 spill 文件里的行，交给别的线程读时用 generation/rows_intact 检查"""
+        if self._full is None:
+            raise ValueError("未启用完整记录")
+        base = self._base
+        if base is not None:
+            return [base, self._full[self._base_n:self._count]]
+        return [self._full[:self._count]]
+
+    @property
+    def generation(self):
+        """截断过的次数；与 rows_intact 配合使用"""
+        return len(self._truncated)
+
+    def rows_intact(self, generation, n):
+        """取得 generation 之后没有截断到 n 轮以内，即前 n 行没有被改写过（可在别的线程调用）"""
+        return min(self._truncated[generation:], default=n) >= n
+
+    # ---- 读档 ----
+    def attach_base(self, rows, aggregates):
+        """以存档中的历史（通常是只读 memmap）为起点，只读最后 window 行，其余按需分页"""
+        if self._full is None:
+            raise ValueError("未启用完整记录")
+        n = len(rows)
+        while self._capacity < n + 1:
+            self._capacity *= 2
+        self._full.flush()
+        self._map_file()
+        self._base = rows
+        self._base_n = n
+        self._count = n
+        for index in range(max(0, n - self.window), n):
+            self._ring[index % self.window] = rows[index]
+        self.restore_aggregates(aggregates)
+
+    def absorb_base(self, chunk=65536):
+        """把 base 拷进自己的 spill 文件后释放（在后台线程调用），之后存档文件可以被替换"""
+        base = self._base
+        if base is None:
+            return
+        full = self._full
+        for start in range(0, self._base_n, chunk):
+            stop = min(start + chunk, self._base_n)
+            full[start:stop] = base[start:stop]
+        full.flush()
+        # 只丢掉引用，映射随引用计数释放，不主动 close 以免主线程正在读
+        self._base = None
+
+    def aggregates(self):
+        return {
+            'result_sum': self._result_sum.tolist(),
+            'efficiency_sum': self._efficiency_sum.tolist(),
+            'dominant': self._dominant.tolist(),
+            'income_sum': self._income_sum,
+            'best_round': self._best_round,
+            'best_income': self._best_income if self._best_round is not None else None,
+        }
+
+    def restore_aggregates(self, data):
+        self._result_sum[:] = data['result_sum']
+        self._efficiency_sum[:] = data['efficiency_sum']
+        self._dominant[:] = data['dominant']
+        self._income_sum = data['income_sum']
+        self._best_round = data['best_round']
+        self._best_income = data['best_income'] if data['best_round'] is not None else -np.inf
+
+    # ---- 全局汇总，O(1) ----
+    def sector_totals(self):
+        return dict(zip(self.sectors, self._result_sum.tolist()))
+
+    def total_income(self):
+        return self._income_sum
+
+    def mean_efficiency(self):
+        if not self._count:
+            return {s: 1.0 for s in self.sectors}
+        return dict(zip(self.sectors, (self._efficiency_sum / self._count).tolist()))
+
+    def dominant_counts(self):
+        """各行业成为当轮最高产出行业的轮数"""
+        return dict(zip(self.sectors, self._dominant.tolist()))
+
+    def best_round(self):
+        return self._best_round, (self._best_income if self._best_round is not None else 0.0)
+
+    def close(self):
+        if self._file is not None:
+            self._full.flush()
+            self._full = None
+            self._file.close()
+            self._file = None
@@ -0,0 +1,96 @@
+"""市场价格模型
+
+价格事件（events.py）之外，每轮结算后市场模型再推动一次价格，采购报价也由它给出：
+    market_reversion    均值回复强度：对数价格每轮向经济模型的初始价格靠拢这一比例
+    market_volatility   平静期每轮对数价格的波动（正态扰动的标准差）
+    market_regime_prob  每轮在平静期和动荡期之间切换的概率
+    market_turbulence   动荡期波动率是平静期的倍数
+    market_impact       价格冲击：每多买一单位，边际价格上涨当前价格的这一比例，
+                        买 q 单位的总价为 价格 × q × (1 + market_impact × q / 2)
+价格不低于价格下限，保留两位小数。当前所处的波动状态记在 GameState.regime（0 平静，1 动荡）。
+
+这些参数默认都是0：价格只随价格事件变动、采购按固定单价成交，也不多消耗随机数，
+已有种子的对局和操作日志的重放结果不变。Market 按某组参数只构建一次（GameParams.market），
+逐轮推进和 BatchEngine 的向量化推进使用同一套参数。
+"""
+import math
+
+import numpy as np
+
+
+class Market:
+    def __init__(self, params):
+        economy = params.economy
+        self.tradable = tuple(economy.tradable)
+        self.floors = params.price_floors
+        self.log_anchor = {r: math.log(economy.initial_prices[r]) for r in self.tradable}
+        self.reversion = params.market_reversion
+        self.volatility = params.market_volatility
+        self.regime_prob = params.market_regime_prob
+        self.turbulence = params.market_turbulence
+        self.impact = params.market_impact
+        # 全为0时价格不由市场模型推动
+        self.active = bool(self.reversion or self.volatility or self.regime_prob)
+        # 向量化推进用的数组，列顺序同 economy.tradable
+        self.log_anchor_array = np.array([self.log_anchor[r] for r in self.tradable])
+        self.floor_array = np.array([self.floors[r] for r in self.tradable])
+
+    def sigma(self, regime):
+        return self.volatility * (self.turbulence if regime else 1.0)
+
+    def quote(self, prices, purchased):
+        """采购总价，每种资源 O(1)；有负数时抛出 ValueError"""
+        total_cost = 0.0
+        impact = self.impact
+        for res, amount in purchased.items():
+            if amount < 0:
+                raise ValueError("不能输入负数")
+            total_cost += amount * prices[res] * (1 + impact * amount / 2)
+        return total_cost
+
+    def affordable(self, price, budget):
+        """用 budget 最多能买多少单位（解 总价 = budget）"""
+        if budget <= 0:
+            return 0.0
+        if not self.impact:
+            return budget / price
+        return (math.sqrt(1 + 2 * self.impact * budget / price) - 1) / self.impact
+
+    def step(self, state, rng):
+        """推进一轮价格；不活跃时不消耗随机数"""
+        if not self.active:
+            return
+        if self.regime_prob and rng.random() < self.regime_prob:
+            state.regime = 1 - state.regime
+        sigma = self.sigma(state.regime)
+        for res in self.tradable:
+            log_price = math.log(state.prices[res])
+            log_price += self.reversion * (self.log_anchor[res] - log_price)
+            if sigma:
+                log_price += sigma * rng.gauss(0.0, 1.0)
+            state.prices[res] = round(max(self.floors[res], math.exp(log_price)), 2)
+
+    def step_batch(self, engine, mask=None):
+        """BatchEngine 的所有局同时推进一轮；mask 为 False 的局不动"""
+        if not self.active:
+            return
+        rng = engine.rng
+        if self.regime_prob:
+            flip = rng.random(engine.n) < self.regime_prob
+            if mask is not None:
+                flip &= mask
+            engine.regime ^= flip
+        log_price = np.log(engine.prices)
+        log_price += self.reversion * (self.log_anchor_array - log_price)
+        if self.volatility:
+            sigma = self.volatility * np.where(engine.regime, self.turbulence, 1.0)
+            log_price += sigma[:, None] * rng.standard_normal(engine.prices.shape)
+        new_price = np.round(np.maximum(self.floor_array, np.exp(log_price)), 2)
+        if mask is None:
+            engine.prices[:] = new_price
+        else:
+            engine.prices[mask] = new_price[mask]
+
+    def quote_batch(self, prices, purchased):
+        """prices、purchased 均为 (n, T)，返回各局的采购总价 (n,)"""
+        return (purchased * prices * (1 + self.impact * purchased / 2)).sum(axis=1)
@@ -0,0 +1,101 @@
+"""快进用的分配策略与多轮模拟
+
+策略是一个函数 policy(state, last_allocations) -> allocations，
+run_rounds 按 game_engine 的规则逐轮结算，不涉及任何界面更新。
+"""
+
+from game_engine import total_usage, play_round, purchase_cost, apply_purchase, floor_cents
+from allocation_solver import solve_allocation
+
+
+def fit_to_cap(state, allocations):
+    """按比例缩小超过90%上限的资源，保证分配合法"""
+    economy = state.economy
+    used = total_usage(allocations)
+    scale = {}
+    for res in economy.resources:
+        # 留一点余量：floor_cents 可能向上多出不到 1e-8，几个行业累加后也不会超上限
+        limit = state.resources[res] * state.params.usage_cap - 1e-6
+        scale[res] = 1.0 if used[res] <= limit else limit / used[res]
+    return {sector: {res: floor_cents(allocations[sector][res] * scale[res]) for res in economy.resources}
+            for sector in economy.sectors}
+
+
+def repeat_last(state, last_allocations):
+    """重复上一轮的分配（资源不够时等比例缩小）"""
+    return fit_to_cap(state, last_allocations)
+
+
+def proportional(state, last_allocations):
+    """每种资源都用满90%，按上一轮各行业的占比分配；上一轮没投的资源平均分"""
+    economy = state.economy
+    used = total_usage(last_allocations)
+    allocations = {sector: {} for sector in economy.sectors}
+    for res in economy.resources:
+        limit = state.resources[res] * state.params.usage_cap - 1e-6
+        for sector in economy.sectors:
+            share = last_allocations[sector][res] / used[res] if used[res] > 0 else 1 / len(economy.sectors)
+            allocations[sector][res] = floor_cents(limit * share)
+    return allocations
+
+
+def optimal(state, last_allocations):
+    """每轮都用求解器给出的最优分配"""
+    return solve_allocation(state.resources, state.efficiency, params=state.params)[0]
+
+
+def restock(state, reserve=0.5, target=None):
+    """补充可购买的资源：用不超过 (1 - reserve) 的资金按价格买到目标数量，
+    目标默认为初始数量；模拟玩家靠它避免资源耗尽后停产"""
+    economy = state.economy
+    budget = state.resources['capital'] * (1 - reserve)
+    purchased = {}
+    for res in economy.tradable:
+        want = (target or economy.initial_resources)[res] - state.resources[res]
+        affordable = state.params.market.affordable(state.prices[res], budget / len(economy.tradable))
+        purchased[res] = floor_cents(max(0.0, min(want, affordable)))
+    cost = purchase_cost(state.prices, purchased, state.params)
+    if cost > 0:
+        apply_purchase(state, purchased, cost)
+    return purchased
+
+
+POLICIES = {
+    '重复上轮': repeat_last,
+    '按比例': proportional,
+    '最优': optimal,
+}
+
+
+def run_rounds(state, policy, n_rounds, last_allocations, rng=None,
+               on_record=None, on_event=None, summary=None):
+    """逐轮推进 n_rounds 轮，每轮结束 yield 一次，调用方可分批驱动；
+    汇总结果累积在 summary 字典里。分配不合法时提前结束并记录原因。"""
+    if summary is None:
+        summary = {}
+    summary.setdefault('rounds', 0)
+    summary.setdefault('total_income', 0.0)
+    summary.setdefault('sector_totals', {sector: 0.0 for sector in state.economy.sectors})
+    summary.setdefault('events', {})
+    summary.setdefault('stopped', None)
+
+    allocations = last_allocations
+    for _ in range(n_rounds):
+        allocations = policy(state, allocations)
+        try:
+            record, event = play_round(state, allocations, rng)
+        except ValueError as e:
+            summary['stopped'] = str(e)
+            return
+        summary['rounds'] += 1
+        summary['total_income'] += record['total_income']
+        for sector in state.economy.sectors:
+            summary['sector_totals'][sector] += record['results'][sector]
+        if on_record:
+            on_record(record)
+        if event:
+            summary['events'][event['tag']] = summary['events'].get(event['tag'], 0) + 1
+            if on_event:
+                # 事件发生在轮次推进之后，和界面一样记为下一轮
+                on_event(state.round, event)
+        yield summary
@@ -0,0 +1,108 @@
+"""虚拟化的生产明细列表
+
+Treeview 只保留可见的那几行控件，滚动时原地改写它们的内容，
+完整明细从 HistoryStore 按需读取。无论游戏进行了多少轮，
+插入和滚动的开销都只和可见行数有关。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+class ProductionLog:
+    def __init__(self, parent, history, format_row, row_lines=3):
+        """format_row(record) -> 明细文本；row_lines 为每条明细的行数，用于固定行高"""
+        self.history = history
+        self.format_row = format_row
+        self.row_height = 30 + (row_lines - 1) * 15
+        self.visible_rows = 1
+        self.top = 0  # 第一条可见记录在历史中的下标
+        self.follow = True  # 在底部时新记录自动滚入
+        self.items = []
+        self.shown = []  # 各行当前显示的内容
+
+        # 行高只在这里配置一次，避免每轮重排所有行
+        style = ttk.Style()
+        style.configure("Production.Treeview", rowheight=self.row_height)
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=('round', 'details'),
+                                 show='headings', selectmode='none',  # 禁用选择
+                                 style="Production.Treeview", height=1)
+        self.tree.heading('round', text='轮次', anchor=tk.CENTER)
+        self.tree.heading('details', text='生产结果', anchor=tk.W)
+        self.tree.column('round', width=80, anchor=tk.CENTER)
+        self.tree.column('details', width=350, anchor=tk.W)
+
+        # 斑马线样式
+        self.tree.tag_configure('even', background='#F5F5F5')
+        self.tree.tag_configure('odd', background='#FFFFFF')
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.top - 1))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.top + 1))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def on_resize(self, event):
+        header = 25
+        rows = max(1, (event.height - header) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.scroll_to(len(self.history) - rows if self.follow else self.top)
+
+    def on_wheel(self, event):
+        self.scroll_to(self.top - (1 if event.delta > 0 else -1))
+
+    def yview(self, *args):
+        """滚动条回调：moveto fraction / scroll n units|pages"""
+        total = len(self.history)
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_rows
+            self.scroll_to(self.top + step)
+
+    def scroll_to(self, top):
+        total = len(self.history)
+        last_top = max(0, total - self.visible_rows)
+        self.top = min(max(0, top), last_top)
+        self.follow = self.top >= last_top
+        self.render()
+
+    def refresh(self):
+        """新增一轮后调用"""
+        if self.follow:
+            self.top = max(0, len(self.history) - self.visible_rows)
+        self.render()
+
+    def render(self):
+        total = len(self.history)
+        needed = min(self.visible_rows, total - self.top)
+        while len(self.items) < needed:
+            self.items.append(self.tree.insert('', 'end'))
+        while len(self.items) > needed:
+            self.tree.delete(self.items.pop())
+
+        del self.shown[needed:]
+        for k, item in enumerate(self.items):
+            record = self.history[self.top + k]
+            values = (record['round'], self.format_row(record))
+            # 内容没变的行不再改写（撤销/重做后往往只差最后几行）
+            if k < len(self.shown) and self.shown[k] == values:
+                continue
+            tag = 'even' if record['round'] % 2 == 0 else 'odd'
+            self.tree.item(item, values=values, tags=(tag,))
+            self.shown[k:k + 1] = [values]
+
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + needed) / total)
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,213 @@
+"""“开始生产”各阶段计时与调试面板
+
+PhaseTimer 把每轮各阶段的耗时写进预先分配好的环形缓冲区（最近 capacity 轮），
+每个阶段只多一次 perf_counter 和一次数组赋值。阶段按顺序用 lap() 结束：
+    timer.start(round_no)
+    ...解析输入...
+    timer.lap('parse')
+    ...
+    timer.stop()
+也可以在 stop() 之后用 late() 补记本轮的收尾阶段（例如 Tk 空闲时才做的重绘）。
+
+ProfilePanel 是隐藏的调试窗口（Ctrl+Shift+D，或启动时设置环境变量 ECONGAME_PROFILE=1），
+显示各阶段耗时的 p50/p95，可导出 CSV，也可以只在生产回合内开启 cProfile 并保存结果。
+"""
+import cProfile
+import csv
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+import numpy as np
+
+
+class PhaseTimer:
+    def __init__(self, phases, capacity=1000):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.capacity = capacity
+        self.samples = np.full((capacity, len(self.phases)), np.nan)  # 秒
+        self.rounds = np.zeros(capacity, dtype=np.int64)
+        self.count = 0  # 已完成的轮数（含被覆盖的）
+        self.row = None
+        self.last = 0.0
+        self.profile = None
+
+    def start(self, round_no):
+        self.row = self.count % self.capacity
+        self.samples[self.row] = np.nan
+        self.rounds[self.row] = round_no
+        if self.profile is not None:
+            self.profile.enable()
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """记录上一个计时点到现在的耗时，计入 phase"""
+        now = time.perf_counter()
+        self.samples[self.row, self.index[phase]] = now - self.last
+        self.last = now
+
+    def stop(self):
+        """结束本轮，返回本轮的编号，供 late() 使用"""
+        if self.profile is not None:
+            self.profile.disable()
+        self.row = None
+        self.count += 1
+        self.last = time.perf_counter()
+        return self.count - 1
+
+    def late(self, token, phase):
+        """给 stop() 返回的那一轮补记从 stop 到现在的耗时；之后又开始了新一轮则不记"""
+        if token != self.count - 1 or self.row is not None:
+            return
+        self.samples[token % self.capacity, self.index[phase]] = time.perf_counter() - self.last
+
+    def filled(self):
+        """按时间顺序返回 (轮次, 耗时) 两个数组"""
+        n = min(self.count, self.capacity)
+        order = (np.arange(n) + self.count - n) % self.capacity
+        return self.rounds[order], self.samples[order]
+
+    def stats(self):
+        """每个阶段的 {phase, n, p50, p95, max, last}，单位毫秒；包括合计 'total'"""
+        _, samples = self.filled()
+        total = np.where(np.all(np.isnan(samples), axis=1), np.nan, np.nansum(samples, axis=1))
+        columns = [(phase, samples[:, i]) for i, phase in enumerate(self.phases)] + [('total', total)]
+        rows = []
+        for phase, values in columns:
+            values = values[~np.isnan(values)] * 1000
+            if len(values):
+                p50, p95 = np.percentile(values, [50, 95])
+                rows.append({'phase': phase, 'n': len(values), 'p50': p50, 'p95': p95,
+                             'max': values.max(), 'last': values[-1]})
+            else:
+                rows.append({'phase': phase, 'n': 0, 'p50': np.nan, 'p95': np.nan,
+                             'max': np.nan, 'last': np.nan})
+        return rows
+
+    def to_csv(self, path):
+        """每轮一行，各阶段耗时（毫秒），缺失的阶段留空"""
+        rounds, samples = self.filled()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['round'] + [f'{phase}_ms' for phase in self.phases])
+            for round_no, row in zip(rounds, samples):
+                writer.writerow([int(round_no)] + ['' if np.isnan(v) else f'{v * 1000:.3f}' for v in row])
+
+    def clear(self):
+        self.samples[:] = np.nan
+        self.count = 0
+
+    def start_profile(self):
+        """之后每轮 start() 到 stop() 之间开启 cProfile"""
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+
+    def stop_profile(self):
+        profile, self.profile = self.profile, None
+        return profile
+
+
+class ProfilePanel:
+    COLUMNS = [('phase', '阶段', 120), ('n', '轮数', 50), ('p50', 'p50 (ms)', 80),
+               ('p95', 'p95 (ms)', 80), ('max', '最大 (ms)', 80), ('last', '最近 (ms)', 80)]
+
+    def __init__(self, master, timer, phase_names=None, interval=1000):
+        self.master = master
+        self.timer = timer
+        self.phase_names = dict(phase_names or {}, total='合计')
+        self.interval = interval
+        self.window = None
+        self.visible = False
+        self.refresh_after = None
+        self.last_profile = None
+
+    def toggle(self, event=None):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        if self.window is None:
+            self.create_window()
+        self.visible = True
+        self.window.deiconify()
+        self.window.lift()
+        self.refresh()
+
+    def hide(self):
+        self.visible = False
+        self.window.withdraw()
+
+    def create_window(self):
+        self.window = tk.Toplevel(self.master)
+        self.window.title("性能调试")
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.tree = ttk.Treeview(self.window, columns=[c[0] for c in self.COLUMNS], show='headings',
+                                 height=len(self.timer.phases) + 1, selectmode='none')
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor=tk.W if key == 'phase' else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.items = {}
+        for phase in self.timer.phases + ['total']:
+            self.items[phase] = self.tree.insert('', tk.END, values=[self.phase_names.get(phase, phase)])
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill=tk.X, padx=5, pady=(0, 5))
+        tk.Button(buttons, text="导出 CSV…", command=self.export_csv).pack(side=tk.LEFT)
+        self.profile_btn = tk.Button(buttons, text="开始 cProfile", command=self.toggle_profile)
+        self.profile_btn.pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="保存 cProfile…", command=self.save_profile).pack(side=tk.LEFT)
+        tk.Button(buttons, text="清空", command=self.clear).pack(side=tk.RIGHT)
+
+    def refresh(self):
+        """窗口可见时每隔 interval 毫秒刷新一次"""
+        if self.refresh_after is not None:
+            self.window.after_cancel(self.refresh_after)
+            self.refresh_after = None
+        if not self.visible:
+            return
+        self.update_rows()
+        self.refresh_after = self.window.after(self.interval, self.refresh)
+
+    def update_rows(self):
+        for row in self.timer.stats():
+            values = [self.phase_names.get(row['phase'], row['phase']), row['n']]
+            values += ['' if np.isnan(row[key]) else f"{row[key]:.2f}" for key in ('p50', 'p95', 'max', 'last')]
+            self.tree.item(self.items[row['phase']], values=values)
+
+    def export_csv(self):
+        path = filedialog.asksaveasfilename(parent=self.window, title="导出阶段耗时", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")])
+        if path:
+            try:
+                self.timer.to_csv(path)
+            except OSError as e:
+                messagebox.showerror("导出失败", str(e), parent=self.window)
+
+    def toggle_profile(self):
+        if self.timer.profile is None:
+            self.timer.start_profile()
+            self.profile_btn.config(text="停止 cProfile")
+        else:
+            self.last_profile = self.timer.stop_profile()
+            self.profile_btn.config(text="开始 cProfile")
+
+    def save_profile(self):
+        profile = self.timer.profile or self.last_profile
+        if profile is None:
+            messagebox.showinfo("cProfile", "请先开始 cProfile 并进行几轮生产", parent=self.window)
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, title="保存 cProfile 结果",
+                                            defaultextension=".prof", filetypes=[("cProfile", "*.prof")])
+        if path:
+            try:
+                profile.dump_stats(path)
+            except OSError as e:
+                messagebox.showerror("保存失败", str(e), parent=self.window)
+
+    def clear(self):
+        self.timer.clear()
+        self.update_rows()
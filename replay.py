@@ -0,0 +1,144 @@
+"""玩家操作日志与无界面回放
+
+一局游戏完全由“种子 + 操作序列”决定：随机事件来自 GameState 自己的随机数流，
+操作只有两种——提交生产分配（start_production）和市场采购（buy_resources）。
+ActionLog 只追加记录成功执行的操作；replay 从种子重新结算到任意一轮，
+用于核对有争议的成绩，或代替保存整局快照。
+
+日志文件为 JSON Lines：首行 {"version": 1, "seed": ..., "params": {...}, "economy": {...}}，
+之后每行一条操作（params 只记与默认值不同的平衡参数，economy 只在不是默认经济模型时写入）
+    ["p", [行业数×资源数个分配，按 行业×资源 顺序]]   生产
+    ["b", [各可购买资源的数量]]                       采购
+    ["t", n]                                          撤销：只保留前 n 条操作
+用法: python replay.py 日志.jsonl [--round N]
+"""
+import argparse
+import json
+
+from economy import Economy
+from game_engine import (GameState, GameParams, DEFAULTS, DEFAULT_ECONOMY, play_round,
+                         purchase_cost, apply_purchase)
+
+LOG_VERSION = 1
+PRODUCE, BUY, TRUNCATE = 'p', 'b', 't'
+
+
+def pack_allocations(allocations, economy=DEFAULT_ECONOMY):
+    return [allocations[s][r] for s in economy.sectors for r in economy.resources]
+
+
+def unpack_allocations(values, economy=DEFAULT_ECONOMY):
+    it = iter(values)
+    return {s: {r: next(it) for r in economy.resources} for s in economy.sectors}
+
+
+class ActionLog:
+    def __init__(self, seed, actions=None, path=None, params=DEFAULTS, replayable=True):
+        """path 不为空时每条操作同时追加写入文件（行缓冲，崩溃也只丢最后一行）。
+        replayable 为 False 表示不是从第一轮开始记的（读入没有操作记录的旧存档后），
+        从种子重放会得到别的结果，只供撤销/重做使用，不写进存档"""
+        self.seed = seed
+        self.params = params
+        self.replayable = replayable
+        self.actions = list(actions or [])
+        self.file = None
+        if path:
+            self.file = open(path, 'a', encoding='utf-8', buffering=1)
+            if self.file.tell() == 0:
+                head = {'version': LOG_VERSION, 'seed': seed}
+                if params.changed():
+                    head['params'] = params.changed()
+                if params.economy != DEFAULT_ECONOMY:
+                    head['economy'] = params.economy.to_dict()
+                self.file.write(json.dumps(head) + '\n')
+
+    def _append(self, action):
+        self.actions.append(action)
+        if self.file:
+            self.file.write(json.dumps(action) + '\n')
+
+    def record_produce(self, allocations):
+        self._append((PRODUCE, pack_allocations(allocations, self.params.economy)))
+
+    def record_buy(self, purchased):
+        self._append((BUY, [purchased[r] for r in self.params.economy.tradable]))
+
+    def truncate(self, n):
+        """撤销时丢掉第 n 条之后的操作；文件只追加一行截断标记。
+        换成新列表而不是原地删除，已提交给后台存档的快照仍引用旧列表"""
+        self.actions = self.actions[:n]
+        if self.file:
+            self.file.write(json.dumps((TRUNCATE, n)) + '\n')
+
+    def extend(self, actions):
+        """重做时接回撤销掉的操作"""
+        for action in actions:
+            self._append(action)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            head = json.loads(f.readline())
+            if head.get('version', 0) > LOG_VERSION:
+                raise ValueError(f"操作日志版本过新（{head['version']}）")
+            actions = []
+            for line in f:
+                if not line.strip():
+                    continue
+                kind, values = json.loads(line)
+                if kind == TRUNCATE:
+                    del actions[values:]
+                else:
+                    actions.append((kind, values))
+        economy = Economy(head['economy']) if 'economy' in head else None
+        return cls(head['seed'], actions, params=GameParams(economy, **head.get('params', {})))
+
+
+def replay(seed, actions, upto_round=None, on_record=None, on_event=None, params=DEFAULTS):
+    """从种子重放操作，返回 GameState；upto_round 给定时停在该轮开始之前（尚未采购/生产）"""
+    state = GameState(seed=seed, params=params)
+    for kind, values in actions:
+        if upto_round is not None and state.round >= upto_round:
+            break
+        record, event = apply_action(state, kind, values)
+        if record is not None and on_record:
+            on_record(record)
+        if event and on_event:
+            on_event(state.round, event)
+    return state
+
+
+def apply_action(state, kind, values):
+    """在 state 上执行一条日志里的操作；生产返回 (记录, 事件)，采购返回 (None, None)"""
+    economy = state.economy
+    if kind == PRODUCE:
+        return play_round(state, unpack_allocations(values, economy))
+    if kind == BUY:
+        purchased = dict(zip(economy.tradable, values))
+        apply_purchase(state, purchased, purchase_cost(state.prices, purchased, state.params))
+        return None, None
+    raise ValueError(f"未知操作类型: {kind!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从操作日志重建游戏状态")
+    parser.add_argument('log')
+    parser.add_argument('--round', type=int, default=None, help="重建到该轮开始时的状态")
+    args = parser.parse_args()
+
+    log = ActionLog.load(args.log)
+    state = replay(log.seed, log.actions, args.round, params=log.params)
+    print(f"种子 {log.seed}，共 {len(log.actions)} 条操作")
+    print(f"第 {state.round} 轮")
+    print("资源: " + "  ".join(f"{r}={v:.2f}" for r, v in state.resources.items()))
+    print("价格: " + "  ".join(f"{r}={v:.2f}" for r, v in state.prices.items()))
+    print("效率: " + "  ".join(f"{s}={v:.2f}" for s, v in state.efficiency.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""存档读写与后台自动存档
+
+文件格式（小端），版本 2：
+    8 字节魔数 b'ECONSAVE' | uint32 版本 | uint32 头部长度
+    段表 4 × uint64：历史段、事件段、操作段的偏移与文件结尾
+    JSON 头部：资源/价格/效率/轮次、市场波动状态、种子与随机数状态、平衡参数与经济模型、历史列布局与汇总
+    历史段：float64 行，n_rows × n_cols，64 字节对齐，可直接 memmap
+    事件段：每行一条 JSON [轮次, 标签, 文本]
+    操作段：每行一条 JSON 操作，格式同 replay.ActionLog；操作记录不能从种子重放时为空，头部 actions 为 null
+版本 1 没有段表和操作段，偏移写在 JSON 头部里，事件段一直到文件结尾，仍可读取。
+读档时只解析头部，历史段映射为只读数组按需分页读入。
+写入先写临时文件再 os.replace，写到一半崩溃也不会损坏原存档。
+"""
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from economy import Economy
+from game_engine import GameState, GameParams, DEFAULT_ECONOMY
+from replay import ActionLog
+
+MAGIC = b'ECONSAVE'
+SAVE_VERSION = 2
+PREFIX = struct.Struct('<8sII')
+SECTIONS = struct.Struct('<4Q')
+ALIGN = 64
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def take_snapshot(state, history, event_records, action_log=None):
+    """在界面线程调用：只复制小状态，历史、事件和操作只记下引用与长度
+    （列表只追加；撤销时换成新列表，不会改动这里引用的旧列表）。
+    历史行撤销后再追加会被原地覆盖，写盘线程写完后用 rows_intact 检查，被改写过则放弃这一份"""
+    generation = history.generation
+    replayable = action_log is not None and action_log.replayable
+    return {
+        'state': state.copy(),
+        'history_chunks': history.row_chunks(),
+        'history_intact': lambda n_rows: history.rows_intact(generation, n_rows),
+        'history_layout': {
+            'sectors': history.sectors,
+            'resources': history.resources,
+            'fields': {name: [f.start, f.stop] for name, f in history.fields.items()},
+            'n_cols': history.n_cols,
+            'aggregates': history.aggregates(),
+        },
+        'events': event_records,
+        'n_events': len(event_records),
+        'replayable': replayable,
+        'actions': action_log.actions if replayable else [],
+        'n_actions': len(action_log.actions) if replayable else 0,
+    }
+
+
+def write_save(path, snapshot):
+    """写入存档；写的过程中历史被撤销改写时放弃本次写入并返回 False
+    （撤销之后总会提交新的快照）"""
+    state = snapshot['state']
+    # 取出后在替换文件前释放，避免仍映射着旧存档（Windows 下无法替换已映射的文件）
+    chunks = snapshot.pop('history_chunks')
+    n_rows = sum(len(chunk) for chunk in chunks)
+    header = {
+        'version': SAVE_VERSION,
+        'round': state.round,
+        'regime': state.regime,
+        'resources': state.resources,
+        'prices': state.prices,
+        'efficiency': state.efficiency,
+        'seed': state.seed,
+        'rng_state': state.rng.getstate(),
+        'params': state.params.changed(),
+        'economy': state.economy.to_dict() if state.economy != DEFAULT_ECONOMY else None,
+        'history': dict(snapshot['history_layout'], n_rows=n_rows),
+        'events': {'count': snapshot['n_events']},
+        'actions': {'count': snapshot['n_actions']} if snapshot['replayable'] else None,
+    }
+    data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, SAVE_VERSION, len(data)))
+        f.write(SECTIONS.pack(0, 0, 0, 0))  # 写完各段后回填
+        f.write(data)
+        history_offset = _align(f.tell())
+        f.write(b'\0' * (history_offset - f.tell()))
+        for chunk in chunks:
+            f.write(np.ascontiguousarray(chunk, dtype='<f8').tobytes())
+        del chunks
+        if not snapshot['history_intact'](n_rows):
+            f.close()
+            os.remove(tmp_path)
+            return False
+
+        events_offset = f.tell()
+        events = snapshot['events']
+        for i in range(snapshot['n_events']):
+            f.write(json.dumps(events[i], ensure_ascii=False).encode('utf-8') + b'\n')
+
+        actions_offset = f.tell()
+        actions = snapshot['actions']
+        for i in range(snapshot['n_actions']):
+            f.write(json.dumps(actions[i]).encode('utf-8') + b'\n')
+
+        end = f.tell()
+        f.seek(PREFIX.size)
+        f.write(SECTIONS.pack(history_offset, events_offset, actions_offset, end))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return True
+
+
+class SaveFile:
+    """打开存档只读头部，历史和事件按需读取"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            prefix = f.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                raise ValueError("不是有效的存档文件")
+            magic, version, size = PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError("不是有效的存档文件")
+            if version > SAVE_VERSION:
+                raise ValueError(f"存档版本过新（{version}），请升级游戏")
+            self.version = version
+            if version >= 2:
+                self.history_offset, self.events_offset, self.actions_offset, self.end = \
+                    SECTIONS.unpack(f.read(SECTIONS.size))
+            self.header = json.loads(f.read(size).decode('utf-8'))
+        if version < 2:
+            # 版本 1：偏移在头部里，事件段到文件结尾，没有操作段
+            self.history_offset = self.header['history']['offset']
+            self.events_offset = self.header['events']['offset']
+            self.actions_offset = self.end = None
+
+    def params(self):
+        h = self.header
+        economy = Economy(h['economy']) if h.get('economy') else None
+        return GameParams(economy, **h.get('params', {}))
+
+    def state(self):
+        h = self.header
+        state = GameState(h['resources'], h['prices'], h['efficiency'], h['round'], h.get('seed'),
+                          self.params(), h.get('regime', 0))
+        if h.get('rng_state'):
+            version, internal, gauss = h['rng_state']
+            state.rng.setstate((version, tuple(internal), gauss))
+        return state
+
+    def history_rows(self):
+        meta = self.header['history']
+        if meta['n_rows'] == 0:
+            return np.zeros((0, meta['n_cols']))
+        return np.memmap(self.path, dtype='<f8', mode='r', offset=self.history_offset,
+                         shape=(meta['n_rows'], meta['n_cols']))
+
+    def _lines(self, start, stop):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if stop is not None and start >= stop:
+                    break
+                start += len(line)
+                yield json.loads(line)
+
+    def events(self):
+        """逐条读取事件 (轮次, 标签, 文本)"""
+        for round_no, tag, message in self._lines(self.events_offset, self.actions_offset):
+            yield round_no, tag, message
+
+    def action_log(self):
+        """版本 1 的存档和不能从种子重放的存档没有操作记录，返回 None"""
+        if self.actions_offset is None or 'seed' not in self.header \
+                or self.header.get('actions') is None:
+            return None
+        actions = [tuple(action) for action in self._lines(self.actions_offset, self.end)]
+        return ActionLog(self.header['seed'], actions, params=self.params())
+
+    def load_history(self, history):
+        """把存档历史挂到一个空的 HistoryStore 上（需启用 spill，列布局一致）"""
+        meta = self.header['history']
+        fields = {name: [f.start, f.stop] for name, f in history.fields.items()}
+        if meta['fields'] != fields or meta['sectors'] != history.sectors \
+                or meta['resources'] != history.resources:
+            raise ValueError("存档的历史列布局与当前游戏不一致")
+        history.attach_base(self.history_rows(), meta['aggregates'])
+
+
+class AutoSaver:
+    """后台写存档：提交的快照只保留最新一份，写盘不阻塞界面线程"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cond = threading.Condition()
+        self.pending = None
+        self.tasks = []
+        self.error = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name='autosave', daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        with self.cond:
+            self.pending = snapshot
+            self.cond.notify()
+
+    def run_task(self, func):
+        """在写盘线程上执行（排在下一次写盘之前），如读档后的 absorb_base"""
+        with self.cond:
+            self.tasks.append(func)
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and not self.tasks and not self.stopped:
+                    self.cond.wait()
+                if self.stopped and self.pending is None and not self.tasks:
+                    return
+                tasks, self.tasks = self.tasks, []
+                snapshot, self.pending = self.pending, None
+            # 各项分别捕获：一个任务（如归档）失败不影响后面的任务和这份快照
+            error = None
+            for func in tasks:
+                try:
+                    func()
+                except (OSError, ValueError) as e:
+                    error = e
+            if snapshot is not None:
+                try:
+                    write_save(self.path, snapshot)
+                except (OSError, ValueError) as e:
+                    error = e
+            self.error = error
+
+    def close(self, timeout=None):
+        """做完剩下的任务、写完最后一份快照再退出；默认一直等到写完，
+        关闭时的最后一次归档和存档不会因为磁盘慢而丢掉"""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        self.thread.join(timeout)
@@ -0,0 +1,131 @@
+"""玩家策略接口
+
+策略每轮只看到可见状态（Observation：资源、价格、效率、轮次、市场波动状态，以及经济模型和使用上限），
+返回本轮的 (分配, 采购)。Observation.price_scenarios 给出从当前状态出发的价格情景（见 forecast.py）。
+采购先于生产执行，规则与窗口里的 buy_resources / start_production 相同：
+资金不足或有负数时采购作废，分配超过上限时本轮不生产。
+
+自定义策略继承 Strategy 并实现 decide，用 "模块:类名" 交给 tournament.py，例如
+    python tournament.py mybots:Hoarder optimal
+"""
+import importlib
+
+import numpy as np
+
+from forecast import price_scenarios
+from policies import repeat_last, proportional, optimal, restock
+
+
+class Observation:
+    """策略能看到的状态；字典都是副本，改了也不影响对局"""
+
+    def __init__(self, state):
+        self.resources = dict(state.resources)
+        self.prices = dict(state.prices)
+        self.efficiency = dict(state.efficiency)
+        self.round = state.round
+        self.regime = state.regime
+        self.economy = state.economy
+        self.params = state.params
+
+    @property
+    def usage_cap(self):
+        return self.params.usage_cap
+
+    def price_scenarios(self, rounds=10, paths=2000):
+        """(paths, rounds + 1, 可购买资源数) 的价格情景，第0步为当前价格；按状态缓存，只读"""
+        return price_scenarios(self, rounds, paths)
+
+
+class Strategy:
+    name = '策略'
+
+    def reset(self, economy, params):
+        """每局开始前调用"""
+
+    def decide(self, obs):
+        """返回 (allocations, purchased)；purchased 为 {可购买资源: 数量}，不买可返回 None"""
+        raise NotImplementedError
+
+
+class _Scratch:
+    """给 policies 里的函数用的最小状态对象"""
+
+    def __init__(self, obs):
+        self.resources = obs.resources
+        self.prices = obs.prices
+        self.efficiency = obs.efficiency
+        self.economy = obs.economy
+        self.params = obs.params
+
+
+class PolicyStrategy(Strategy):
+    """把快进用的分配策略包装成 Strategy；restock 为 True 时先把可购买资源补回初始数量"""
+
+    def __init__(self, name, policy, restock=True, reserve=0.5):
+        self.name = name
+        self.policy = policy
+        self.restock = restock
+        self.reserve = reserve
+
+    def reset(self, economy, params):
+        self.last = None
+
+    def decide(self, obs):
+        scratch = _Scratch(obs)
+        purchased = None
+        if self.restock:
+            # restock 直接改 scratch 的资源，之后的分配按采购后的数量算
+            purchased = restock(scratch, self.reserve, self.restock_target(obs))
+        if self.last is None:
+            # 第一轮没有上一轮，先把各资源平均分给各行业
+            zeros = {s: {r: 0.0 for r in obs.economy.resources} for s in obs.economy.sectors}
+            self.last = proportional(scratch, zeros)
+        self.last = self.policy(scratch, self.last)
+        return self.last, purchased
+
+    def restock_target(self, obs):
+        """补货的目标数量，None 为初始数量"""
+        return None
+
+
+class TimedRestockStrategy(PolicyStrategy):
+    """看价格情景择时补货：当前价格不高于之后 horizon 轮的中位价格时才补这种资源，否则等它回落"""
+
+    def __init__(self, name, policy, horizon=3, reserve=0.5):
+        super().__init__(name, policy, reserve=reserve)
+        self.horizon = horizon
+
+    def restock_target(self, obs):
+        median = np.median(obs.price_scenarios(self.horizon)[:, 1:], axis=(0, 1))
+        target = {}
+        for res, expected in zip(obs.economy.tradable, median):
+            cheap = obs.prices[res] <= expected
+            target[res] = obs.economy.initial_resources[res] if cheap else obs.resources[res]
+        return target
+
+
+STRATEGIES = {
+    'optimal': lambda: PolicyStrategy('最优+补货', optimal),
+    'optimal-nobuy': lambda: PolicyStrategy('最优', optimal, restock=False),
+    'proportional': lambda: PolicyStrategy('按比例+补货', proportional),
+    'repeat': lambda: PolicyStrategy('重复上轮+补货', repeat_last),
+    'optimal-timed': lambda: TimedRestockStrategy('最优+择时补货', optimal),
+}
+
+
+def load_strategy(spec):
+    """内置名称（见 STRATEGIES）或 "模块:类名"，返回新的策略实例"""
+    if spec in STRATEGIES:
+        return STRATEGIES[spec]()
+    module_name, sep, class_name = spec.partition(':')
+    if not sep:
+        raise ValueError(f"未知策略: {spec}（内置: {', '.join(STRATEGIES)}，或用 模块:类名）")
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"无法加载策略 {spec}: {e}")
+    strategy = cls()
+    if not isinstance(strategy, Strategy):
+        raise ValueError(f"{spec} 不是 Strategy 的子类")
+    return strategy
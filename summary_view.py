@@ -0,0 +1,105 @@
+"""五轮总结窗口
+
+整局只有一个总结窗口：关闭时只是隐藏，下次总结原地换图。
+趋势图在后台线程上用 Agg 画成位图（一个 Figure 反复重画），
+主线程拿到像素后只需把它写进同一个 PhotoImage，点击“开始生产”时不必等待绘图，
+也不会每五轮多出一个窗口和一份图表内存。
+"""
+import math
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SIZE = (7, 5)  # 英寸
+DPI = 100
+
+
+class SummaryRenderer:
+    """只在后台线程里使用：持有一个 Agg Figure，每次清空坐标轴后重画"""
+
+    def __init__(self, load_figure):
+        self.load_figure = load_figure
+        self.figure = None
+
+    def render(self, rounds, results, sectors, colors):
+        """rounds 为横轴标签，results 为 (轮数, 行业) 数组；返回 PPM 图像数据"""
+        if self.figure is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            Figure = self.load_figure()
+            self.figure = Figure(figsize=SIZE, dpi=DPI)
+            FigureCanvasAgg(self.figure)
+            self.ax = self.figure.add_subplot(111)
+        ax = self.ax
+        ax.clear()
+
+        # 资源分配趋势图
+        for i, sector in enumerate(sectors):
+            ax.plot(rounds, results[:, i], 'o-', label=sector, color=colors[sector])
+
+        ax.set_title('五轮生产结果趋势')
+        ax.set_ylabel('生产收益 (¥)')
+        ax.set_xlabel('轮次')
+        ax.legend(fontsize=9 if len(sectors) <= 6 else 7, ncol=math.ceil(len(sectors) / 8))
+        ax.grid(True, linestyle='--', alpha=0.6)
+
+        self.figure.tight_layout()
+        canvas = self.figure.canvas
+        canvas.draw()
+        width, height = canvas.get_width_height()
+        rgb = np.asarray(canvas.buffer_rgba())[:, :, :3]
+        return f"P6 {width} {height} 255\n".encode('ascii') + rgb.tobytes()
+
+
+class SummaryView:
+    def __init__(self, master, load_figure):
+        """load_figure() 返回 matplotlib 的 Figure 类，会在后台线程里调用"""
+        self.master = master
+        self.renderer = SummaryRenderer(load_figure)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='summary')
+        self.window = None
+        self.photo = None
+        self.future = None
+        self.title = ''
+
+    def show(self, title, rounds, results, sectors, colors):
+        """提交一次总结；数据先复制，后台线程不碰界面持有的历史"""
+        if self.future is not None and self.future.cancel():
+            # 上一张还没开始画就被新的总结取代
+            self.future = None
+        self.title = title
+        self.future = self.executor.submit(self.renderer.render, list(rounds), np.array(results),
+                                           list(sectors), dict(colors))
+        self.master.after(50, self.poll, self.future)
+
+    def poll(self, future):
+        if future is not self.future:
+            return
+        if not future.done():
+            self.master.after(50, self.poll, future)
+            return
+        self.future = None
+        self.blit(future.result())
+
+    def blit(self, image):
+        if self.window is None:
+            self.create_window()
+        self.photo.configure(data=image, format='PPM')
+        self.window.title(self.title)
+        self.window.deiconify()
+        self.window.lift()
+
+    def create_window(self):
+        self.window = tk.Toplevel(self.master)
+        self.window.geometry(f"{SIZE[0] * DPI}x{SIZE[1] * DPI}")
+        self.window.withdraw()
+        # 居中显示
+        x = (self.window.winfo_screenwidth() - SIZE[0] * DPI) // 2
+        y = (self.window.winfo_screenheight() - SIZE[1] * DPI) // 2
+        self.window.geometry(f'+{x}+{y}')
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
+        self.photo = tk.PhotoImage(master=self.window)
+        tk.Label(self.window, image=self.photo, bg='white').pack(fill=tk.BOTH, expand=True)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
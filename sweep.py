@@ -0,0 +1,154 @@
+"""平衡参数网格扫描
+
+对每组参数用无界面的模拟玩家跑若干局，统计平均最终资金、各行业收入占比与
+主导率、破产率，逐组写入 CSV（或结束时写 Parquet，需要 pyarrow）。
+各组参数在多个进程里并行计算；同一编号的对局在所有参数组里使用同一个种子，
+组间差异只来自参数本身。
+
+模拟玩家每轮按策略分配（见 policies.POLICIES），轮与轮之间用 restock
+把劳动力和土地补回初始数量。破产指最后一轮没有任何产出且资金低于初始资金。
+
+用法:
+    python sweep.py --grid agri_scale=2,2.5,3 --grid subsidy_prob=0.1,0.25 \\
+        --games 200 --rounds 30 --policy optimal --out sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from economy import Economy
+from game_engine import GameState, GameParams
+from policies import POLICIES, proportional, run_rounds, restock
+
+POLICY_ALIASES = {'repeat': '重复上轮', 'proportional': '按比例', 'optimal': '最优'}
+
+
+def stat_fields(economy):
+    return (['games', 'mean_final_capital', 'std_final_capital', 'mean_total_income', 'bankruptcy_rate']
+            + [f'share_{s}' for s in economy.sectors] + [f'dominant_{s}' for s in economy.sectors])
+
+
+def parse_grid(specs, base):
+    """['key=v1,v2', ...] -> 参数名列表与取值组合；参数名须是 base 里有的"""
+    known = base.to_dict()
+    names, values = [], []
+    for spec in specs:
+        name, sep, raw = spec.partition('=')
+        name = name.strip()
+        if not sep or not raw:
+            raise ValueError(f"网格格式应为 名称=值1,值2,...：{spec}")
+        if name not in known:
+            raise ValueError(f"未知参数: {name}")
+        names.append(name)
+        values.append([float(v) for v in raw.split(',')])
+    return names, list(itertools.product(*values))
+
+
+def simulate(params, games, rounds, policy_name, seed):
+    """用一组参数跑 games 局，返回统计字典"""
+    policy = POLICIES[policy_name]
+    economy = params.economy
+    sectors = economy.sectors
+    finals, incomes, bankrupt = [], [], 0
+    sector_totals = {s: 0.0 for s in sectors}
+    dominant = {s: 0 for s in sectors}
+    for i in range(games):
+        state = GameState(seed=seed + i, params=params)
+        # 第一轮没有“上一轮”，以各资源平均分给各行业作为起点
+        allocations = proportional(state, {s: {r: 0.0 for r in economy.resources} for s in sectors})
+        last = {'total_income': 0.0}
+        summary = {}
+        for _ in run_rounds(state, policy, rounds, allocations, on_record=last.update, summary=summary):
+            if summary['rounds'] < rounds:
+                restock(state)
+        finals.append(state.resources['capital'])
+        incomes.append(summary['total_income'])
+        for s in sectors:
+            sector_totals[s] += summary['sector_totals'][s]
+        if summary['total_income'] > 0:
+            dominant[max(sectors, key=summary['sector_totals'].get)] += 1
+        if last['total_income'] == 0 and state.resources['capital'] < economy.initial_resources['capital']:
+            bankrupt += 1
+
+    grand_total = sum(sector_totals.values())
+    stats = {
+        'games': games,
+        'mean_final_capital': statistics.fmean(finals),
+        'std_final_capital': statistics.pstdev(finals),
+        'mean_total_income': statistics.fmean(incomes),
+        'bankruptcy_rate': bankrupt / games,
+    }
+    for s in sectors:
+        stats[f'share_{s}'] = sector_totals[s] / grand_total if grand_total else 0.0
+        stats[f'dominant_{s}'] = dominant[s] / games
+    return stats
+
+
+def _run_combo(names, combo, base, games, rounds, policy_name, seed):
+    params = base.replace(**dict(zip(names, combo)))
+    return dict(zip(names, combo)), simulate(params, games, rounds, policy_name, seed)
+
+
+def _write_parquet(path, rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("写 Parquet 需要安装 pyarrow，或改用 .csv 输出")
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="平衡参数网格扫描")
+    parser.add_argument('--grid', action='append', default=[], metavar='名称=值1,值2',
+                        help="要扫描的参数及取值，可重复；可用参数见 game_engine.DEFAULT_PARAMS "
+                             "和经济模型文件的 params")
+    parser.add_argument('--economy', help="经济模型 JSON 文件，默认 economies/classic.json")
+    parser.add_argument('--base', help="基准参数 JSON 文件，未扫描的参数取这里的值")
+    parser.add_argument('--games', type=int, default=100, help="每组参数的对局数")
+    parser.add_argument('--rounds', type=int, default=30, help="每局轮数")
+    parser.add_argument('--policy', default='optimal',
+                        choices=sorted(POLICY_ALIASES) + sorted(POLICIES), help="模拟玩家的分配策略")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument('--seed', type=int, default=0, help="第 i 局的种子为 seed + i")
+    parser.add_argument('--out', default='sweep.csv', help="输出文件，.csv 或 .parquet")
+    args = parser.parse_args()
+
+    try:
+        economy = Economy.load(args.economy) if args.economy else None
+        base = GameParams.load(args.base, economy) if args.base else GameParams(economy)
+        names, combos = parse_grid(args.grid, base)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    policy_name = POLICY_ALIASES.get(args.policy, args.policy)
+    parquet = args.out.endswith('.parquet')
+    fieldnames = names + stat_fields(base.economy)
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, \
+            open(os.devnull if parquet else args.out, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        futures = [pool.submit(_run_combo, names, combo, base, args.games, args.rounds,
+                               policy_name, args.seed) for combo in combos]
+        for done, future in enumerate(as_completed(futures), 1):
+            point, stats = future.result()
+            row = dict(point, **stats)
+            if parquet:
+                rows.append(row)
+            else:
+                writer.writerow(row)
+                f.flush()
+            print(f"[{done}/{len(combos)}] " + " ".join(f"{k}={v:g}" for k, v in point.items())
+                  + f"  平均资金 {stats['mean_final_capital']:.2f}  破产率 {stats['bankruptcy_rate']:.1%}",
+                  file=sys.stderr)
+    if parquet:
+        _write_parquet(args.out, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""把仓库根目录和本目录加入 sys.path；params 让测试分别在默认参数和打开市场模型时各跑一遍"""
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), HERE]
+
+from game_engine import DEFAULTS  # noqa: E402
+from helpers import MARKET_PARAMS  # noqa: E402
+
+
+@pytest.fixture(params=[DEFAULTS, MARKET_PARAMS], ids=['default', 'market'])
+def params(request):
+    return request.param
@@ -0,0 +1,73 @@
+"""测试用的对局驱动：按固定种子生成随机但合法的操作"""
+import random
+
+from game_engine import (GameParams, apply_purchase, floor_cents, play_round, purchase_cost,
+                         usage_limits)
+
+# 打开市场模型（均值回复、波动、状态切换、价格冲击），检查它也能重放、撤销、存档
+MARKET_PARAMS = GameParams(market_reversion=0.1, market_volatility=0.05, market_regime_prob=0.1,
+                           market_impact=0.002)
+
+
+class Player:
+    """像界面一样执行采购和生产，并写进操作日志、历史和事件记录（给了哪个写哪个）"""
+
+    def __init__(self, state, seed=0, log=None, history=None, events=None):
+        self.state = state
+        self.rng = random.Random(seed)
+        self.log = log
+        self.history = history
+        self.events = events
+
+    def allocation(self):
+        """每种资源随机分给各行业，合计不超过90%上限"""
+        state, rng = self.state, self.rng
+        limits = usage_limits(state.resources, state.params)
+        sectors = state.economy.sectors
+        allocations = {s: {} for s in sectors}
+        for res in state.economy.resources:
+            weights = [rng.random() for _ in sectors]
+            share = rng.uniform(0.3, 0.95) / sum(weights)
+            for sector, weight in zip(sectors, weights):
+                allocations[sector][res] = floor_cents(limits[res] * weight * share)
+        return allocations
+
+    def buy(self):
+        """花掉至多一成资金买可购买资源，返回是否成交"""
+        state = self.state
+        market = state.params.market
+        tradable = state.economy.tradable
+        budget = state.resources['capital'] * 0.1 * self.rng.random() / len(tradable)
+        purchased = {r: floor_cents(market.affordable(state.prices[r], budget)) for r in tradable}
+        total_cost = purchase_cost(state.prices, purchased, state.params)
+        if total_cost > state.resources['capital']:
+            return False
+        apply_purchase(state, purchased, total_cost)
+        if self.log is not None:
+            self.log.record_buy(purchased)
+        return True
+
+    def produce(self):
+        record, event = play_round(self.state, self.allocation())
+        if self.log is not None:
+            self.log.record_produce(record['allocations'])
+        if self.history is not None:
+            self.history.append(record)
+        if event and self.events is not None:
+            self.events.records.append((record['round'], event['kind'], event['message']))
+        return record
+
+    def play(self, rounds):
+        """每轮先以一半的概率采购，再生产；返回各轮的历史记录"""
+        records = []
+        for _ in range(rounds):
+            if self.rng.random() < 0.5:
+                self.buy()
+            records.append(self.produce())
+        return records
+
+
+def state_key(state):
+    """GameState 里所有会影响之后结算的内容"""
+    return (state.round, state.regime, state.seed, dict(state.resources), dict(state.prices),
+            dict(state.efficiency), state.rng.getstate())
@@ -0,0 +1,87 @@
+"""最优分配求解：结果合法，且不差于穷举得到的最好分配"""
+import itertools
+import os
+import random
+
+import numpy as np
+import pytest
+
+from allocation_solver import solve_allocation
+from batch_engine import batch_outputs
+from economy import Economy
+from game_engine import DEFAULTS, GameParams, check_usage, compute_results
+
+ECONOMIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'economies')
+
+
+def brute_force(resources, efficiency, units, params=DEFAULTS):
+    """每种资源按 units[资源] 的整数倍分给各行业（可以不用完），去掉 check_usage 不认可的，
+    向量化求出最好的总收益"""
+    economy = params.economy
+    n_s, n_r = len(economy.sectors), len(economy.resources)
+    grids = []
+    for res in economy.resources:
+        limit = resources[res] * params.usage_cap
+        steps = int(limit / units[res] + 1e-9)
+        splits = [c for c in itertools.product(range(steps + 1), repeat=n_s) if sum(c) <= steps]
+        grids.append(np.array(splits) * units[res])
+    index = np.indices(tuple(len(g) for g in grids)).reshape(n_r, -1)
+    allocations = np.stack([grids[j][index[j]] for j in range(n_r)], axis=-1)  # (组合数, 行业, 资源)
+    # 与 check_usage 相同：按行业顺序从 0.0 累加后与上限比较
+    total = np.zeros(allocations.shape[::2])
+    for i in range(n_s):
+        total = total + allocations[:, i]
+    limits = np.array([resources[res] * params.usage_cap for res in economy.resources])
+    allocations = allocations[(total <= limits).all(axis=1)]
+    eff = np.array([efficiency[s] for s in economy.sectors])
+    return batch_outputs(allocations, eff, params).sum(axis=1).max()
+
+
+def assert_legal(resources, allocations, income, efficiency, params=DEFAULTS):
+    assert not check_usage(resources, allocations, params)
+    for alloc in allocations.values():
+        for value in alloc.values():
+            # 输入框只有两位小数
+            assert value >= 0 and round(value, 2) == value
+    assert income == sum(compute_results(allocations, efficiency, params).values())
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_classic_solver_matches_exhaustive_search_in_cents(seed):
+    """资源只有几分时可以按分穷举所有合法分配，求解器应当找到最优"""
+    rng = random.Random(seed)
+    economy = DEFAULTS.economy
+    resources = {res: rng.randint(1, 6) / 100 / DEFAULTS.usage_cap for res in economy.resources}
+    efficiency = {s: rng.uniform(0.6, 1.6) for s in economy.sectors}
+
+    allocations, income = solve_allocation(resources, efficiency)
+    assert_legal(resources, allocations, income, efficiency)
+    assert income >= brute_force(resources, efficiency, dict.fromkeys(economy.resources, 0.01)) \
+        * (1 - 1e-12)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_classic_solver_beats_coarse_grid(seed):
+    """正常规模的资源：不差于每种资源分成 5 份的网格上的最好分配"""
+    rng = random.Random(seed)
+    economy = DEFAULTS.economy
+    limits = {res: rng.randint(4, 40) * 5 for res in economy.resources}
+    resources = {res: limit / DEFAULTS.usage_cap for res, limit in limits.items()}
+    efficiency = {s: rng.uniform(0.6, 1.6) for s in economy.sectors}
+
+    allocations, income = solve_allocation(resources, efficiency)
+    assert_legal(resources, allocations, income, efficiency)
+    units = {res: limit / 5 for res, limit in limits.items()}
+    assert income >= brute_force(resources, efficiency, units) * (1 - 1e-12)
+
+
+@pytest.mark.parametrize('name', sorted(os.listdir(ECONOMIES)))
+def test_solver_is_legal_for_every_economy(name):
+    rng = random.Random(name)
+    params = GameParams(Economy.load(os.path.join(ECONOMIES, name)))
+    economy = params.economy
+    resources = dict(economy.initial_resources)
+    efficiency = {s: rng.uniform(0.6, 1.6) for s in economy.sectors}
+    allocations, income = solve_allocation(resources, efficiency, params=params)
+    assert_legal(resources, allocations, income, efficiency, params)
+    assert income > 0
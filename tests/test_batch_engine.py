@@ -0,0 +1,78 @@
+"""BatchEngine 的向量化结算与逐局的 game_engine 规则一致"""
+import numpy as np
+import pytest
+
+from batch_engine import BatchEngine
+from game_engine import GameState, apply_purchase, check_usage, produce, purchase_cost
+from helpers import Player
+
+
+def games(params, n=16):
+    """n 局各自走了几轮、状态各不相同的对局"""
+    states = []
+    for k in range(n):
+        state = GameState(seed=100 + k, params=params)
+        Player(state, seed=k).play(k % 7)
+        states.append(state)
+    return states
+
+
+def load(engine, states):
+    economy = engine.economy
+    for i, state in enumerate(states):
+        engine.resources[i] = [state.resources[r] for r in economy.resources]
+        engine.prices[i] = [state.prices[r] for r in economy.tradable]
+        engine.efficiency[i] = [state.efficiency[s] for s in economy.sectors]
+        engine.round[i] = state.round
+    return engine
+
+
+def test_produce_matches_engine(params):
+    states = games(params)
+    economy = params.economy
+    engine = load(BatchEngine(len(states), params=params), states)
+    allocations = [Player(state, seed=50 + i).allocation() for i, state in enumerate(states)]
+    # 一半的局故意超额，两边都应拒绝
+    for alloc in allocations[::2]:
+        alloc[economy.sectors[0]]['capital'] *= 5
+    array = np.array([economy.to_array(alloc) for alloc in allocations])
+
+    results, ok = engine.produce(array)
+    for i, (state, alloc) in enumerate(zip(states, allocations)):
+        assert ok[i] == (not check_usage(state.resources, alloc, params))
+        if not ok[i]:
+            assert not results[i].any()
+            continue
+        record = produce(state, alloc)
+        # 产出走同一个矩阵求值，逐位相同；资源的加减顺序不同，只要求近似
+        assert results[i].tolist() == [record['results'][s] for s in economy.sectors]
+        assert engine.resources[i] == pytest.approx([state.resources[r] for r in economy.resources])
+        assert engine.round[i] == state.round
+
+
+def test_buy_matches_engine(params):
+    states = games(params)
+    economy = params.economy
+    engine = load(BatchEngine(len(states), params=params), states)
+    rng = np.random.default_rng(0)
+    purchased = rng.uniform(0, 40, size=(len(states), len(economy.tradable))).round(2)
+
+    ok = engine.buy(purchased)
+    for i, state in enumerate(states):
+        order = dict(zip(economy.tradable, purchased[i].tolist()))
+        cost = purchase_cost(state.prices, order, params)
+        assert ok[i] == (cost <= state.resources['capital'])
+        if ok[i]:
+            apply_purchase(state, order, cost)
+        assert engine.resources[i] == pytest.approx([state.resources[r] for r in economy.resources])
+
+
+def test_from_state_copies_the_game(params):
+    state = games(params, n=4)[-1]
+    engine = BatchEngine.from_state(state, 3)
+    economy = params.economy
+    for i in range(3):
+        assert engine.resources[i].tolist() == [state.resources[r] for r in economy.resources]
+        assert engine.prices[i].tolist() == [state.prices[r] for r in economy.tradable]
+        assert engine.efficiency[i].tolist() == [state.efficiency[s] for s in economy.sectors]
+        assert engine.round[i] == state.round and engine.regime[i] == bool(state.regime)
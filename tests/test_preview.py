@@ -0,0 +1,75 @@
+"""实时产出预估与 compute_results 逐位一致，逐格修改和整表替换都一样"""
+import os
+import random
+
+import pytest
+
+from economy import Economy
+from game_engine import GameParams, GameState, compute_results
+from helpers import Player
+from preview import OutputPreview
+
+ECONOMIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'economies')
+
+
+@pytest.fixture(params=sorted(os.listdir(ECONOMIES)))
+def economy_params(request):
+    return GameParams(Economy.load(os.path.join(ECONOMIES, request.param)))
+
+
+def random_efficiency(params, rng):
+    return {s: rng.uniform(0.5, 1.5) for s in params.economy.sectors}
+
+
+def shown_outputs(preview):
+    return {sector: output for sector, (output, _) in preview.shown.items()}
+
+
+def test_preview_matches_compute_results(economy_params):
+    rng = random.Random(12)
+    player = Player(GameState(seed=1, params=economy_params), seed=13)
+    preview = OutputPreview(economy_params)
+    for _ in range(30):
+        allocations = player.allocation()
+        efficiency = random_efficiency(economy_params, rng)
+        preview.load(allocations)
+        preview.refresh(efficiency)
+        assert shown_outputs(preview) == compute_results(allocations, efficiency, economy_params)
+
+
+def test_preview_single_cell_edits(economy_params):
+    rng = random.Random(14)
+    economy = economy_params.economy
+    player = Player(GameState(seed=2, params=economy_params), seed=15)
+    allocations = player.allocation()
+    efficiency = random_efficiency(economy_params, rng)
+    preview = OutputPreview(economy_params)
+    preview.load(allocations)
+    preview.refresh(efficiency)
+    for _ in range(200):
+        sector, res = rng.choice(economy.sectors), rng.choice(economy.resources)
+        # 偶尔清零，覆盖“任何投入为0则无产出”
+        value = 0.0 if rng.random() < 0.2 else round(rng.uniform(0, 50), 2)
+        allocations[sector][res] = value
+        preview.set(sector, res, value)
+        if rng.random() < 0.1:
+            efficiency = random_efficiency(economy_params, rng)
+        preview.refresh(efficiency)
+        assert shown_outputs(preview) == compute_results(allocations, efficiency, economy_params)
+
+
+def test_marginal_is_output_of_one_more_unit(economy_params):
+    rng = random.Random(16)
+    player = Player(GameState(seed=3, params=economy_params), seed=17)
+    allocations = player.allocation()
+    efficiency = random_efficiency(economy_params, rng)
+    preview = OutputPreview(economy_params)
+    preview.load(allocations)
+    preview.refresh(efficiency)
+    base = sum(compute_results(allocations, efficiency, economy_params).values())
+    for sector, (_, marginal) in preview.shown.items():
+        for res, gain in marginal.items():
+            allocations[sector][res] += preview.step
+            more = sum(compute_results(allocations, efficiency, economy_params).values())
+            allocations[sector][res] -= preview.step
+            assert gain == pytest.approx(more - base, rel=1e-9, abs=1e-9)
@@ -0,0 +1,48 @@
+"""从种子和操作日志重放，结果与实际对局逐位一致"""
+from game_engine import GameState
+from helpers import Player, state_key
+from replay import ActionLog, replay
+
+
+def test_replay_matches_live_play(params):
+    state = GameState(seed=20240601, params=params)
+    log = ActionLog(state.seed, params=params)
+    live = Player(state, seed=1, log=log).play(60)
+
+    replayed = []
+    final = replay(log.seed, log.actions, on_record=replayed.append, params=log.params)
+    assert replayed == live
+    assert state_key(final) == state_key(state)
+
+
+def test_replay_stops_before_round(params):
+    state = GameState(seed=7, params=params)
+    log = ActionLog(state.seed, params=params)
+    p = Player(state, seed=2, log=log)
+    p.play(10)
+    midway = state.copy()
+    p.play(10)
+
+    assert state_key(replay(log.seed, log.actions, upto_round=11, params=params)) == state_key(midway)
+
+
+def test_log_file_round_trip_with_truncation(tmp_path, params):
+    path = str(tmp_path / 'game.jsonl')
+    state = GameState(seed=99, params=params)
+    log = ActionLog(state.seed, path=path, params=params)
+    p = Player(state, seed=3, log=log)
+    p.play(15)
+    kept = len(log.actions)
+    checkpoint = state.copy()
+    p.play(5)
+    # 撤销回 checkpoint，再换一种玩法
+    log.truncate(kept)
+    p.state = state = checkpoint
+    p.play(10)
+    log.close()
+
+    loaded = ActionLog.load(path)
+    assert loaded.seed == log.seed
+    assert loaded.params.to_dict() == params.to_dict()
+    assert [tuple(action) for action in loaded.actions] == [tuple(action) for action in log.actions]
+    assert state_key(replay(loaded.seed, loaded.actions, params=loaded.params)) == state_key(state)
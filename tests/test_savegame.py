@@ -0,0 +1,78 @@
+"""存档：写入后用 SaveFile 读回，状态、历史、事件和操作记录与写入时一致"""
+import os
+
+import numpy as np
+
+from game_engine import GameState
+from helpers import Player, state_key
+from history_store import HistoryStore
+from replay import ActionLog, replay
+from savegame import SaveFile, take_snapshot, write_save
+
+
+class Events:
+    def __init__(self):
+        self.records = []
+
+
+def new_history(params):
+    return HistoryStore(window=5, spill=True, sectors=params.economy.sectors,
+                        resources=params.economy.resources)
+
+
+def played(params, rounds=40, log=True):
+    state = GameState(seed=31337, params=params)
+    history, events = new_history(params), Events()
+    action_log = ActionLog(state.seed, params=params) if log else None
+    Player(state, seed=8, log=action_log, history=history, events=events).play(rounds)
+    return state, history, events, action_log
+
+
+def test_save_round_trip(tmp_path, params):
+    state, history, events, log = played(params)
+    path = str(tmp_path / 'game.ecsave')
+    assert write_save(path, take_snapshot(state, history, events.records, log))
+
+    save = SaveFile(path)
+    assert state_key(save.state()) == state_key(state)
+    assert save.params().to_dict() == params.to_dict()
+    assert np.array_equal(save.history_rows(), np.concatenate(history.row_chunks()))
+    assert list(save.events()) == events.records
+    assert save.action_log().actions == log.actions
+    assert state_key(replay(log.seed, save.action_log().actions, params=params)) == state_key(state)
+
+    # 挂到新的 HistoryStore 上：逐轮记录、最近窗口和汇总都与原来一致
+    loaded = new_history(params)
+    save.load_history(loaded)
+    assert len(loaded) == len(history)
+    assert [loaded[i] for i in range(len(loaded))] == [history[i] for i in range(len(history))]
+    assert loaded.recent() == history.recent()
+    assert loaded.aggregates() == history.aggregates()
+
+
+def test_snapshot_discarded_when_rows_are_overwritten(tmp_path, params):
+    state, history, events, log = played(params, rounds=10)
+    path = str(tmp_path / 'game.ecsave')
+    assert write_save(path, take_snapshot(state, history, events.records, log))
+    before = open(path, 'rb').read()
+
+    aggregates = history.aggregates()
+    snapshot = take_snapshot(state, history, events.records, log)
+    # 写盘之前撤销到第 5 轮（撤销之后总会提交新的快照）
+    history.truncate(5, aggregates)
+    assert not write_save(path, snapshot)
+    assert open(path, 'rb').read() == before
+    assert os.listdir(tmp_path) == ['game.ecsave']
+
+
+def test_unreplayable_log_is_not_saved(tmp_path, params):
+    state, history, events, _ = played(params, rounds=10, log=False)
+    log = ActionLog(state.seed, params=params, replayable=False)
+    Player(state, seed=9, log=log, history=history).play(5)
+    path = str(tmp_path / 'game.ecsave')
+    write_save(path, take_snapshot(state, history, events.records, log))
+
+    save = SaveFile(path)
+    assert save.action_log() is None
+    assert len(save.history_rows()) == 15
+    assert state_key(save.state()) == state_key(state)
@@ -0,0 +1,86 @@
+"""撤销/重做：连撤 50 步回到开局，再连做 50 步回到终局，状态和随机数流逐位一致"""
+import numpy as np
+
+from game_engine import GameState
+from helpers import Player, state_key
+from history_store import HistoryStore
+from replay import ActionLog
+from undo import UndoStack
+
+STEPS = 50
+
+
+class Events:
+    """EventLog 的无界面替身，只保留记录"""
+
+    def __init__(self):
+        self.records = []
+
+    def truncate(self, n):
+        self.records = self.records[:n]
+
+    def extend(self, records):
+        self.records.extend(records)
+
+
+def new_history(params):
+    return HistoryStore(window=5, spill=True, sectors=params.economy.sectors,
+                        resources=params.economy.resources)
+
+
+def history_rows(history):
+    return np.concatenate(history.row_chunks())
+
+
+def test_undo_and_redo_fifty_steps(params):
+    state = GameState(seed=4242, params=params)
+    history = new_history(params)
+    log, events, stack = ActionLog(state.seed, params=params), Events(), UndoStack()
+    player = Player(state, seed=5, log=log, history=history, events=events)
+
+    start = state_key(state)
+    for i in range(STEPS):
+        before = stack.begin(state, history, log, events)
+        # 与界面相同：采购和生产各算一步，采购不成交时改为生产
+        if i % 3 == 1 and player.buy():
+            label = "采购"
+        else:
+            player.produce()
+            label = "生产"
+        stack.commit(label, before, log, events)
+    end = state_key(state)
+    rows, actions, records = history_rows(history).copy(), list(log.actions), list(events.records)
+    aggregates = history.aggregates()
+    assert len(stack.done) == STEPS
+
+    for _ in range(STEPS):
+        assert stack.undo(state, history, log, events) is not None
+    assert not stack.can_undo()
+    assert state_key(state) == start
+    assert len(history) == 0 and log.actions == [] and events.records == []
+
+    for _ in range(STEPS):
+        assert stack.redo(state, history, log, events) is not None
+    assert not stack.can_redo()
+    assert state_key(state) == end
+    assert np.array_equal(history_rows(history), rows)
+    assert history.aggregates() == aggregates
+    assert log.actions == actions and events.records == records
+
+
+def test_new_step_after_undo_drops_redo(params):
+    state = GameState(seed=11, params=params)
+    log, events, stack = ActionLog(state.seed, params=params), Events(), UndoStack()
+    history = new_history(params)
+    player = Player(state, seed=6, log=log, history=history, events=events)
+    for _ in range(3):
+        before = stack.begin(state, history, log, events)
+        player.produce()
+        stack.commit("生产", before, log, events)
+
+    stack.undo(state, history, log, events)
+    before = stack.begin(state, history, log, events)
+    player.produce()
+    stack.commit("生产", before, log, events)
+    assert not stack.can_redo()
+    assert len(history) == 3 and len(log.actions) == 3
@@ -0,0 +1,389 @@
+"""性能基准测试
+
+覆盖规则引擎（生产公式、整轮结算、随机事件、批量模拟、分配求解）、
+图表（update_chart 与五轮总结，均用 Agg 后端离屏绘制）、长局历史（1万轮以上）
+以及 Treeview/Text 插入。Tk 相关的用例需要显示器，Linux 上可以用虚拟显示器运行：
+    xvfb-run -a python tools/benchmark.py
+没有显示器时这些用例记为跳过。基准文件只在同一台机器上比较才有意义，
+换了测试机器先用 --save-baseline 重新生成。
+
+每个用例先自动确定循环次数（单次测量不少于约 0.2 秒），再重复测量，
+结果为每次调用的耗时；与基准比较时用最小值，受机器上其他负载的影响最小。随机数都有固定种子，结果可复现。
+
+    python tools/benchmark.py --json results.json                 # 运行并保存结果
+    python tools/benchmark.py --save-baseline                      # 写入基准文件
+    python tools/benchmark.py --baseline --threshold 0.25          # 与基准比较，变慢超过 25% 时返回 1
+    python tools/benchmark.py -k engine                            # 只运行名称包含 engine 的用例
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+MAIN_SCRIPT = os.path.join(ROOT, '生产要素管理游戏.py')
+BASELINE_PATH = os.path.join(ROOT, 'tools', 'benchmark_baseline.json')
+THRESHOLD = 0.25
+
+import numpy as np  # noqa: E402
+
+from game_engine import GameState, compute_results, play_round, roll_event, SECTORS, RESOURCES  # noqa: E402
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    pass
+
+
+def bench(name):
+    """登记用例：被装饰的函数做准备工作，返回要计时的无参函数"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def sample_allocations(rng, sectors=SECTORS, resources=RESOURCES, scale=20.0):
+    return {s: {r: float(rng.random() * scale) for r in resources} for s in sectors}
+
+
+def sample_record(rng, round_no):
+    return {'round': round_no, 'allocations': sample_allocations(rng),
+            'results': {s: float(rng.random() * 100) for s in SECTORS},
+            'efficiency': {s: 1.0 for s in SECTORS}, 'total_income': float(rng.random() * 300)}
+
+
+def load_main_module():
+    spec = importlib.util.spec_from_file_location('economic_game', MAIN_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def agg_figure(size):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=size, dpi=100)
+    return figure, FigureCanvasAgg(figure)
+
+
+def tk_root():
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise Skip(f"需要显示器（可用 xvfb-run）：{e}")
+    root.withdraw()
+    return root
+
+
+# ---- 规则引擎 ----
+
+@bench('engine.compute_results')
+def _():
+    rng = np.random.default_rng(0)
+    state = GameState(seed=0)
+    allocations = sample_allocations(rng)
+    return lambda: compute_results(allocations, state.efficiency)
+
+
+@bench('engine.play_round')
+def _():
+    state = GameState(seed=0)
+    allocations = {s: {r: 1.0 for r in RESOURCES} for s in SECTORS}
+    initial = state.copy()
+
+    def run():
+        # 资源耗尽前重置，保证每次结算的工作量相同
+        if state.resources['labor'] < 10 or state.resources['land'] < 10:
+            state.__dict__.update(initial.copy().__dict__)
+        play_round(state, allocations)
+    return run
+
+
+@bench('engine.roll_event')
+def _():
+    state = GameState(seed=0)
+    return lambda: roll_event(state)
+
+
+@bench('engine.batch_step_10k')
+def _():
+    from batch_engine import BatchEngine
+    engine = BatchEngine(10000, seed=0)
+    allocations = np.full((len(SECTORS), len(RESOURCES)), 1.0)
+    return lambda: engine.step(allocations)
+
+
+@bench('engine.solve_allocation')
+def _():
+    from allocation_solver import solve_allocation
+    state = GameState(seed=0)
+    return lambda: solve_allocation(state.resources, state.efficiency)
+
+
+@bench('engine.preview_keystroke')
+def _():
+    """分配面板每按一次键：改一格并取回要重画的行业"""
+    from preview import OutputPreview
+    state = GameState(seed=0)
+    preview = OutputPreview(state.params)
+    preview.load(sample_allocations(np.random.default_rng(0)))
+    preview.refresh(state.efficiency)
+    cells = [(s, r) for s in SECTORS for r in RESOURCES]
+    values = iter(np.random.default_rng(1).uniform(0, 20, 1 << 20).round(2).tolist())
+
+    def run():
+        for sector, res in cells:
+            preview.set(sector, res, next(values))
+            preview.refresh(state.efficiency)
+    return run
+
+
+# ---- 图表（Agg 离屏） ----
+
+@bench('chart.update_chart')
+def _():
+    """界面里的 create_chart / update_chart 原样运行在 Agg 画布上"""
+    from history_store import HistoryStore
+    game = load_main_module().EnhancedEconomicGame
+
+    class ChartHost:
+        create_chart = game.create_chart
+        update_chart = game.update_chart
+        update_forecast_artists = game.update_forecast_artists
+        chart_key = None
+        chart_bands = None
+
+    host = ChartHost()
+    host.figure, canvas = agg_figure((5, 3))
+    host.canvas = type('Canvas', (), {'draw_idle': staticmethod(canvas.draw)})
+    host.sectors, host.chart_slots = SECTORS, 5
+    host.colors = {s: c for s, c in zip(SECTORS, ['#C8E6C9', '#BBDEFB', '#E1BEE7'])}
+    host.forecaster = type('Forecaster', (), {'rounds': 5})
+    host.chart_visible = lambda: True
+    host.ensure_chart = lambda: None
+    host.history = HistoryStore(window=5)
+    rng = np.random.default_rng(0)
+    for k in range(5):
+        host.history.append(sample_record(rng, k + 1))
+    host.forecast_bands = np.sort(rng.random((5, 3)) * 5000, axis=1)
+    host.create_chart()
+
+    def run():
+        # 历史不变时 update_chart 直接返回；清掉缓存键，每次都按完整重画计时
+        host.chart_key = None
+        host.update_chart()
+    return run
+
+
+def summary_case(reuse):
+    from matplotlib.figure import Figure
+    from summary_view import SummaryRenderer
+    agg_figure((1, 1))
+    rng = np.random.default_rng(0)
+    rounds = [f"第{k}轮" for k in range(1, 6)]
+    results = rng.random((5, len(SECTORS))) * 100
+    colors = {s: c for s, c in zip(SECTORS, ['#C8E6C9', '#BBDEFB', '#E1BEE7'])}
+    renderer = SummaryRenderer(lambda: Figure)
+    if reuse:
+        return lambda: renderer.render(rounds, results, SECTORS, colors)
+    return lambda: SummaryRenderer(lambda: Figure).render(rounds, results, SECTORS, colors)
+
+
+@bench('chart.summary_render')
+def _():
+    """五轮总结：常驻 Figure 反复重画成位图"""
+    return summary_case(reuse=True)
+
+
+@bench('chart.summary_new_figure')
+def _():
+    """对照：每次新建 Figure 再画（旧的 show_summary 每五轮都这样做）"""
+    return summary_case(reuse=False)
+
+
+# ---- 长局历史 ----
+
+@bench('history.append_10k')
+def _():
+    from history_store import HistoryStore
+    rng = np.random.default_rng(0)
+    records = [sample_record(rng, k + 1) for k in range(10000)]
+
+    def run():
+        history = HistoryStore(window=5, spill=True)
+        for record in records:
+            history.append(record)
+        history.close()
+    return run
+
+
+@bench('history.recent_and_random_read_20k')
+def _():
+    from history_store import HistoryStore
+    rng = np.random.default_rng(0)
+    history = HistoryStore(window=5, spill=True)
+    for k in range(20000):
+        history.append(sample_record(rng, k + 1))
+    indices = rng.integers(0, 20000, size=100).tolist()
+
+    def run():
+        history.recent_column('results', 5)
+        for index in indices:
+            history[index]
+    return run
+
+
+@bench('history.save_snapshot_10k')
+def _():
+    from history_store import HistoryStore
+    from savegame import take_snapshot, write_save
+    from replay import ActionLog
+    rng = np.random.default_rng(0)
+    state = GameState(seed=0)
+    history = HistoryStore(window=5, spill=True)
+    for k in range(10000):
+        history.append(sample_record(rng, k + 1))
+    path = os.path.join(tempfile.mkdtemp(), 'bench.ecsave')
+    return lambda: write_save(path, take_snapshot(state, history, [], ActionLog(0)))
+
+
+# ---- Tk 控件（需要显示器） ----
+
+@bench('ui.production_log_refresh_10k')
+def _():
+    from history_store import HistoryStore
+    from production_log import ProductionLog
+    root = tk_root()
+    rng = np.random.default_rng(0)
+    history = HistoryStore(window=5, spill=True)
+    for k in range(10000):
+        history.append(sample_record(rng, k + 1))
+    log = ProductionLog(root, history, lambda record: f"收益 ¥{record['total_income']:.2f}")
+    log.pack(fill='both', expand=True)
+    log.visible_rows = 12
+    state = {'k': 10000}
+
+    def run():
+        state['k'] += 1
+        history.append(sample_record(rng, state['k']))
+        log.refresh()
+        root.update_idletasks()
+    return run
+
+
+@bench('ui.event_log_insert')
+def _():
+    import tkinter as tk
+    from event_log import EventLog
+    root = tk_root()
+    text = tk.Text(root)
+    text.pack()
+    log = EventLog(text, max_lines=200)
+    state = {'k': 0}
+
+    def run():
+        # 一轮写入3条事件，再像空闲回调那样一次性刷新
+        for _ in range(3):
+            state['k'] += 1
+            log.log(state['k'], f"⚠ 市场价格波动！劳动力价格+{state['k'] % 30:.2f}%", 'price')
+        log.flush()
+        root.update_idletasks()
+    return run
+
+
+def measure(fn, repeat=5):
+    """返回每次调用耗时（秒）的中位数、最小值和每次测量的循环次数"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'median': statistics.median(times), 'min': min(times), 'number': number, 'repeat': repeat}
+
+
+def environment():
+    import matplotlib
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count()}
+
+
+def compare(results, baseline, threshold):
+    """返回 (名称, 当前, 基准, 比值, 是否退化) 列表；基准里没有的用例不比较"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if 'min' not in result or not base or 'min' not in base:
+            continue
+        ratio = result['min'] / base['min']
+        rows.append((name, result['min'], base['min'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('µs', 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    parser.add_argument('-k', dest='keyword', default='', help="只运行名称包含该字符串的用例")
+    parser.add_argument('--repeat', type=int, default=5, help="每个用例重复测量几次")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--baseline', nargs='?', const=BASELINE_PATH, help="与基准文件比较")
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, help="把结果写为基准文件")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="比基准慢多少算退化（比例，默认 0.25）")
+    parser.add_argument('--list', action='store_true', help="只列出用例名称")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.keyword in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = {}
+    for name in names:
+        try:
+            fn = BENCHMARKS[name]()
+            results[name] = measure(fn, args.repeat)
+            print(f"{name:<38} {format_time(results[name]['min']):>12}  "
+                  f"(中位数 {format_time(results[name]['median'])})", file=sys.stderr)
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+            print(f"{name:<38} {'跳过':>10}  {e}", file=sys.stderr)
+
+    report = {'environment': environment(), 'results': results}
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return 0
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"无法读取基准文件: {e}")
+    regressions = 0
+    print(f"\n与基准比较（阈值 +{args.threshold:.0%}）：", file=sys.stderr)
+    for name, current, base, ratio, regressed in compare(results, baseline, args.threshold):
+        regressions += regressed
+        print(f"{name:<38} {format_time(base):>12} → {format_time(current):>12}  "
+              f"{ratio:>6.2f}x{'  退化' if regressed else ''}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""对局服务器压力测试
+
+默认在子进程里启动 game_server.py（系统分配端口），再用 asyncio 开若干连接，
+每个连接轮流驱动一批会话：每轮把各资源的90%平均分给各行业生产，
+每隔几轮补买一次可购买资源。统计每秒结算的轮数和请求延迟分位数。
+
+用法: python tools/load_test.py [--sessions 2000] [--rounds 20] [--connections 50]
+                                [--connect 主机:端口]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(ROOT, 'game_server.py')
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = []
+        self.errors = {}
+
+    async def call(self, request):
+        start = time.perf_counter()
+        self.writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        response = json.loads(await self.reader.readline())
+        self.latencies.append(time.perf_counter() - start)
+        if not response['ok']:
+            key = f"{request['op']}: {response['error']}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+        return response
+
+
+def even_allocations(state, economy):
+    """各资源的上限平均分给所有行业，按行业×资源顺序展开"""
+    cap = economy['usage_cap']
+    n = len(economy['sectors'])
+    # 留一点余量，避免各份相加后因浮点误差略超上限
+    share = {res: math.floor((state['resources'][res] * cap - 1e-9) / n * 100) / 100
+             for res in economy['resources']}
+    return [share[res] for _ in economy['sectors'] for res in economy['resources']]
+
+
+async def drive(client, economy, n_sessions, rounds, buy_every, seed):
+    """一个连接上依次推进 n_sessions 个会话，返回完成的轮数"""
+    sessions = []
+    for i in range(n_sessions):
+        reply = await client.call({'op': 'new', 'seed': seed + i})
+        sessions.append([reply['session'], reply['state']])
+    done = 0
+    for k in range(rounds):
+        for entry in sessions:
+            key, state = entry
+            if buy_every and k % buy_every == buy_every - 1:
+                budget = state['resources']['capital'] * 0.2 / len(economy['tradable'])
+                purchased = [math.floor(budget / state['prices'][res] * 100) / 100 for res in economy['tradable']]
+                reply = await client.call({'op': 'buy', 'session': key, 'purchased': purchased})
+                if reply['ok']:
+                    state = entry[1] = reply['state']
+            reply = await client.call({'op': 'produce', 'session': key,
+                                       'allocations': even_allocations(state, economy)})
+            if reply['ok']:
+                entry[1] = reply['state']
+                done += 1
+    for key, _ in sessions:
+        await client.call({'op': 'close', 'session': key})
+    return done
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run(args, host, port):
+    clients = []
+    for _ in range(args.connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        clients.append(Client(reader, writer))
+    economy = await clients[0].call({'op': 'economy'})
+
+    per_client = [args.sessions // args.connections + (i < args.sessions % args.connections)
+                  for i in range(args.connections)]
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(drive(client, economy, n, args.rounds, args.buy_every, i * 100000)
+                                    for i, (client, n) in enumerate(zip(clients, per_client))))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.writer.close()
+
+    latencies = sorted(t for client in clients for t in client.latencies)
+    rounds = sum(counts)
+    print(f"会话 {args.sessions}，连接 {args.connections}，共结算 {rounds} 轮，请求 {len(latencies)} 个，"
+          f"用时 {elapsed:.2f} s")
+    print(f"rounds/sec: {rounds / elapsed:.0f}   requests/sec: {len(latencies) / elapsed:.0f}")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms   "
+          f"mean {statistics.fmean(latencies) * 1000:.2f} ms")
+    errors = {}
+    for client in clients:
+        for key, count in client.errors.items():
+            errors[key] = errors.get(key, 0) + count
+    for key, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"失败 {count} 次  {key}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--buy-every', type=int, default=5, help="每隔几轮采购一次，0 为不采购")
+    parser.add_argument('--connect', help="连接已在运行的服务器（主机:端口），不另启子进程")
+    args = parser.parse_args()
+    args.connections = max(1, min(args.connections, args.sessions))
+
+    server = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+    else:
+        server = subprocess.Popen([sys.executable, SERVER_SCRIPT, '--port', '0'], cwd=ROOT,
+                                  stdout=subprocess.PIPE, text=True)
+        line = server.stdout.readline()
+        if not line.startswith('LISTENING '):
+            server.kill()
+            sys.exit("服务器没有启动")
+        _, host, port = line.split()
+    try:
+        asyncio.run(run(args, host, int(port)))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""策略锦标赛：多个策略在同一组种子上对局，比较最终资金
+
+第 i 局的种子为 seed + i，所有策略面对同一串随机事件（只要都合法生产，
+事件流就完全相同）。每轮先执行策略的采购，再按分配生产，规则与窗口版相同：
+资金不足、负数或不可购买的资源会使本轮采购作废，分配超过上限时本轮按零投入结算，
+两种情况都记为违规。
+
+策略可以是 strategies.STRATEGIES 里的内置名称，或 "模块:类名"（见 strategies.py）。
+各策略的对局按种子分块在多个进程里并行计算。
+
+用法:
+    python tournament.py optimal proportional repeat --games 200 --rounds 30 \\
+        --out ranking.csv --rounds-out rounds.csv
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from economy import Economy
+from game_engine import (GameState, GameParams, play_round, purchase_cost, apply_purchase,
+                         parse_allocations, parse_purchase)
+from strategies import STRATEGIES, Observation, load_strategy
+
+RANKING_FIELDS = ['rank', 'strategy', 'name', 'games', 'mean_final_capital', 'std_final_capital',
+                  'median_final_capital', 'mean_total_income', 'win_rate', 'illegal_moves']
+ROUND_FIELDS = ['strategy', 'round', 'mean_capital', 'p10_capital', 'p90_capital', 'mean_income']
+
+
+def play_game(strategy, seed, rounds, params):
+    """一个策略玩一局，返回 (每轮结束时的资金, 每轮收入, 违规次数)"""
+    state = GameState(seed=seed, params=params)
+    economy = state.economy
+    zeros = {s: {r: 0.0 for r in economy.resources} for s in economy.sectors}
+    strategy.reset(economy, params)
+    capital, income, illegal = [], [], 0
+    for _ in range(rounds):
+        allocations, purchased = strategy.decide(Observation(state))
+        if purchased:
+            try:
+                purchased = parse_purchase(purchased, economy)
+                total_cost = purchase_cost(state.prices, purchased, state.params)
+                if total_cost > state.resources['capital']:
+                    raise ValueError("资金不足！")
+                apply_purchase(state, purchased, total_cost)
+            except ValueError:
+                illegal += 1
+        try:
+            record, _ = play_round(state, parse_allocations(allocations, economy))
+        except ValueError:
+            # 本轮不生产，但事件照常抽取，保持与其他策略的事件流对齐
+            illegal += 1
+            record, _ = play_round(state, zeros)
+        capital.append(state.resources['capital'])
+        income.append(record['total_income'])
+    return capital, income, illegal
+
+
+def _run_chunk(spec, seeds, rounds, params):
+    strategy = load_strategy(spec)
+    capital, income, illegal = [], [], 0
+    for seed in seeds:
+        c, i, n = play_game(strategy, seed, rounds, params)
+        capital.append(c)
+        income.append(i)
+        illegal += n
+    return spec, strategy.name, seeds, capital, income, illegal
+
+
+def run_tournament(specs, games, rounds, params, seed=0, workers=None):
+    """返回 {策略: {'name', 'capital' (局, 轮), 'income' (局, 轮), 'illegal'}}"""
+    workers = workers or os.cpu_count() or 1
+    n_chunks = max(1, min(games, -(-workers * 2 // len(specs))))
+    chunks = [list(c) for c in np.array_split(np.arange(seed, seed + games), n_chunks) if len(c)]
+    results = {spec: {'name': spec, 'capital': np.zeros((games, rounds)),
+                      'income': np.zeros((games, rounds)), 'illegal': 0} for spec in specs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, spec, [int(s) for s in chunk], rounds, params)
+                   for spec in specs for chunk in chunks]
+        for future in futures:
+            spec, name, seeds, capital, income, illegal = future.result()
+            rows = np.array(seeds) - seed
+            entry = results[spec]
+            entry['name'] = name
+            entry['capital'][rows] = capital
+            entry['income'][rows] = income
+            entry['illegal'] += illegal
+    return results
+
+
+def ranking(results):
+    """按平均最终资金排序的排名表，资金相同（都到了上限）时比总收入；
+    胜率为该策略在同一种子上排第一的局数占比，完全并列时平分"""
+    specs = list(results)
+    finals = np.array([results[spec]['capital'][:, -1] for spec in specs])  # (策略, 局)
+    totals = np.array([results[spec]['income'].sum(axis=1) for spec in specs])
+    best = finals == finals.max(axis=0)
+    best &= np.where(best, totals, -np.inf) == np.where(best, totals, -np.inf).max(axis=0)
+    wins = (best / best.sum(axis=0)).mean(axis=1)
+    rows = []
+    for k, spec in enumerate(specs):
+        entry = results[spec]
+        rows.append({
+            'strategy': spec,
+            'name': entry['name'],
+            'games': finals.shape[1],
+            'mean_final_capital': float(finals[k].mean()),
+            'std_final_capital': float(finals[k].std()),
+            'median_final_capital': float(np.median(finals[k])),
+            'mean_total_income': float(entry['income'].sum(axis=1).mean()),
+            'win_rate': float(wins[k]),
+            'illegal_moves': entry['illegal'],
+        })
+    rows.sort(key=lambda row: (-row['mean_final_capital'], -row['mean_total_income']))
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def round_stats(results):
+    """每个策略每轮的资金均值、10%/90%分位数和平均收入"""
+    rows = []
+    for spec, entry in results.items():
+        capital = entry['capital']
+        p10, p90 = np.percentile(capital, [10, 90], axis=0)
+        for r in range(capital.shape[1]):
+            rows.append({'strategy': spec, 'round': r + 1,
+                         'mean_capital': float(capital[:, r].mean()),
+                         'p10_capital': float(p10[r]), 'p90_capital': float(p90[r]),
+                         'mean_income': float(entry['income'][:, r].mean())})
+    return rows
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _pad(text, width, right=False):
+    """按显示宽度补齐（中文字符占两格）"""
+    space = ' ' * max(0, width - len(text) - sum(1 for ch in text if ord(ch) > 0x2E80))
+    return space + text if right else text + space
+
+
+def print_ranking(rows):
+    labels = [f"{row['strategy']} ({row['name']})" for row in rows]
+    width = max(len(label) + sum(1 for ch in label if ord(ch) > 0x2E80) for label in labels)
+    columns = [('平均资金', 'mean_final_capital', '.2f'), ('标准差', 'std_final_capital', '.2f'),
+               ('中位数', 'median_final_capital', '.2f'), ('平均总收入', 'mean_total_income', '.2f'),
+               ('胜率', 'win_rate', '.1%'), ('违规', 'illegal_moves', 'd')]
+    print(' #  ' + _pad('策略', width) + ''.join(_pad(title, 13, True) for title, _, _ in columns))
+    for row, label in zip(rows, labels):
+        print(f"{row['rank']:>2}  " + _pad(label, width)
+              + ''.join(f"{row[key]:>13{fmt}}" for _, key, fmt in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="策略锦标赛")
+    parser.add_argument('strategies', nargs='+', metavar='策略',
+                        help=f"内置策略名（{'、'.join(STRATEGIES)}）或 模块:类名")
+    parser.add_argument('--games', type=int, default=100, help="每个策略的对局数")
+    parser.add_argument('--rounds', type=int, default=30, help="每局轮数")
+    parser.add_argument('--seed', type=int, default=0, help="第 i 局的种子为 seed + i")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument('--economy', help="经济模型 JSON 文件，默认 economies/classic.json")
+    parser.add_argument('--params', help="平衡参数 JSON 文件")
+    parser.add_argument('--out', help="排名表 CSV")
+    parser.add_argument('--rounds-out', help="每轮统计 CSV")
+    args = parser.parse_args()
+    if args.games < 1 or args.rounds < 1:
+        parser.error("对局数和轮数至少为1")
+    if len(set(args.strategies)) != len(args.strategies):
+        parser.error("策略重复")
+
+    try:
+        economy = Economy.load(args.economy) if args.economy else None
+        params = GameParams.load(args.params, economy) if args.params else GameParams(economy)
+        for spec in args.strategies:
+            load_strategy(spec)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    results = run_tournament(args.strategies, args.games, args.rounds, params, args.seed, args.workers)
+    rows = ranking(results)
+    print(f"{args.games} 局 × {args.rounds} 轮，种子 {args.seed}–{args.seed + args.games - 1}",
+          file=sys.stderr)
+    print_ranking(rows)
+    if args.out:
+        write_csv(args.out, RANKING_FIELDS, rows)
+    if args.rounds_out:
+        write_csv(args.rounds_out, ROUND_FIELDS, round_stats(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""撤销/重做
+
+每一步（一次生产、一次采购或一次快进）之前拍一张不可变的 Snapshot，
+撤销时把 GameState、历史、操作日志和事件记录恢复到这张快照；
+重做不保存“之后”的状态，而是用随机数状态把这一步的操作重新执行一遍（见 replay.apply_action），
+结果与第一次完全相同。
+
+快照之间共享没有变化的部分：资源、价格、效率存成元组，和上一张相同就直接引用同一个对象；
+随机数生成器的 624 个字状态只有在用完一整轮后才会整体刷新，平时只变读取位置，
+所以连续几十上百步共用同一个元组。历史和日志只记长度，每层撤销只占几百字节。
+"""
+from replay import apply_action
+
+UNDO_LIMIT = 500
+
+
+class Snapshot:
+    __slots__ = ('round', 'regime', 'resources', 'prices', 'efficiency', 'rng_words', 'rng_pos', 'rng_gauss',
+                 'aggregates', 'history_len', 'action_len', 'event_len')
+
+    def __init__(self, state, history, action_log, event_log, previous=None):
+        economy = state.economy
+        self.round = state.round
+        self.regime = state.regime
+        self.resources = tuple(state.resources[r] for r in economy.resources)
+        self.prices = tuple(state.prices[r] for r in economy.tradable)
+        self.efficiency = tuple(state.efficiency[s] for s in economy.sectors)
+        _, internal, self.rng_gauss = state.rng.getstate()
+        self.rng_words = internal[:-1]
+        self.rng_pos = internal[-1]
+        self.history_len = len(history)
+        self.action_len = len(action_log.actions)
+        self.event_len = len(event_log.records)
+        self.aggregates = history.aggregates()
+        if previous is not None:
+            self.share(previous)
+
+    def share(self, previous):
+        """与上一张快照相同的部分改为引用它的对象"""
+        for name in ('resources', 'prices', 'efficiency', 'rng_words'):
+            if getattr(self, name) == getattr(previous, name):
+                setattr(self, name, getattr(previous, name))
+        if self.history_len == previous.history_len:
+            self.aggregates = previous.aggregates
+
+    def restore(self, state, history, action_log, event_log):
+        """原地恢复，历史、操作日志和事件记录截断回拍快照时的长度"""
+        economy = state.economy
+        state.round = self.round
+        state.regime = self.regime
+        state.resources.update(zip(economy.resources, self.resources))
+        state.prices.update(zip(economy.tradable, self.prices))
+        state.efficiency.update(zip(economy.sectors, self.efficiency))
+        state.rng.setstate((state.rng.VERSION, self.rng_words + (self.rng_pos,), self.rng_gauss))
+        history.truncate(self.history_len, self.aggregates)
+        action_log.truncate(self.action_len)
+        event_log.truncate(self.event_len)
+
+
+class Step:
+    __slots__ = ('label', 'before', 'actions', 'events')
+
+    def __init__(self, label, before, actions, events):
+        self.label = label
+        self.before = before
+        self.actions = actions  # 这一步的操作日志条目
+        self.events = events  # 这一步写入的事件记录 (轮次, 标签, 文本)
+
+
+class UndoStack:
+    def __init__(self, limit=UNDO_LIMIT):
+        self.limit = limit
+        self.done = []
+        self.undone = []
+
+    def begin(self, state, history, action_log, event_log):
+        """在执行一步之前调用，返回这一步之前的快照"""
+        previous = self.done[-1].before if self.done else None
+        return Snapshot(state, history, action_log, event_log, previous)
+
+    def commit(self, label, before, action_log, event_log):
+        """这一步成功执行后调用；没有产生任何操作时不记录"""
+        actions = tuple(action_log.actions[before.action_len:])
+        if not actions:
+            return
+        events = tuple(event_log.records[before.event_len:])
+        self.done.append(Step(label, before, actions, events))
+        if len(self.done) > self.limit:
+            del self.done[0]
+        self.undone.clear()
+
+    def clear(self):
+        self.done.clear()
+        self.undone.clear()
+
+    def can_undo(self):
+        return bool(self.done)
+
+    def can_redo(self):
+        return bool(self.undone)
+
+    def undo(self, state, history, action_log, event_log):
+        """撤销最近一步，返回该 Step；没有可撤销的返回 None"""
+        if not self.done:
+            return None
+        step = self.done.pop()
+        step.before.restore(state, history, action_log, event_log)
+        self.undone.append(step)
+        return step
+
+    def redo(self, state, history, action_log, event_log):
+        """重新执行最近撤销的一步，返回该 Step"""
+        if not self.undone:
+            return None
+        step = self.undone.pop()
+        for kind, values in step.actions:
+            record, _ = apply_action(state, kind, values)
+            if record is not None:
+                history.append(record)
+        action_log.extend(step.actions)
+        event_log.extend(step.events)
+        self.done.append(step)
+        return step
@@ -1,23 +1,62 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import random
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-import matplotlib
+from tkinter import ttk, messagebox, filedialog
+import math
+import os
 import platform
-
-# Set Chinese font for matplotlib based on the operating system
-if platform.system() == 'Windows':
-    matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei']  # Windows
-elif platform.system() == 'Darwin':
-    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac
-else:
-    matplotlib.rcParams['font.sans-serif'] = ['WenQuanYi Zen Hei']  # Linux
+import threading
+import time
+from itertools import islice
+
+from economy import Economy
+from game_engine import (GameState, GameParams, check_usage, produce,
+                         purchase_cost, apply_purchase, roll_event, apply_event, step_market)
+from allocation_solver import solve_allocation
+from history_store import HistoryStore
+from production_log import ProductionLog
+from event_log import EventLog, TAG_NAMES
+from policies import POLICIES, run_rounds
+from forecast import Forecaster
+from summary_view import SummaryView
+from profiler import PhaseTimer, ProfilePanel
+from undo import UndoStack
+from preview import OutputPreview
+from savegame import AutoSaver, SaveFile, take_snapshot, write_save
+from replay import ActionLog
+from archive import ARCHIVE_PATH, GameArchive, append_game, history_entry
+
+AUTOSAVE_PATH = os.path.join(os.path.expanduser('~'), '生产要素管理游戏.autosave.ecsave')
+CARDS_PER_ROW = 4  # 分配面板每行最多放几个行业
+# “开始生产”的各阶段，按执行顺序；idle 为处理函数返回后 Tk 空闲时才完成的重绘和布局
+PHASES = {'parse': '解析输入', 'validate': '检查上限', 'undo': '撤销快照', 'compute': '生产结算',
+          'record': '写入历史', 'treeview': '生产明细', 'event': '随机事件', 'resources': '资源显示', 'chart': '图表',
+          'summary': '五轮总结', 'autosave': '自动存档', 'idle': '空闲重绘'}
+
+_matplotlib = None
+_matplotlib_lock = threading.Lock()
+
+
+def load_matplotlib():
+    """首次需要图表时才导入 matplotlib（字体缓存、后端初始化都比较慢），返回 (Figure, FigureCanvasTkAgg)"""
+    global _matplotlib
+    with _matplotlib_lock:
+        if _matplotlib is None:
+            import matplotlib
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+            # Set Chinese font for matplotlib based on the operating system
+            if platform.system() == 'Windows':
+                matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei']  # Windows
+            elif platform.system() == 'Darwin':
+                matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac
+            else:
+                matplotlib.rcParams['font.sans-serif'] = ['WenQuanYi Zen Hei']  # Linux
+            _matplotlib = (Figure, FigureCanvasTkAgg)
+    return _matplotlib
 
 
 class EnhancedEconomicGame:
-    def __init__(self, master):
+    def __init__(self, master, show_intro=True):
         self.master = master
         master.title("生产要素管理游戏")
         master.geometry("950x700")
@@ -26,15 +65,34 @@ class EnhancedEconomicGame:
         # Center the window on screen
         self.center_window()
 
+        # 游戏数据初始化（规则与状态在 game_engine 中，界面只做展示）
+        # 设置 ECONGAME_SEED 可复现整局的随机事件，ECONGAME_ECONOMY 指向经济模型 JSON 文件，
+        # ECONGAME_PARAMS 指向平衡参数 JSON 文件
+        seed = os.environ.get('ECONGAME_SEED')
+        economy_path = os.environ.get('ECONGAME_ECONOMY')
+        params_path = os.environ.get('ECONGAME_PARAMS')
+        economy = Economy.load(economy_path) if economy_path else None
+        params = GameParams.load(params_path, economy) if params_path else GameParams(economy)
+        self.state = GameState(seed=int(seed) if seed else None, params=params)
+        self.economy = self.state.economy
+
         # 初始化数据结构
-        self.sectors = ['农业', '工业', '科技']
+        self.sectors = list(self.economy.sectors)
         self.price_labels = {}
         self.res_labels = {}
         self.entries = {sector: {} for sector in self.sectors}
+        # 输入框数值缓存与合计，按键时只重新解析变动的那一格
+        self.entry_values = {sector: {} for sector in self.sectors}
+        self.total_used = {res: 0.0 for res in self.economy.resources}
+        self.usage_refresh_pending = False
+        self.usage_label_state = {}
+        # 每个行业卡片上的预计产出和边际收益，按键时只重算受影响的行业
+        self.preview = OutputPreview(self.state.params)
+        self.preview_labels = {}
+        self.label_text = {}  # 资源、价格标签当前显示的文字
         self.buy_entries = {}
-        self.efficiency = {sector: 1.0 for sector in self.sectors}
         self.validate_cmd = master.register(self.validate_input)
-        self.history = []  # 存储历史数据用于图表
+        self.history = self.new_history()
 
         # 样式配置
         self.style = ttk.Style()
@@ -42,18 +100,32 @@ class EnhancedEconomicGame:
         self.style.configure("Treeview", font=('微软雅黑', 10), rowheight=35,  # 增加行高
                              foreground="#333", fieldbackground="#FAFAFA")
         self.style.map("Treeview", background=[('selected', '#FAFAFA')])  # 禁用选中效果
-        self.colors = {
-            '农业': '#C8E6C9',
-            '工业': '#BBDEFB',
-            '科技': '#E1BEE7'
-        }
-
-        # 游戏数据初始化
-        self.resources = {'labor': 100.00, 'capital': 1000.00, 'land': 100.00}
-        self.prices = {'labor': 50.00, 'land': 100.00}
-        self.round = 1  # 从第一轮开始
+        self.colors = self.economy.colors
+
+        # 种子 + 操作日志即可无界面重放整局
+        self.action_log = ActionLog(self.state.seed, params=self.state.params)
+        # 后台蒙特卡洛预测：未来5轮资金的10/50/90分位
+        self.forecaster = Forecaster(rounds=5, paths=4000)
+        self.forecast_key = None
+        self.forecast_bands = None
+        self.forecast_after = None
+        # 每轮在后台线程自动存档
+        self.autosaver = AutoSaver(AUTOSAVE_PATH)
+        self.autosave_error_shown = False
+        # 关闭窗口或读入别的存档时，整局写入 SQLite 归档（同样在写盘线程上）
+        self.started = time.time()
+        # 五轮总结：一个常驻窗口，图在后台线程画好
+        self.summary_view = SummaryView(self.master, lambda: load_matplotlib()[0])
+        # 各阶段耗时；Ctrl+Shift+D 打开调试面板
+        self.timer = PhaseTimer(PHASES)
+        # 撤销/重做：每步之前的不可变快照
+        self.undo_stack = UndoStack()
+        self.ff_runner = None
+        self.close_requested = False
+        self.profile_panel = ProfilePanel(self.master, self.timer, PHASES)
 
         # 构建界面
+        self.create_menu()
         self.create_header()
         self.create_resource_panel()
         self.create_allocation_controls()
@@ -62,7 +134,35 @@ class EnhancedEconomicGame:
         self.set_initial_focus()
 
         # 延迟显示介绍消息，避免焦点问题
-        self.master.after(100, self.show_intro_message)
+        if show_intro:
+            self.master.after(100, self.show_intro_message)
+        # 窗口显示后再在后台预热图表
+        self.master.after(500, self.warm_up_charts)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.master.bind("<Control-D>", self.profile_panel.toggle)
+        if os.environ.get('ECONGAME_PROFILE'):
+            self.master.after(600, self.profile_panel.show)
+
+    def new_history(self):
+        """最近5轮常驻内存，完整记录写入映射文件"""
+        return HistoryStore(window=5, spill=True, sectors=self.economy.sectors,
+                            resources=self.economy.resources)
+
+    @property
+    def resources(self):
+        return self.state.resources
+
+    @property
+    def prices(self):
+        return self.state.prices
+
+    @property
+    def efficiency(self):
+        return self.state.efficiency
+
+    @property
+    def round(self):
+        return self.state.round
 
     def center_window(self):
         """Center the window on the screen"""
@@ -82,6 +182,25 @@ class EnhancedEconomicGame:
 5. 特殊事件：可能影响生产效率"""
         messagebox.showinfo("游戏说明", message)
 
+    def create_menu(self):
+        menubar = tk.Menu(self.master)
+        game_menu = tk.Menu(menubar, tearoff=0)
+        game_menu.add_command(label="保存游戏…", command=self.save_game)
+        game_menu.add_command(label="读取游戏…", command=self.load_game)
+        game_menu.add_separator()
+        game_menu.add_command(label="排行榜", command=self.show_leaderboard)
+        game_menu.add_separator()
+        game_menu.add_command(label="退出", command=self.on_close)
+        menubar.add_cascade(label="游戏", menu=game_menu)
+        self.edit_menu = tk.Menu(menubar, tearoff=0)
+        self.edit_menu.add_command(label="撤销", accelerator="Ctrl+Z", command=self.undo, state="disabled")
+        self.edit_menu.add_command(label="重做", accelerator="Ctrl+Y", command=self.redo, state="disabled")
+        menubar.add_cascade(label="编辑", menu=self.edit_menu)
+        self.master.config(menu=menubar)
+        self.master.bind("<Control-z>", self.undo)
+        self.master.bind("<Control-y>", self.redo)
+        self.master.bind("<Control-Z>", self.redo)
+
     def create_header(self):
         header = tk.Frame(self.master, bg="#3F51B5", height=40)
         header.pack(fill=tk.X, pady=(0, 5))
@@ -95,19 +214,15 @@ class EnhancedEconomicGame:
                                     font=("微软雅黑", 10))
         self.round_label.pack(side=tk.LEFT)
 
-        self.labor_status = tk.Label(status_frame, text="劳动力: 0.00/90.00",
-                                     fg="#4CAF50", bg="#3F51B5", font=("微软雅黑", 9))
-        self.capital_status = tk.Label(status_frame, text="资金: 0.00/900.00",
-                                       fg="#4CAF50", bg="#3F51B5", font=("微软雅黑", 9))
-        self.land_status = tk.Label(status_frame, text="土地: 0.00/90.00",
-                                    fg="#4CAF50", bg="#3F51B5", font=("微软雅黑", 9))
-
-        separator = lambda: tk.Label(status_frame, text=" | ", fg="white", bg="#3F51B5")
-        self.labor_status.pack(side=tk.LEFT)
-        separator().pack(side=tk.LEFT)
-        self.capital_status.pack(side=tk.LEFT)
-        separator().pack(side=tk.LEFT)
-        self.land_status.pack(side=tk.LEFT)
+        self.usage_labels = {}
+        for i, res in enumerate(self.economy.resources):
+            if i:
+                tk.Label(status_frame, text=" | ", fg="white", bg="#3F51B5").pack(side=tk.LEFT)
+            name = self.economy.resource_names[res]
+            status = tk.Label(status_frame, text=f"{name}: 0.00/0.00",
+                              fg="#4CAF50", bg="#3F51B5", font=("微软雅黑", 9))
+            status.pack(side=tk.LEFT)
+            self.usage_labels[res] = (status, name)
 
     def create_resource_panel(self):
         frame = tk.Frame(self.master, bg="#FAFAFA", bd=1, relief=tk.GROOVE)
@@ -120,13 +235,13 @@ class EnhancedEconomicGame:
         tk.Label(res_frame, text="你拥有的资产:", font=("微软雅黑", 10),
                  bg="#FAFAFA").pack(side=tk.LEFT, padx=(0, 10))
 
-        resources = [('labor', '👷 劳动力'), ('capital', '💰 资金'), ('land', '🌱 土地')]
         self.res_labels = {}
 
-        for idx, (key, name) in enumerate(resources):
+        for key in self.economy.resources:
             sub = tk.Frame(res_frame, bg='#FAFAFA')
             sub.pack(side=tk.LEFT, padx=10)
-            tk.Label(sub, text=name.split()[0], font=("Arial", 12), bg='#FAFAFA').pack(side=tk.LEFT)
+            tk.Label(sub, text=self.economy.resource_icons[key], font=("Arial", 12),
+                     bg='#FAFAFA').pack(side=tk.LEFT)
             lbl = tk.Label(sub, text=f"{self.resources[key]:.2f}",
                            font=("微软雅黑", 10, "bold"), fg="#1A237E", bg='#FAFAFA')
             lbl.pack(side=tk.LEFT, padx=3)
@@ -139,14 +254,15 @@ class EnhancedEconomicGame:
         main_frame = tk.Frame(self.master, bg="#FAFAFA")
         main_frame.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
 
-        # 分配控制面板
-        alloc_frame = tk.Frame(main_frame, bg="#FAFAFA")
-        alloc_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # 分配控制面板：行业卡片每行最多 CARDS_PER_ROW 个，放不下时可上下滚动
+        alloc_frame = self.create_scroll_area(main_frame)
+        columns = min(len(self.sectors), CARDS_PER_ROW)
 
-        for col, sector in enumerate(self.sectors):
+        for idx, sector in enumerate(self.sectors):
+            row_idx, col = divmod(idx, columns)
             sector_frame = tk.Frame(alloc_frame, bd=1, relief=tk.GROOVE,
                                     bg=self.colors[sector], padx=8, pady=8)
-            sector_frame.grid(row=0, column=col, padx=3, sticky=tk.NSEW)
+            sector_frame.grid(row=row_idx, column=col, padx=3, pady=(0, 3), sticky=tk.NSEW)
             alloc_frame.columnconfigure(col, weight=1)
 
             # 标题
@@ -157,7 +273,8 @@ class EnhancedEconomicGame:
             input_frame = tk.Frame(sector_frame, bg=self.colors[sector])
             input_frame.pack(fill=tk.BOTH, expand=True)
 
-            for res, name in [('labor', '劳动力'), ('capital', '资金'), ('land', '土地')]:
+            for res in self.economy.resources:
+                name = self.economy.resource_names[res]
                 row = tk.Frame(input_frame, bg=self.colors[sector])
                 row.pack(pady=3, fill=tk.X)
 
@@ -176,18 +293,74 @@ class EnhancedEconomicGame:
                 )
                 entry.pack(side=tk.RIGHT, padx=3)
                 entry.insert(0, '0')
-                entry.bind("<KeyRelease>", self.update_usage_display)
+                entry.bind("<KeyRelease>", lambda e, s=sector, r=res: self.on_entry_changed(s, r))
                 self.entries[sector][res] = entry
+                self.entry_values[sector][res] = 0.0
+
+            # 当前效率下的预计产出，以及每种资源多投入1单位带来的收入
+            output_lbl = tk.Label(sector_frame, text="", font=("微软雅黑", 9, "bold"),
+                                  fg="#1A237E", bg=self.colors[sector])
+            output_lbl.pack(pady=(3, 0))
+            marginal_lbl = tk.Label(sector_frame, text="", font=("微软雅黑", 8),
+                                    fg="#555", bg=self.colors[sector])
+            marginal_lbl.pack()
+            self.preview_labels[sector] = (output_lbl, marginal_lbl)
+        self.refresh_preview()
 
         # 生产按钮放在右侧单独一栏
         btn_frame = tk.Frame(main_frame, bg="#FAFAFA", width=120)
         btn_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 5))
 
-        produce_btn = tk.Button(btn_frame, text="🚀\n开始生产", command=self.start_production,
-                                bg="#8B0000", fg="white", font=("微软雅黑", 10),
-                                padx=10, pady=10, relief=tk.RAISED, bd=2,
-                                width=8, height=4, wraplength=70)
-        produce_btn.pack(pady=10)
+        self.produce_btn = tk.Button(btn_frame, text="🚀\n开始生产", command=self.start_production,
+                                     bg="#8B0000", fg="white", font=("微软雅黑", 10),
+                                     padx=10, pady=10, relief=tk.RAISED, bd=2,
+                                     width=8, height=4, wraplength=70)
+        self.produce_btn.pack(pady=10)
+
+        auto_btn = tk.Button(btn_frame, text="🤖\n自动分配", command=self.auto_allocate,
+                             bg="#3F51B5", fg="white", font=("微软雅黑", 9),
+                             padx=10, pady=2, relief=tk.RAISED, bd=2,
+                             width=8, wraplength=70)
+        auto_btn.pack(pady=(0, 10))
+
+        # 快进：按策略连续模拟多轮，结束后统一刷新界面
+        self.ff_rounds = ttk.Combobox(btn_frame, width=8, state="readonly",
+                                      values=['100', '1000', '10000'])
+        self.ff_rounds.current(0)
+        self.ff_rounds.pack(pady=2)
+        self.ff_policy = ttk.Combobox(btn_frame, width=8, state="readonly", values=list(POLICIES))
+        self.ff_policy.current(0)
+        self.ff_policy.pack(pady=2)
+        self.ff_btn = tk.Button(btn_frame, text="⏩ 快进", command=self.fast_forward,
+                                bg="#455A64", fg="white", font=("微软雅黑", 9),
+                                padx=10, pady=2, relief=tk.RAISED, bd=2, width=8)
+        self.ff_btn.pack(pady=(2, 10))
+
+    def create_scroll_area(self, parent):
+        """返回一个放在可纵向滚动画布里的 Frame；内容不超过可见高度时不显示滚动条"""
+        outer = tk.Frame(parent, bg="#FAFAFA")
+        outer.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        canvas = tk.Canvas(outer, bg="#FAFAFA", highlightthickness=0)
+        scrollbar = tk.Scrollbar(outer, orient=tk.VERTICAL, command=canvas.yview)
+        inner = tk.Frame(canvas, bg="#FAFAFA")
+        window = canvas.create_window(0, 0, window=inner, anchor=tk.NW)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        def on_configure(event=None):
+            canvas.itemconfigure(window, width=canvas.winfo_width())
+            needed = inner.winfo_reqheight()
+            canvas.configure(scrollregion=(0, 0, 0, needed))
+            if needed > canvas.winfo_height():
+                scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            else:
+                scrollbar.pack_forget()
+            # 行业少时画布高度跟随内容
+            canvas.configure(height=min(needed, 260))
+
+        inner.bind("<Configure>", on_configure)
+        canvas.bind("<Configure>", on_configure)
+        return inner
 
     def create_market_controls(self):
         frame = tk.Frame(self.master, bg="#FAFAFA", bd=1, relief=tk.GROOVE)
@@ -209,10 +382,10 @@ class EnhancedEconomicGame:
         tk.Label(price_container, text="📈 市场价格", font=("微软雅黑", 10, "bold"),
                  bg="#FAFAFA").pack(anchor=tk.CENTER)
 
-        for res in ['labor', 'land']:
+        for res in self.economy.tradable:
             row = tk.Frame(price_container, bg="#FAFAFA")
             row.pack(pady=3, anchor=tk.CENTER)
-            name = '劳动力' if res == 'labor' else '土地'
+            name = self.economy.resource_names[res]
             tk.Label(row, text=f"{name}:", width=6, font=("微软雅黑", 9),
                      bg="#FAFAFA").pack(side=tk.LEFT)
             price_lbl = tk.Label(row, text=f"¥{self.prices[res]:.2f}",
@@ -232,10 +405,10 @@ class EnhancedEconomicGame:
                  bg="#FAFAFA").pack(anchor=tk.CENTER)
 
         self.buy_entries = {}
-        for res in ['labor', 'land']:
+        for res in self.economy.tradable:
             row = tk.Frame(buy_container, bg="#FAFAFA")
             row.pack(pady=3, anchor=tk.CENTER)
-            name = '劳动力' if res == 'labor' else '土地'
+            name = self.economy.resource_names[res]
             tk.Label(row, text=f"购买{name}:", width=8, font=("微软雅黑", 9),
                      bg="#FAFAFA").pack(side=tk.LEFT)
             entry = tk.Entry(row, width=12, validate="key",
@@ -270,42 +443,52 @@ class EnhancedEconomicGame:
 
         # 生产明细和图表切换
         notebook = ttk.Notebook(left_pane)
+        self.notebook = notebook
 
         # 生产明细标签页
         production_frame = ttk.Frame(notebook)
-        self.production_tree = ttk.Treeview(production_frame,
-                                            columns=('round', 'details'),
-                                            show='headings', height=10,
-                                            selectmode='none')  # 禁用选择
-        self.production_tree.heading('round', text='轮次', anchor=tk.CENTER)
-        self.production_tree.heading('details', text='生产结果', anchor=tk.W)
-        self.production_tree.column('round', width=80, anchor=tk.CENTER)
-        self.production_tree.column('details', width=350, anchor=tk.W)
-
-        # 斑马线样式
-        self.production_tree.tag_configure('even', background='#F5F5F5')
-        self.production_tree.tag_configure('odd', background='#FFFFFF')
-
-        scrollbar = ttk.Scrollbar(production_frame, orient="vertical", command=self.production_tree.yview)
-        self.production_tree.configure(yscrollcommand=scrollbar.set)
-
-        self.production_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 只保留可见行的控件，明细从历史记录按需读取；行业多时每行并排放几个
+        self.detail_per_line = 1 if len(self.sectors) <= 6 else 3
+        self.production_log = ProductionLog(production_frame, self.history,
+                                            self.format_production_detail,
+                                            row_lines=math.ceil(len(self.sectors) / self.detail_per_line))
+        self.production_log.pack(fill=tk.BOTH, expand=True)
 
         # 图表标签页
         chart_frame = ttk.Frame(notebook)
-        self.figure = Figure(figsize=(5, 3), dpi=100)
-        self.canvas = FigureCanvasTkAgg(self.figure, master=chart_frame)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.chart_frame = chart_frame
+        # 图表在第一次需要时才创建
+        self.figure = None
+        self.canvas = None
+        self.chart_slots = 5  # 显示最近5轮
+        self.chart_dirty = False
+        self.chart_key = self.chart_bands = None
+        self.chart_placeholder = tk.Label(chart_frame, text="图表加载中…", font=("微软雅黑", 9),
+                                          fg="#999")
+        self.chart_placeholder.pack(expand=True)
 
         notebook.add(production_frame, text='生产明细')
         notebook.add(chart_frame, text='生产图表')
+        # 图表页隐藏时只标记待刷新，切换过去再画
+        notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         left_pane.add(notebook)
 
         # 右侧面板 - 事件日志
         event_frame = ttk.Frame(pane)
-        tk.Label(event_frame, text="📰 重要事件", font=("微软雅黑", 10, "bold"),
-                 bg="#FAFAFA").pack(anchor=tk.W, padx=5, pady=3)
+        title_row = tk.Frame(event_frame, bg="#FAFAFA")
+        title_row.pack(fill=tk.X)
+        tk.Label(title_row, text="📰 重要事件", font=("微软雅黑", 10, "bold"),
+                 bg="#FAFAFA").pack(side=tk.LEFT, padx=5, pady=3)
+
+        # 按标签/关键字筛选
+        self.event_search = tk.Entry(title_row, width=10, font=("微软雅黑", 9))
+        self.event_search.pack(side=tk.RIGHT, padx=5)
+        self.event_search.bind("<Return>", self.filter_events)
+        self.event_filter = ttk.Combobox(title_row, width=8, state="readonly",
+                                         values=['全部'] + list(TAG_NAMES.values()))
+        self.event_filter.current(0)
+        self.event_filter.pack(side=tk.RIGHT)
+        self.event_filter.bind("<<ComboboxSelected>>", self.filter_events)
 
         self.event_text = tk.Text(event_frame, height=20, wrap=tk.WORD,
                                   font=("微软雅黑", 9), padx=10, pady=8,
@@ -322,75 +505,216 @@ class EnhancedEconomicGame:
         self.event_text.tag_config('price', foreground='#D32F2F')
         self.event_text.tag_config('tech', foreground='#00796B')
         self.event_text.tag_config('bonus', foreground='#689F38')
+        self.event_text.tag_config('disaster', foreground='#5D4037')
+        self.event_text.tag_config('finance', foreground='#1565C0')
+        self.event_log = EventLog(self.event_text, max_lines=200)
 
         pane.add(left_pane)
         pane.add(event_frame)
 
+    def filter_events(self, event=None):
+        tags = {name: tag for tag, name in TAG_NAMES.items()}
+        self.event_log.set_filter(tags.get(self.event_filter.get()), self.event_search.get().strip())
+
     def set_initial_focus(self):
+        first = self.entries[self.sectors[0]][self.economy.resources[0]]
         self.master.after(100, lambda: [
-            self.entries['农业']['labor'].focus_set(),
-            self.entries['农业']['labor'].icursor(0)
+            first.focus_set(),
+            first.icursor(0)
         ])
 
-    def update_usage_display(self, event=None):
-        total_used = {'labor': 0.0, 'capital': 0.0, 'land': 0.0}
+    def on_entry_changed(self, sector, res):
+        try:
+            value = float(self.entries[sector][res].get() or 0)
+        except ValueError:
+            # 只输入了小数点等不完整的内容，暂按0计
+            value = 0.0
+        self.preview.set(sector, res, value)
+        old = self.entry_values[sector][res]
+        if value != old:
+            self.entry_values[sector][res] = value
+            self.total_used[res] = max(0.0, self.total_used[res] + value - old)
+            self.update_usage_display()
+
+    def sync_usage_from_entries(self):
+        """程序批量改写输入框后重建缓存"""
+        for res in self.total_used:
+            self.total_used[res] = 0.0
         for sector in self.sectors:
             for res in self.entries[sector]:
-                try:
-                    value = float(self.entries[sector][res].get() or 0)
-                    total_used[res] += value
-                except:
-                    pass
-
-        max_labor = self.resources['labor'] * 0.9
-        max_capital = self.resources['capital'] * 0.9
-        max_land = self.resources['land'] * 0.9
-
-        self.labor_status.config(
-            text=f"劳动力: {total_used['labor']:.2f}/{max_labor:.2f}",
-            fg="#4CAF50" if total_used['labor'] <= max_labor else "#D32F2F"
-        )
-        self.capital_status.config(
-            text=f"资金: {total_used['capital']:.2f}/{max_capital:.2f}",
-            fg="#4CAF50" if total_used['capital'] <= max_capital else "#D32F2F"
-        )
-        self.land_status.config(
-            text=f"土地: {total_used['land']:.2f}/{max_land:.2f}",
-            fg="#4CAF50" if total_used['land'] <= max_land else "#D32F2F"
-        )
+                self.entry_values[sector][res] = 0.0
+                self.on_entry_changed(sector, res)
+        self.update_usage_display()
+
+    def update_usage_display(self, event=None):
+        """合并到空闲时统一刷新状态标签"""
+        if not self.usage_refresh_pending:
+            self.usage_refresh_pending = True
+            self.master.after_idle(self.refresh_usage_labels)
+
+    def refresh_usage_labels(self):
+        self.usage_refresh_pending = False
+        for res, (label, name) in self.usage_labels.items():
+            used = self.total_used[res]
+            max_use = self.resources[res] * self.state.params.usage_cap
+            text = f"{name}: {used:.2f}/{max_use:.2f}"
+            fg = "#4CAF50" if used <= max_use else "#D32F2F"
+            # 文字和颜色都没变的标签不再 config
+            if self.usage_label_state.get(res) != (text, fg):
+                self.usage_label_state[res] = (text, fg)
+                label.config(text=text, fg=fg)
+        self.refresh_preview()
+        # 分配或资源变了，预测也要更新
+        self.schedule_forecast()
+
+    def refresh_preview(self):
+        """只重画输入或效率变了的行业卡片"""
+        if self.preview.production is not self.state.params.production:
+            # 读档换了参数
+            self.preview = OutputPreview(self.state.params)
+            self.preview.load(self.entry_values)
+        icons = self.economy.resource_icons
+        for sector, (output, marginal) in self.preview.refresh(self.efficiency).items():
+            output_lbl, marginal_lbl = self.preview_labels[sector]
+            output_lbl.config(text=f"预计产出 ¥{output:.2f}")
+            marginal_lbl.config(text="多投1单位: " + " ".join(
+                f"{icons[res]}{value:+.2f}" for res, value in marginal.items()))
+
+    def schedule_forecast(self, delay=150):
+        if self.forecast_after is not None:
+            self.master.after_cancel(self.forecast_after)
+        self.forecast_after = self.master.after(delay, self.request_forecast)
+
+    def request_forecast(self):
+        self.forecast_after = None
+        key, bands = self.forecaster.request(self.state, self.entry_values)
+        self.forecast_key = key
+        self.forecaster.discard_stale(key)
+        if bands is not None:
+            self.show_forecast(bands)
+        else:
+            self.master.after(50, self.poll_forecast, key)
+
+    def poll_forecast(self, key):
+        if key != self.forecast_key:
+            return  # 已有更新的请求
+        bands = self.forecaster.poll(key)
+        if bands is None:
+            self.master.after(50, self.poll_forecast, key)
+        else:
+            self.show_forecast(bands)
+
+    def show_forecast(self, bands):
+        self.forecast_bands = bands
+        if self.figure is not None and self.chart_visible():
+            self.update_forecast_artists()
+            self.canvas.draw_idle()
+        else:
+            self.chart_dirty = True
+
+    def auto_allocate(self):
+        """用求解器填入本轮收益最大的分配"""
+        if self.ff_runner is not None:
+            return  # 快进进行中
+        allocations, income = solve_allocation(self.resources, self.efficiency,
+                                               params=self.state.params)
+        for sector in self.sectors:
+            for res, entry in self.entries[sector].items():
+                entry.delete(0, tk.END)
+                entry.insert(0, f"{allocations[sector][res]:.2f}")
+        self.sync_usage_from_entries()
+
+    def fast_forward(self):
+        n_rounds = int(self.ff_rounds.get())
+        policy = POLICIES[self.ff_policy.get()]
+        last_allocations = {sector: dict(self.entry_values[sector]) for sector in self.sectors}
+        self.ff_summary = {'start_capital': self.resources['capital']}
+        self.ff_before = self.undo_stack.begin(self.state, self.history, self.action_log, self.event_log)
+        self.ff_runner = run_rounds(self.state, policy, n_rounds, last_allocations,
+                                    on_record=self.record_round,
+                                    on_event=lambda r, e: self.event_log.log(r, e['message'], e['tag']),
+                                    summary=self.ff_summary)
+        self.produce_btn.config(state="disabled")
+        self.ff_btn.config(state="disabled")
+        self.master.after(0, self.fast_forward_step)
+
+    def record_round(self, record):
+        self.history.append(record)
+        self.action_log.record_produce(record['allocations'])
+
+    def fast_forward_step(self, batch=200):
+        # 分批推进，期间让出事件循环，窗口不会无响应
+        done = sum(1 for _ in islice(self.ff_runner, batch))
+        if done == batch:
+            self.ff_btn.config(text=f"⏩ {self.ff_summary['rounds']}")
+            self.master.after(1, self.fast_forward_step)
+            return
+
+        # 全部结束后一次性刷新界面
+        summary = self.ff_summary
+        self.ff_runner = None
+        self.produce_btn.config(state="normal")
+        self.ff_btn.config(state="normal", text="⏩ 快进")
+        self.round_label.config(text=f"第 {self.round} 轮")
+        for res in self.price_labels:
+            self.update_price_display(res)
+        self.update_resource_display()
+        self.production_log.refresh()
+        self.update_chart()
+        self.autosave()
+        # 整段快进作为一步撤销
+        self.undo_stack.commit("快进", self.ff_before, self.action_log, self.event_log)
+        self.update_undo_menu()
+
+        lines = [f"共模拟 {summary['rounds']} 轮",
+                 f"总收益：¥{summary['total_income']:.2f}",
+                 f"资金：¥{summary['start_capital']:.2f} → ¥{self.resources['capital']:.2f}"]
+        lines += [f"{sector}累计：¥{summary['sector_totals'][sector]:.2f}" for sector in self.sectors]
+        lines.append("事件：" + "  ".join(f"{TAG_NAMES[tag]} {count}次"
+                                         for tag, count in summary['events'].items()))
+        if summary['stopped']:
+            lines.append(f"提前结束：{summary['stopped']}")
+        if self.close_requested:
+            return self.on_close()
+        messagebox.showinfo("快进结果", "\n".join(lines))
 
     def buy_resources(self):
+        if self.ff_runner is not None:
+            return  # 快进进行中
         try:
-            total_cost = 0.0
-            purchased = {'labor': 0.0, 'land': 0.0}
+            purchased = {res: 0.0 for res in self.economy.tradable}
             for res in self.buy_entries:
-                amount = float(self.buy_entries[res].get() or 0)
-                if amount < 0:
-                    raise ValueError("不能输入负数")
-                purchased[res] = amount
-                total_cost += amount * self.prices[res]
+                purchased[res] = float(self.buy_entries[res].get() or 0)
+            total_cost = purchase_cost(self.prices, purchased, self.state.params)
 
             if total_cost > self.resources['capital']:
                 messagebox.showerror("错误", "资金不足！")
                 return
 
+            names = self.economy.resource_names
+            market = self.state.params.market
+            lines = []
+            for res, amount in purchased.items():
+                line = f"购买{names[res]}：{amount:.2f} 单位"
+                if market.impact and amount > 0:
+                    # 有价格冲击时买得越多均价越高
+                    line += f"（均价 ¥{market.quote(self.prices, {res: amount}) / amount:.2f}）"
+                lines.append(line)
             confirm = messagebox.askyesno("确认购买",
-                                          f"即将花费 ¥{total_cost:.2f}\n购买劳动力：{purchased['labor']:.2f} 单位\n购买土地：{purchased['land']:.2f} 单位\n确认购买？")
+                                          f"即将花费 ¥{total_cost:.2f}\n" + "\n".join(lines) + "\n确认购买？")
             if not confirm:
                 return
 
-            self.resources['labor'] += purchased['labor']
-            self.resources['land'] += purchased['land']
-            self.resources['capital'] -= total_cost
+            before = self.undo_stack.begin(self.state, self.history, self.action_log, self.event_log)
+            apply_purchase(self.state, purchased, total_cost)
+            self.action_log.record_buy(purchased)
             self.update_resource_display()
+            self.autosave()
 
-            # 在插入文本前启用编辑，插入后禁用
-            self.event_text.config(state="normal")
-            self.event_text.insert(tk.END,
-                                   f"第{self.round}轮：🛒 购买资源 - 劳动力+{purchased['labor']:.2f} 土地+{purchased['land']:.2f} 花费¥{total_cost:.2f}\n",
-                                   'bonus')
-            self.event_text.see(tk.END)
-            self.event_text.config(state="disabled")
+            bought = " ".join(f"{names[res]}+{amount:.2f}" for res, amount in purchased.items())
+            self.event_log.log(self.round, f"🛒 购买资源 - {bought} 花费¥{total_cost:.2f}", 'bonus')
+            self.undo_stack.commit("采购", before, self.action_log, self.event_log)
+            self.update_undo_menu()
 
             # 清空购买输入框
             for entry in self.buy_entries.values():
@@ -400,233 +724,360 @@ class EnhancedEconomicGame:
         except ValueError as e:
             messagebox.showerror("输入错误", "请输入有效的非负数！")
 
-    def update_resource_display(self):
-        for res in self.res_labels:
-            self.res_labels[res].config(text=f"{self.resources[res]:.2f}")
-        self.update_usage_display()
+    def undo(self, event=None):
+        self.restore_step(self.undo_stack.undo)
 
-    def generate_random_event(self):
-        events = []
-        if random.random() < 0.6:
-            res = random.choice(['labor', 'land'])
-            change = random.uniform(-0.25, 0.35)
-            new_price = max(30.0 if res == 'labor' else 60.0, self.prices[res] * (1 + change))
-            events.append({
-                'message': f"⚠ 市场价格波动！{'劳动力' if res == 'labor' else '土地'}价格{'+' if change > 0 else ''}{(change * 100):.2f}% → ¥{new_price:.2f}",
-                'effect': lambda r=res, np=new_price: self.update_price(r, np),
-                'tag': 'price'
-            })
-
-        if random.random() < 0.4:
-            sector = random.choice(self.sectors)
-            modifier = random.uniform(0.85, 1.25)
-            events.append({
-                'message': f"⚡ 技术变革！{sector}效率{'+' if modifier > 1 else ''}{((modifier - 1) * 100):.2f}%",
-                'effect': lambda s=sector, m=modifier: self.update_efficiency(s, m),
-                'tag': 'tech'
-            })
-
-        if random.random() < 0.25:
-            events.append({
-                'message': "🎉 政府补贴！全产业+15%产量",
-                'effect': lambda: [self.update_efficiency(s, 1.15) for s in self.sectors],
-                'tag': 'bonus'
-            })
-
-        if events:
-            event = random.choice(events)
-            event['effect']()
-            self.event_text.config(state="normal")
-            self.event_text.insert(tk.END, f"第{self.round}轮：{event['message']}\n", event['tag'])
-            self.event_text.see(tk.END)
-            self.event_text.config(state="disabled")
-
-    def update_price(self, resource, new_price):
-        self.prices[resource] = round(new_price, 2)
-        self.price_labels[resource].config(text=f"¥{self.prices[resource]:.2f}")
-
-    def update_efficiency(self, sector, modifier):
-        self.efficiency[sector] = round(self.efficiency[sector] * modifier, 2)
-
-    def update_chart(self):
-        self.figure.clear()
+    def redo(self, event=None):
+        self.restore_step(self.undo_stack.redo)
 
-        if not self.history:
+    def restore_step(self, action):
+        if self.ff_runner is not None:
+            return  # 快进进行中
+        round_before = self.round
+        step = action(self.state, self.history, self.action_log, self.event_log)
+        if step is None:
+            return
+        # 只刷新变了的部分：标签按文字比较，明细表和图表只改不同的行和柱子
+        if self.round != round_before:
+            self.round_label.config(text=f"第 {self.round} 轮")
+        for res in self.price_labels:
+            self.update_price_display(res)
+        self.update_resource_display()
+        self.production_log.refresh()
+        self.update_chart()
+        self.update_undo_menu()
+        self.autosave()
+
+    def update_undo_menu(self):
+        done, undone = self.undo_stack.done, self.undo_stack.undone
+        self.edit_menu.entryconfig(0, label=f"撤销 {done[-1].label}" if done else "撤销",
+                                   state="normal" if done else "disabled")
+        self.edit_menu.entryconfig(1, label=f"重做 {undone[-1].label}" if undone else "重做",
+                                   state="normal" if undone else "disabled")
+
+    def autosave(self):
+        if self.autosaver.error and not self.autosave_error_shown:
+            self.autosave_error_shown = True
+            messagebox.showwarning("自动存档失败", str(self.autosaver.error))
+        self.autosaver.submit(take_snapshot(self.state, self.history, self.event_log.records,
+                                            self.action_log))
+
+    def save_game(self):
+        path = filedialog.asksaveasfilename(title="保存游戏", defaultextension=".ecsave",
+                                            filetypes=[("游戏存档", "*.ecsave")])
+        if not path:
+            return
+        try:
+            write_save(path, take_snapshot(self.state, self.history, self.event_log.records,
+                                           self.action_log))
+        except OSError as e:
+            messagebox.showerror("保存失败", str(e))
+
+    def load_game(self):
+        if self.ff_runner is not None:
+            return  # 快进进行中
+        path = filedialog.askopenfilename(title="读取游戏", filetypes=[("游戏存档", "*.ecsave")])
+        if not path:
+            return
+        try:
+            save = SaveFile(path)
+            if save.params().economy.structure() != self.economy.structure():
+                raise ValueError("存档使用的经济模型与当前游戏不同，请用对应的 ECONGAME_ECONOMY 启动")
+            history = self.new_history()
+            save.load_history(history)  # 历史段只做映射，按需分页读入
+            events = list(save.events())
+            action_log = save.action_log()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("读取失败", str(e))
             return
 
-        # 创建子图
-        ax = self.figure.add_subplot(111)
-
-        # 获取最近5轮数据
-        recent_data = self.history[-5:] if len(self.history) > 5 else self.history
-
-        # 准备数据
-        rounds = [f"第{data['round']}轮" for data in recent_data]
-        sectors = self.sectors
+        # 当前这局被放弃，先归档
+        self.archive_game('abandoned')
+        self.state = save.state()
+        self.economy = self.state.economy
+        self.started = time.time()
+        # 存档没有操作记录时只能从读档处开始记，这样的记录不能从种子重放，只用于撤销/重做，不写进存档
+        self.action_log = action_log or ActionLog(self.state.seed, params=self.state.params,
+                                                  replayable=False)
+        self.history = history
+        # 在写盘线程上把映射的历史拷进自己的文件，之后存档文件才可被覆盖
+        self.autosaver.run_task(history.absorb_base)
+        self.production_log.history = history
+        self.production_log.scroll_to(len(history))
+        self.event_log.load(events)
+        self.undo_stack.clear()
+        self.update_undo_menu()
+
+        self.round_label.config(text=f"第 {self.round} 轮")
+        for res in self.price_labels:
+            self.update_price_display(res)
+        self.update_resource_display()
+        self.update_chart()
+
+    def archive_game(self, status):
+        """在界面线程复制整局数据，交给写盘线程写入归档"""
+        if not len(self.history):
+            return
+        entry = history_entry(self.state, self.history, self.event_log.records, status,
+                              started=self.started)
+        self.autosaver.run_task(lambda: append_game(entry))
 
-        # 生产结果图
-        results_data = [[data['results'][sector] for data in recent_data] for sector in sectors]
+    def show_leaderboard(self, top=10):
+        try:
+            with GameArchive(ARCHIVE_PATH) as archive:
+                rows = archive.leaderboard(self.economy.name, top)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("排行榜", f"无法读取对局归档：{e}")
+            return
+        if not rows:
+            messagebox.showinfo("排行榜", "还没有归档的对局（关闭游戏时会自动归档）")
+            return
+        lines = []
+        for rank, (_, player, capital, rounds, ended) in enumerate(rows, 1):
+            day = time.strftime('%Y-%m-%d', time.localtime(ended))
+            lines.append(f"{rank}. {player}  ¥{capital:.2f}  （{rounds} 轮，{day}）")
+        messagebox.showinfo("排行榜", "\n".join(lines))
+
+    def on_close(self):
+        if self.ff_runner is not None:
+            # 快进进行中：等这一段结算完（并记入撤销和存档）再关闭
+            self.close_requested = True
+            return
+        self.archive_game('finished')
+        # 等最后一次自动存档（和归档）写完再退出
+        self.autosaver.close()
+        self.forecaster.shutdown()
+        self.summary_view.shutdown()
+        self.master.destroy()
 
-        width = 0.2
-        x = range(len(rounds))
+    def update_resource_display(self):
+        for res, label in self.res_labels.items():
+            text = f"{self.resources[res]:.2f}"
+            # 只改数值变了的标签（撤销时大多数不变）
+            if self.label_text.get(label) != text:
+                self.label_text[label] = text
+                label.config(text=text)
+        self.update_usage_display()
 
-        for i, sector in enumerate(sectors):
-            ax.bar([xi + i * width for xi in x], results_data[i], width,
-                   label=sector, color=self.colors[sector])
+    def generate_random_event(self):
+        event = roll_event(self.state)
+        if event:
+            apply_event(self.state, event)
+            self.event_log.log(self.round, event['message'], event['tag'])
+        step_market(self.state)
+        # 价格事件和市场模型都可能改价格；标签按文字比较，没变的不重绘
+        for res in self.price_labels:
+            self.update_price_display(res)
+
+    def update_price_display(self, resource):
+        label = self.price_labels[resource]
+        text = f"¥{self.prices[resource]:.2f}"
+        if self.label_text.get(label) != text:
+            self.label_text[label] = text
+            label.config(text=text)
+
+    def warm_up_charts(self):
+        """在后台线程导入 matplotlib，完成后再在主线程空闲时建好图表"""
+        worker = threading.Thread(target=load_matplotlib, daemon=True)
+        worker.start()
+        self.master.after(100, self.poll_warm_up, worker)
+
+    def poll_warm_up(self, worker):
+        if worker.is_alive():
+            self.master.after(100, self.poll_warm_up, worker)
+        else:
+            self.master.after_idle(self.ensure_chart)
+
+    def ensure_chart(self):
+        if self.figure is not None:
+            return
+        Figure, FigureCanvasTkAgg = load_matplotlib()
+        self.chart_placeholder.destroy()
+        self.figure = Figure(figsize=(5, 3), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.create_chart()
 
-        ax.set_xticks([xi + width for xi in x])
-        ax.set_xticklabels(rounds)
+    def create_chart(self):
+        """只创建一次坐标轴和柱子，之后每轮原地更新高度"""
+        ax = self.figure.add_subplot(111)
+        self.chart_ax = ax
+
+        # 行业多时柱子变窄，每组总宽度不超过 0.6
+        width = min(0.2, 0.6 / len(self.sectors))
+        self.chart_bar_width = width
+        x = range(self.chart_slots)
+        self.chart_bars = {}
+        for i, sector in enumerate(self.sectors):
+            bars = ax.bar([xi + i * width for xi in x], [0] * self.chart_slots, width,
+                          label=sector, color=self.colors[sector])
+            self.chart_bars[sector] = bars
+
+        ax.set_xticks([xi + width * (len(self.sectors) - 1) / 2 for xi in x])
+        ax.set_xticklabels([''] * self.chart_slots)
+        ax.set_xlim(-0.5, self.chart_slots - 0.5 + width * (len(self.sectors) - 1)
+                    + self.forecaster.rounds)
         ax.set_ylabel('生产收益 (¥)')
         ax.set_xlabel('轮次')
         ax.set_title('各行业生产收益对比')
-        ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+
+        # 资金预测画在右侧副坐标轴上，从最近一轮往后延伸
+        self.forecast_ax = ax.twinx()
+        self.forecast_ax.set_ylabel('预测资金 (¥)')
+        self.forecast_line, = self.forecast_ax.plot([], [], 'o-', color='#3F51B5',
+                                                     markersize=3, label='资金预测(中位数)')
+        self.forecast_band = self.forecast_ax.fill_between([0, 0], [0, 0], [0, 0], color='#3F51B5',
+                                                           alpha=0.15, label='10%-90%区间')
+        self.forecast_line.set_visible(False)
+        self.forecast_band.set_visible(False)
+
+        handles = [self.chart_bars[sector] for sector in self.sectors] + \
+                  [self.forecast_line, self.forecast_band]
+        ax.legend(handles=handles, loc='upper left', fontsize=8 if len(self.sectors) <= 6 else 6,
+                  ncol=math.ceil(len(handles) / 8), framealpha=0.8)
 
         # 添加网格线
         ax.grid(True, linestyle='--', alpha=0.6)
 
         self.figure.tight_layout()
-        self.canvas.draw()
 
-    def show_summary(self):
-        if self.round % 5 != 1 or self.round == 1:
-            return
+    def chart_visible(self):
+        return self.notebook.select() == str(self.chart_frame)
 
-        # 创建总结窗口
-        summary_window = tk.Toplevel(self.master)
-        summary_window.title(f"第{self.round - 5}-{self.round - 1}轮总结")
-        summary_window.geometry("700x500")
+    def on_tab_changed(self, event=None):
+        if self.chart_visible():
+            self.ensure_chart()
+            if self.chart_dirty:
+                self.update_chart()
 
-        # Center the summary window
-        summary_window.update_idletasks()
-        width = summary_window.winfo_width()
-        height = summary_window.winfo_height()
-        x = (summary_window.winfo_screenwidth() // 2) - (width // 2)
-        y = (summary_window.winfo_screenheight() // 2) - (height // 2)
-        summary_window.geometry(f'+{x}+{y}')
+    def update_forecast_artists(self):
+        bands = self.forecast_bands
+        if bands is None:
+            return
+        n_recent = min(len(self.history), self.chart_slots)
+        xs = [n_recent - 1 + self.chart_bar_width + k for k in range(len(bands))]
+        self.forecast_line.set_data(xs, bands[:, 1])
+        lower = list(zip(xs, bands[:, 0]))
+        upper = list(zip(reversed(xs), bands[::-1, 2]))
+        self.forecast_band.set_verts([lower + upper])
+        self.forecast_ax.set_ylim(0, max(bands[:, 2].max() * 1.1, 1))
+        self.forecast_line.set_visible(True)
+        self.forecast_band.set_visible(True)
 
-        # 创建图表
-        fig = Figure(figsize=(7, 5), dpi=100)
-        canvas = FigureCanvasTkAgg(fig, master=summary_window)
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    def update_chart(self):
+        if not self.chart_visible():
+            self.chart_dirty = True
+            return
+        self.chart_dirty = False
+        self.ensure_chart()
 
         # 获取最近5轮数据
-        recent_data = self.history[-5:] if len(self.history) > 5 else self.history
-
-        # 准备数据
-        rounds = [f"第{data['round']}轮" for data in recent_data]
-        sectors = self.sectors
-
-        # 创建子图
-        ax = fig.add_subplot(111)
-
-        # 资源分配趋势图
-        for sector in sectors:
-            results = [data['results'][sector] for data in recent_data]
-            ax.plot(rounds, results, 'o-', label=sector, color=self.colors[sector])
+        rounds = self.history.recent_column('round', self.chart_slots)
+        results = self.history.recent_column('results', self.chart_slots)
 
-        ax.set_title('五轮生产结果趋势')
-        ax.set_ylabel('生产收益 (¥)')
-        ax.set_xlabel('轮次')
-        ax.legend()
-        ax.grid(True, linestyle='--', alpha=0.6)
+        # 与上次画的完全相同（例如撤销后又重做）时不重画
+        key = (rounds.tobytes(), results.tobytes())
+        if key == self.chart_key and self.chart_bands is self.forecast_bands:
+            return
+        self.chart_key, self.chart_bands = key, self.forecast_bands
+
+        for i, sector in enumerate(self.sectors):
+            for slot, rect in enumerate(self.chart_bars[sector]):
+                # 空槽位高度为0，不画出来
+                height = results[slot, i] if slot < len(rounds) else 0
+                if rect.get_height() != height:
+                    rect.set_height(height)
+
+        top = results.max() if len(rounds) else 0.0
+        labels = [f"第{int(r)}轮" for r in rounds]
+        self.chart_ax.set_xticklabels(labels + [''] * (self.chart_slots - len(labels)))
+        self.chart_ax.set_ylim(0, top * 1.1 if top > 0 else 1)
+        self.update_forecast_artists()
+        self.canvas.draw_idle()
 
-        fig.tight_layout()
-        canvas.draw()
+    def show_summary(self):
+        if self.round % 5 != 1 or self.round == 1:
+            return
+        # 只复制最近5轮数据，画图在后台线程完成
+        rounds = [f"第{int(r)}轮" for r in self.history.recent_column('round', 5)]
+        results = self.history.recent_column('results', 5)
+        self.summary_view.show(f"第{self.round - 5}-{self.round - 1}轮总结", rounds, results,
+                               self.sectors, self.colors)
+
+    def format_production_detail(self, record):
+        details = []
+        for sector in self.sectors:
+            if record['results'][sector] > 0:
+                details.append(f"{sector}: ¥{record['results'][sector]:.2f} (效率x{record['efficiency'][sector]:.2f})")
+            else:
+                details.append(f"{sector}: 无产出 (资源不足)")
+        per_line = self.detail_per_line
+        return "\n".join("   ".join(details[i:i + per_line]) for i in range(0, len(details), per_line))
 
     def start_production(self):
+        self.timer.start(self.round)
         try:
-            total_used = {'labor': 0.0, 'capital': 0.0, 'land': 0.0}
             allocations = {}
             for sector in self.sectors:
                 allocations[sector] = {}
                 for res in self.entries[sector]:
-                    value = float(self.entries[sector][res].get() or 0)
-                    total_used[res] += value
-                    allocations[sector][res] = value
-
-            error_msgs = []
-            for res in total_used:
-                max_use = self.resources[res] * 0.9
-                if total_used[res] > max_use:
-                    error_msgs.append(f"⚠️ {res}超额使用！({total_used[res]:.2f} > {max_use:.2f})")
+                    allocations[sector][res] = float(self.entries[sector][res].get() or 0)
+            self.timer.lap('parse')
+
+            error_msgs = check_usage(self.resources, allocations, self.state.params)
+            self.timer.lap('validate')
             if error_msgs:
+                self.timer.stop()
                 return messagebox.showerror("错误", "\n".join(error_msgs))
 
-            results = {}
-            for sector in self.sectors:
-                # 如果任何资源分配为0，则该行业产出为0
-                if any(allocations[sector][res] == 0 for res in allocations[sector]):
-                    results[sector] = 0.0
-                else:
-                    if sector == '农业':
-                        results[sector] = (allocations[sector]['labor'] * 0.6 + allocations[sector]['land'] * 1.2) * \
-                                          (1 + allocations[sector]['capital'] * 0.015) * 2.5 * self.efficiency[sector]
-                    elif sector == '工业':
-                        results[sector] = (allocations[sector]['labor'] * 0.8 + allocations[sector]['capital'] * 0.8) * \
-                                          (1.25 + allocations['科技']['capital'] * 0.03) * 3.2 * self.efficiency[sector]
-                    elif sector == '科技':
-                        results[sector] = (allocations[sector]['labor'] * 0.5 + allocations[sector]['capital'] * 1.1) * \
-                                          1.8 * 6 * self.efficiency[sector]
-
-            # 更新资源 - 只消耗实际使用的资源
-            for sector in self.sectors:
-                # 如果该行业有产出才消耗资源
-                if results[sector] > 0:
-                    for res in allocations[sector]:
-                        self.resources[res] -= allocations[sector][res]
-                else:
-                    # 没有产出的行业，保留输入框中的值
-                    for res in allocations[sector]:
-                        # 保留输入框中的值，不清零
-                        pass
-
-            total_income = sum(results.values())
-            self.resources['capital'] += total_income
-
-            # 保存历史数据
-            self.history.append({
-                'round': self.round,
-                'allocations': allocations,
-                'results': results,
-                'efficiency': self.efficiency.copy(),
-                'total_income': total_income
-            })
-
-            self.round += 1
-            self.round_label.config(text=f"第 {self.round} 轮")
-            # 资金上限限制
-            self.resources['capital'] = min(self.resources['capital'], 5000.00)
-
-            tag = 'even' if (self.round - 1) % 2 == 0 else 'odd'
-            detail_lines = []
-            for sector in self.sectors:
-                if results[sector] > 0:
-                    detail_lines.append(f"{sector}: ¥{results[sector]:.2f} (效率x{self.efficiency[sector]:.2f})")
-                else:
-                    detail_lines.append(f"{sector}: 无产出 (资源不足)")
-            detail = "\n".join(detail_lines)
+            before = self.undo_stack.begin(self.state, self.history, self.action_log, self.event_log)
+            self.timer.lap('undo')
+            record = produce(self.state, allocations)
+            self.timer.lap('compute')
 
-            # 插入新行
-            item_id = self.production_tree.insert('', 'end', values=(self.round - 1, detail), tags=(tag,))
+            # 保存历史数据和操作记录
+            self.record_round(record)
+            self.timer.lap('record')
 
-            line_count = len(detail_lines)
-            self.style.configure("Treeview", rowheight=30 + (line_count - 1) * 15)
+            self.round_label.config(text=f"第 {self.round} 轮")
+            self.production_log.refresh()
+            self.timer.lap('treeview')
 
             self.generate_random_event()
+            self.timer.lap('event')
             self.update_resource_display()
+            self.timer.lap('resources')
             self.update_chart()
+            self.timer.lap('chart')
 
             # 显示五轮总结
             self.show_summary()
-
-            self.production_tree.see(item_id)
-            self.event_text.see(tk.END)
+            self.timer.lap('summary')
+            self.autosave()
+            self.undo_stack.commit(f"第{self.round - 1}轮生产", before, self.action_log, self.event_log)
+            self.update_undo_menu()
+            self.timer.lap('autosave')
 
         except ValueError:
+            self.timer.stop()
             messagebox.showerror("错误", "请输入有效的数字！")
+        else:
+            token = self.timer.stop()
+            self.master.after_idle(self.timer.late, token, 'idle')
+
+
+def report_first_frame(root):
+    """启动测速用：窗口可见且完成首次布局后输出时间戳并退出"""
+    root.wait_visibility()
+    root.update_idletasks()
+    print(f"FIRST_FRAME {time.time():.6f}", flush=True)
+    root.destroy()
 
 
 if __name__ == "__main__":
+    probe = bool(os.environ.get('ECONGAME_STARTUP_PROBE'))
     root = tk.Tk()
-    game = EnhancedEconomicGame(root)
+    game = EnhancedEconomicGame(root, show_intro=not probe)
+    if probe:
+        root.after(0, report_first_frame, root)
     root.mainloop()